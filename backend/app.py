@@ -1,56 +1,116 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context, g, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-import requests
-from requests.auth import HTTPBasicAuth
+import asyncio
 import json
+import logging
+import math
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from urllib.parse import quote
 import os
 import uuid
 import re
+import threading
 
-import spacy
 from collections import defaultdict
-ONTOLOGY_PREFIX = "http://www.semanticweb.org/user/ontologies/2025/8/nutrition#"
-FUSEKI_URL = os.getenv("FUSEKI_URL", "http://localhost:3030")
-FUSEKI_USERNAME = os.getenv("FUSEKI_USERNAME", "admin")
-FUSEKI_PASSWORD = os.getenv("FUSEKI_PASSWORD", "admin")
-DATASET_NAME = "nutrition"
-SPARQL_QUERY_ENDPOINT = f"{FUSEKI_URL}/{DATASET_NAME}/sparql"
-SPARQL_UPDATE_ENDPOINT = f"{FUSEKI_URL}/{DATASET_NAME}/update"
-
-# Charger le modèle SpaCy avec gestion d'erreur améliorée
-try:
-    nlp = spacy.load("fr_core_news_sm")
-    print("✅ Modèle SpaCy français chargé avec succès")
-except OSError:
-    try:
-        # Essayer de télécharger le modèle si absent
-        from spacy.cli import download
-        download("fr_core_news_sm")
-        nlp = spacy.load("fr_core_news_sm")
-        print("✅ Modèle SpaCy téléchargé et chargé")
-    except:
-        print("❌ Impossible de charger SpaCy, utilisation du mode fallback")
-        nlp = None
+
+from config import (
+    FUSEKI_URL, DATASET_NAME, FUSEKI_REPLICAS, FUSEKI_STICKY_SECONDS, STORAGE_BACKEND,
+    CACHE_ENABLED, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL, CACHE_WARMUP,
+    SEARCH_CACHE_MAX_QUERIES, SEARCH_CACHE_MAX_RESULTS, SEARCH_CACHE_MAX_BYTES,
+    NAME_INDEX_ENABLED, NAME_INDEX_MAX_CANDIDATES, NAME_INDEX_TTL, AUTOCOMPLETE_TOP_K, AUTOCOMPLETE_MAX_QUERIES,
+    BULK_CHUNK_BYTES, BULK_CHUNK_ROWS,
+    LOG_LEVEL, QUERY_LOG_SAMPLE_RATE, QUERY_LOG_SIZE, SLOW_QUERY_MS, SLOW_QUERY_LOG_SIZE,
+    HEALTH_CHECK_INTERVAL, HEALTH_CHECK_TIMEOUT, HEALTH_FAILURE_THRESHOLD, HEALTH_PROBE_INTERVAL,
+    HEALTH_FAST_FAIL, RECOMMENDATION_TOP_K, RECOMMENDATION_SCORE_BUDGET_BYTES,
+)
+from fuseki_async import run_async
+from storage import get_storage, StorageError
+from fuseki_router import set_client_last_write, reset_client_last_write, client_last_write
+from query_cache import QueryCache
+from search_cache import SearchCache
+from nlp_loader import spacy_loader
+from keyword_matcher import KeywordMatcher
+from query_criteria import ATTRIBUTES, extract_criteria, criteria_filters
+from name_index import NameIndex
+from autocomplete import Autocomplete
+from tracing import configure_logging, start_trace, QueryLog
+from slow_queries import SlowQueryLog
+from health_monitor import HealthMonitor
+from recommender import RecommendationEngine, GENERATED_URI_PREFIX
+from metrics import (
+    REGISTRY, PROMETHEUS_MIMETYPE, HTTP_REQUESTS, HTTP_ERRORS, HTTP_LATENCY, HTTP_RESPONSE_SIZE,
+    HTTP_IN_FLIGHT, HTTP_FAST_FAILED, FUSEKI_LATENCY, FUSEKI_ERRORS, FUSEKI_UP,
+    NLP_PARSE_LATENCY, JSON_SERIALIZE_LATENCY,
+)
+from sparql_templates import render_query, format_param, nutrition_iri
+from sparql_results import flatten_binding
+from sparql_utils import ONTOLOGY_PREFIX, SPARQL_PREFIXES
+from entities import (
+    ENTITY_LISTS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE,
+    build_list_query, build_count_query, parse_fields, encode_cursor, decode_cursor, page_cut,
+    ENTITY_SCHEMAS, entity_uri, new_entity_id, build_entity_triples, build_patch_update,
+    validate_id, written_name,
+)
+
+configure_logging(LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Charger le modèle SpaCy (en arrière-plan par défaut, voir SPACY_LOAD_MODE)
+spacy_loader.start()
 
 # ==================== PARSER INTELLIGENT AVEC SPAcy ====================
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, recording how long responses take to serialize"""
+
+    def dumps(self, obj, **kwargs):
+        with JSON_SERIALIZE_LATENCY.time():
+            return super().dumps(obj, **kwargs)
+
 app = Flask(__name__)
-CORS(app)
+app.json = TimedJSONProvider(app)
+CORS(app, expose_headers=["X-Next-Cursor", "X-Request-ID"])
+
+query_cache = QueryCache(max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                         ttl=CACHE_TTL, enabled=CACHE_ENABLED)
+search_cache = SearchCache(max_queries=SEARCH_CACHE_MAX_QUERIES, max_results=SEARCH_CACHE_MAX_RESULTS,
+                           max_bytes=SEARCH_CACHE_MAX_BYTES, ttl=CACHE_TTL, enabled=CACHE_ENABLED)
+query_log = QueryLog(size=QUERY_LOG_SIZE, sample_rate=QUERY_LOG_SAMPLE_RATE)
+slow_query_log = SlowQueryLog(threshold_ms=SLOW_QUERY_MS, size=SLOW_QUERY_LOG_SIZE)
+name_index = NameIndex()
+autocomplete = Autocomplete(top_k=AUTOCOMPLETE_TOP_K, max_queries=AUTOCOMPLETE_MAX_QUERIES)
+# Avec des réplicas, les lectures restent servies tant qu'un nœud de lecture répond
+REPLICA_READS = STORAGE_BACKEND == "fuseki" and bool(FUSEKI_REPLICAS)
+health_monitor = HealthMonitor(lambda timeout: get_storage().ping(timeout=timeout),
+                               interval=HEALTH_CHECK_INTERVAL, timeout=HEALTH_CHECK_TIMEOUT,
+                               failure_threshold=HEALTH_FAILURE_THRESHOLD,
+                               probe_interval=HEALTH_PROBE_INTERVAL,
+                               read_ping=(lambda timeout: get_storage().client.ping_readers(timeout=timeout))
+                               if REPLICA_READS else None,
+                               readable=(lambda: get_storage().client.readable()) if REPLICA_READS else None)
+recommender = RecommendationEngine(
+    lambda query_id, tags=None, **params: recommendation_rows(query_id, tags, **params),
+    lambda update: sparql_update(update, tags=("recommandations",), query_id="recommandations.delete_generated"),
+    top_k=RECOMMENDATION_TOP_K, score_budget_bytes=RECOMMENDATION_SCORE_BUDGET_BYTES,
+    chunk_rows=BULK_CHUNK_ROWS, chunk_bytes=BULK_CHUNK_BYTES,
+)
 # ==================== PARSER INTELLIGENT AVEC SPAcy ====================
 
 # ==================== PARSER INTELLIGENT AVEC SPAcy ====================
 
 class AdvancedNutritionQueryParser:
-    def __init__(self):
-        self.nlp = nlp
+    @property
+    def nlp(self):
+        return spacy_loader.get()
         
     def parse_query(self, query_text):
         """Parse la requête avec SpaCy et retourne la requête SPARQL"""
         if self.nlp is None:
             return self.fallback_parser(query_text)
         
-        print(f"[SpaCy] Analyse de la requête: {query_text}")
+        logger.debug("[SpaCy] Analyse de la requête: %s", query_text)
         doc = self.nlp(query_text.lower())
         
         # Détection d'entité avec SpaCy
@@ -87,7 +147,7 @@ class AdvancedNutritionQueryParser:
         
         if scores:
             best_entity = max(scores.items(), key=lambda x: x[1])
-            print(f"[SpaCy] Entité détectée: {best_entity[0]} (score: {best_entity[1]})")
+            logger.debug("[SpaCy] Entité détectée: %s (score: %s)", best_entity[0], best_entity[1])
             return best_entity[0]
         
         return None
@@ -118,17 +178,17 @@ class AdvancedNutritionQueryParser:
                 if token.lemma_ in ["jeune"]:
                     analysis['filters'].append("?âge <= 30")
                     analysis['order_by'] = "?âge"
-                    print(f"[SpaCy] Critère jeune détecté")
+                    logger.debug("[SpaCy] Critère jeune détecté")
                 elif token.lemma_ in ["vieux", "âgé", "vieille"]:
                     analysis['filters'].append("?âge >= 60")
                     analysis['order_by'] = "DESC(?âge)"
-                    print(f"[SpaCy] Critère âgé détecté")
+                    logger.debug("[SpaCy] Critère âgé détecté")
         
         return analysis
     
     def extract_numerical_criteria(self, query_text, analysis):
         """Extraction des critères numériques avec regex"""
-        print(f"[Extraction] Analyse des critères numériques dans: {query_text}")
+        logger.debug("[Extraction] Analyse des critères numériques dans: %s", query_text)
         
         # Extraction de la taille (ex: "taille 177", "177 cm", "taille 1.77")
         taille_patterns = [
@@ -141,7 +201,7 @@ class AdvancedNutritionQueryParser:
             match = re.search(pattern, query_text, re.IGNORECASE)
             if match:
                 taille_value = float(match.group(1).replace(',', '.'))
-                print(f"[Extraction] Taille détectée: {taille_value}")
+                logger.debug("[Extraction] Taille détectée: %s", taille_value)
                 analysis['filters'].append(f"?taille = {taille_value}")
                 break
         
@@ -158,15 +218,15 @@ class AdvancedNutritionQueryParser:
             match = re.search(pattern, query_text, re.IGNORECASE)
             if match:
                 age_value = int(match.group(1))
-                print(f"[Extraction] Âge détecté: {age_value} ans")
+                logger.debug("[Extraction] Âge détecté: %s ans", age_value)
                 
                 # Détection du type de comparaison
                 if "plus que" in query_text.lower() or "supérieur" in query_text.lower() or "greater" in query_text.lower():
                     analysis['filters'].append(f"?âge > {age_value}")
-                    print(f"[Extraction] Filtre: âge > {age_value}")
+                    logger.debug("[Extraction] Filtre: âge > %s", age_value)
                 else:
                     analysis['filters'].append(f"?âge = {age_value}")
-                    print(f"[Extraction] Filtre: âge = {age_value}")
+                    logger.debug("[Extraction] Filtre: âge = %s", age_value)
                 break
         
         # Extraction du poids si présent
@@ -179,7 +239,7 @@ class AdvancedNutritionQueryParser:
             match = re.search(pattern, query_text, re.IGNORECASE)
             if match:
                 poids_value = float(match.group(1).replace(',', '.'))
-                print(f"[Extraction] Poids détecté: {poids_value}")
+                logger.debug("[Extraction] Poids détecté: %s", poids_value)
                 analysis['filters'].append(f"?poids = {poids_value}")
                 break
     
@@ -217,18 +277,18 @@ class AdvancedNutritionQueryParser:
         
         base_query += f"}} ORDER BY {analysis['order_by']} LIMIT 20"
         
-        print(f"[SpaCy] Requête SPARQL générée pour {entity_type}")
-        print(f"[SpaCy] Filtres appliqués: {analysis['filters']}")
+        logger.debug("[SpaCy] Requête SPARQL générée pour %s", entity_type)
+        logger.debug("[SpaCy] Filtres appliqués: %s", analysis['filters'])
         return base_query
     
     def fallback_parser(self, query_text):
         """Parser de secours si SpaCy n'est pas disponible"""
-        print("[SpaCy] Utilisation du parser de secours")
+        logger.debug("[SpaCy] Utilisation du parser de secours")
         return self.build_advanced_fallback_query(query_text)
     
     def build_advanced_fallback_query(self, query_text):
         """Parser de secours avancé avec extraction regex"""
-        print(f"[Fallback] Analyse de: {query_text}")
+        logger.debug("[Fallback] Analyse de: %s", query_text)
         
         # Détection du type d'entité
         if any(word in query_text.lower() for word in ["être humain", "personne", "âge", "ans", "taille", "poids"]):
@@ -286,7 +346,7 @@ class AdvancedNutritionQueryParser:
 
     def build_multi_entity_search(self, query_text):
         """Recherche multi-entités"""
-        print("[SpaCy] Recherche multi-entités")
+        logger.debug("[SpaCy] Recherche multi-entités")
         return f"""
         PREFIX nutrition: <{ONTOLOGY_PREFIX}>
         SELECT ?id ?nom ?type ?âge ?poids ?taille WHERE {{
@@ -307,27 +367,48 @@ class AdvancedNutritionQueryParser:
             BIND("" AS ?poids)
             BIND("" AS ?taille)
           }}
-          FILTER(REGEX(?nom, "{query_text}", "i"))
+          FILTER(REGEX(?nom, {format_param('regex', query_text)}, "i"))
         }} LIMIT 20
         """
 
 class AdvancedNutritionQueryParser:
     def __init__(self):
-        self.nlp = nlp
         self.entity_keywords = {
             "Personne": ["personne", "utilisateur", "patient", "client", "humain", "être", "âge", "poids", "taille"],
             "Aliment": ["aliment", "nourriture", "fruit", "légume", "viande", "poisson", "produit", "calorie"],
             "Recette": ["recette", "plat", "menu", "cuisine", "préparation", "ingrédient"],
             "ActivitePhysique": ["activité", "sport", "exercice", "entraînement", "course", "marche"]
         }
+        # Indices de contexte : (entité, poids) comptés une fois par groupe
+        self.context_keywords = [
+            ("Personne", 3, ["âge", "ans", "vieux", "jeune", "poids", "kg", "taille", "cm"]),
+            ("Aliment", 2, ["calorie", "fibre", "nutrition", "protéine", "vitamine"]),
+            ("Recette", 2, ["cuisiner", "préparer", "ingrédients", "temps de préparation"]),
+            ("ActivitePhysique", 2, ["brûler", "sport", "exercice", "entraînement", "durée"]),
+        ]
+        # Tous les mots-clés dans un seul automate : un seul passage sur le texte
+        self.keyword_matcher = KeywordMatcher(
+            [(keyword, ("keyword", entity_type, 2))
+             for entity_type, keywords in self.entity_keywords.items() for keyword in keywords]
+            + [(keyword, ("context", entity_type, weight))
+               for entity_type, weight, keywords in self.context_keywords for keyword in keywords]
+        )
+
+    @property
+    def nlp(self):
+        """SpaCy pipeline, or None until it is loaded (the fallback parser is used)"""
+        return spacy_loader.get()
         
     def parse_query(self, query_text):
         """Parse la requête avec analyse sémantique avancée"""
-        if self.nlp is None:
-            return self.fallback_parser(query_text)
+        nlp = self.nlp
+        if nlp is None:
+            with NLP_PARSE_LATENCY.time(parser="fallback"):
+                return self.fallback_parser(query_text)
         
-        print(f"🔍 [SpaCy] Analyse de: '{query_text}'")
-        doc = self.nlp(query_text.lower())
+        logger.debug("[SpaCy] Analyse de: '%s'", query_text)
+        with NLP_PARSE_LATENCY.time(parser="spacy"):
+            doc = nlp(query_text.lower())
         
         # Détection d'entité améliorée
         entity_type = self.detect_entity_advanced(doc, query_text)
@@ -341,11 +422,16 @@ class AdvancedNutritionQueryParser:
         """Détection d'entité avec scores pondérés"""
         scores = defaultdict(int)
         
-        # Score basé sur les mots-clés
-        for entity_type, keywords in self.entity_keywords.items():
-            for keyword in keywords:
-                if keyword in query_text.lower():
-                    scores[entity_type] += 2
+        # Score basé sur les mots-clés (chaque mot-clé trouvé) et le contexte (une fois par groupe)
+        contexts = set()
+        for payloads in self.keyword_matcher.find(query_text.lower()).values():
+            for kind, entity_type, weight in payloads:
+                if kind == "keyword":
+                    scores[entity_type] += weight
+                else:
+                    contexts.add((entity_type, weight))
+        for entity_type, weight in contexts:
+            scores[entity_type] += weight
         
         # Score basé sur l'analyse SpaCy
         for token in doc:
@@ -359,22 +445,9 @@ class AdvancedNutritionQueryParser:
                 elif self.is_activity_related(token):
                     scores["ActivitePhysique"] += 1
         
-        # Score basé sur le contexte
-        if any(word in query_text for word in ["âge", "ans", "vieux", "jeune", "poids", "kg", "taille", "cm"]):
-            scores["Personne"] += 3
-            
-        if any(word in query_text for word in ["calorie", "fibre", "nutrition", "protéine", "vitamine"]):
-            scores["Aliment"] += 2
-            
-        if any(word in query_text for word in ["cuisiner", "préparer", "ingrédients", "temps de préparation"]):
-            scores["Recette"] += 2
-            
-        if any(word in query_text for word in ["brûler", "sport", "exercice", "entraînement", "durée"]):
-            scores["ActivitePhysique"] += 2
-        
         if scores:
             best_entity = max(scores.items(), key=lambda x: x[1])
-            print(f"🎯 [SpaCy] Entité détectée: {best_entity[0]} (score: {best_entity[1]})")
+            logger.debug("[SpaCy] Entité détectée: %s (score: %s)", best_entity[0], best_entity[1])
             return best_entity[0]
         
         return "Aliment"  # Par défaut
@@ -406,7 +479,7 @@ class AdvancedNutritionQueryParser:
             ])
             
         # Extraction des critères numériques
-        self.extract_numerical_criteria(original_query, analysis)
+        self.extract_numerical_criteria(original_query, analysis, entity_type)
         
         # Extraction des critères qualitatifs
         self.extract_qualitative_criteria(doc, original_query, analysis)
@@ -416,77 +489,17 @@ class AdvancedNutritionQueryParser:
         
         return analysis
     
-    def extract_numerical_criteria(self, query_text, analysis):
-        """Extraction des critères numériques avec regex améliorée"""
-        print(f"🔢 [Extraction] Analyse des critères numériques")
-        
-        # Âge
-        age_patterns = [
-            r'âge\s*[:\s]*(\d{1,3})\s*(?:ans)?',
-            r'(\d{1,3})\s*ans',
-            r'plus\s*(?:que|de)\s*(\d{1,3})\s*ans',
-            r'moins\s*(?:que|de)\s*(\d{1,3})\s*ans',
-            r'supérieur\s*à\s*(\d{1,3})\s*ans',
-            r'inférieur\s*à\s*(\d{1,3})\s*ans'
-        ]
-        
-        for pattern in age_patterns:
-            matches = re.finditer(pattern, query_text, re.IGNORECASE)
-            for match in matches:
-                age_value = int(match.group(1))
-                if "plus" in match.group(0) or "supérieur" in match.group(0):
-                    analysis['filters'].append(f"(?âge > {age_value})")
-                    print(f"✅ Filtre âge: > {age_value} ans")
-                elif "moins" in match.group(0) or "inférieur" in match.group(0):
-                    analysis['filters'].append(f"(?âge < {age_value})")
-                    print(f"✅ Filtre âge: < {age_value} ans")
-                else:
-                    analysis['filters'].append(f"(?âge = {age_value})")
-                    print(f"✅ Filtre âge: = {age_value} ans")
-        
-        # Poids
-        poids_patterns = [
-            r'poids\s*[:\s]*(\d{2,3}(?:[.,]\d+)?)\s*(?:kg)?',
-            r'(\d{2,3}(?:[.,]\d+)?)\s*kg',
-            r'poids\s*(?:supérieur|plus)\s*à\s*(\d+)\s*kg',
-            r'poids\s*(?:inférieur|moins)\s*à\s*(\d+)\s*kg'
-        ]
-        
-        for pattern in poids_patterns:
-            matches = re.finditer(pattern, query_text, re.IGNORECASE)
-            for match in matches:
-                poids_value = float(match.group(1).replace(',', '.'))
-                if "supérieur" in match.group(0) or "plus" in match.group(0):
-                    analysis['filters'].append(f"(?poids > {poids_value})")
-                    print(f"✅ Filtre poids: > {poids_value} kg")
-                elif "inférieur" in match.group(0) or "moins" in match.group(0):
-                    analysis['filters'].append(f"(?poids < {poids_value})")
-                    print(f"✅ Filtre poids: < {poids_value} kg")
-                else:
-                    analysis['filters'].append(f"(?poids = {poids_value})")
-                    print(f"✅ Filtre poids: = {poids_value} kg")
-        
-        # Taille
-        taille_patterns = [
-            r'taille\s*[:\s]*(\d{2,3}(?:[.,]\d+)?)\s*(?:cm)?',
-            r'(\d{2,3}(?:[.,]\d+)?)\s*cm',
-            r'taille\s*(?:supérieur|plus)\s*à\s*(\d+)\s*cm',
-            r'taille\s*(?:inférieur|moins)\s*à\s*(\d+)\s*cm'
-        ]
-        
-        for pattern in taille_patterns:
-            matches = re.finditer(pattern, query_text, re.IGNORECASE)
-            for match in matches:
-                taille_value = float(match.group(1).replace(',', '.'))
-                if "supérieur" in match.group(0) or "plus" in match.group(0):
-                    analysis['filters'].append(f"(?taille > {taille_value})")
-                    print(f"✅ Filtre taille: > {taille_value} cm")
-                elif "inférieur" in match.group(0) or "moins" in match.group(0):
-                    analysis['filters'].append(f"(?taille < {taille_value})")
-                    print(f"✅ Filtre taille: < {taille_value} cm")
-                else:
-                    analysis['filters'].append(f"(?taille = {taille_value})")
-                    print(f"✅ Filtre taille: = {taille_value} cm")
+    def extract_numerical_criteria(self, query_text, analysis, entity_type):
+        """Extraction des critères numériques en un seul passage (query_criteria)"""
+        filters, attributes = criteria_filters(extract_criteria(query_text), entity_type)
+        for attribute in attributes:
+            var, predicate, _, _ = ATTRIBUTES[attribute]
+            if var not in analysis['additional_selects']:
+                analysis['additional_selects'].append(var)
+                analysis['additional_triples'].append(f"OPTIONAL {{ ?entity nutrition:{predicate} {var} }}")
+        analysis['filters'].extend(filters)
+        if filters:
+            logger.debug("Critères numériques: %s", filters)
     
     def extract_qualitative_criteria(self, doc, query_text, analysis):
         """Extraction des critères qualitatifs"""
@@ -496,28 +509,28 @@ class AdvancedNutritionQueryParser:
         if "faible calorie" in text_lower or "peu calorique" in text_lower:
             analysis['filters'].append("(?calories <= 150)")
             analysis['order_by'] = "?calories"
-            print("✅ Filtre: faible calories")
+            logger.debug("Filtre: faible calories")
             
         if "riche en fibre" in text_lower or "beaucoup de fibre" in text_lower:
             analysis['filters'].append("(?teneurFibres >= 5)")
             analysis['order_by'] = "DESC(?teneurFibres)"
-            print("✅ Filtre: riche en fibres")
+            logger.debug("Filtre: riche en fibres")
             
         if "faible ig" in text_lower or "index glycémique bas" in text_lower:
             analysis['filters'].append("(?indexGlycemique <= 55)")
             analysis['order_by'] = "?indexGlycemique"
-            print("✅ Filtre: faible index glycémique")
+            logger.debug("Filtre: faible index glycémique")
         
         # Critères pour les personnes
         if "jeune" in text_lower:
             analysis['filters'].append("(?âge <= 30)")
             analysis['order_by'] = "?âge"
-            print("✅ Filtre: jeune")
+            logger.debug("Filtre: jeune")
             
         if "âgé" in text_lower or "vieux" in text_lower or "senior" in text_lower:
             analysis['filters'].append("(?âge >= 60)")
             analysis['order_by'] = "DESC(?âge)"
-            print("✅ Filtre: âgé")
+            logger.debug("Filtre: âgé")
     
     def extract_name_search(self, query_text, analysis):
         """Extraction de la recherche par nom"""
@@ -533,7 +546,7 @@ class AdvancedNutritionQueryParser:
             if match:
                 name = match.group(1).strip()
                 analysis['search_patterns'].append(name)
-                print(f"✅ Recherche par nom: '{name}'")
+                logger.debug("Recherche par nom: '%s'", name)
                 break
     
     def build_sparql_query(self, entity_type, analysis, original_query):
@@ -546,11 +559,19 @@ class AdvancedNutritionQueryParser:
             "Personne": "?entity a nutrition:Personne ; nutrition:nom ?nom ."
         }
         
+        # Recherche par nom : les candidats de l'index des noms sont résolus à
+        # chaque recherche, la requête analysée restant valable entre deux écritures
+        name_clause = ""
+        if analysis['search_patterns']:
+            known_type = entity_type if entity_type in entity_mapping else "Aliment"
+            name_clause = deferred_name_constraint(analysis['search_patterns'][0], known_type)
+
         # Construction de la requête de base
         base_query = f"""
         PREFIX nutrition: <{ONTOLOGY_PREFIX}>
         PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
         SELECT DISTINCT ?id ?nom ?type ?score {' '.join(analysis['additional_selects'])} WHERE {{
+            {name_clause}
             {entity_mapping.get(entity_type, entity_mapping['Aliment'])}
             BIND("{entity_type}" AS ?type)
             BIND(STRAFTER(STR(?entity), "#") AS ?id)
@@ -561,29 +582,24 @@ class AdvancedNutritionQueryParser:
         for triple in analysis['additional_triples']:
             base_query += f"    {triple}\n"
         
-        # Ajouter la recherche par nom si spécifiée
-        if analysis['search_patterns']:
-            name_pattern = analysis['search_patterns'][0]
-            base_query += f'    FILTER(REGEX(?nom, "{name_pattern}", "i"))\n'
-        
         # Ajouter les filtres
         if analysis['filters']:
             base_query += "    FILTER(" + " && ".join(analysis['filters']) + ")\n"
         
         base_query += f"}} ORDER BY {analysis['order_by']} LIMIT 20"
         
-        print(f"📊 [SpaCy] Requête SPARQL générée pour {entity_type}")
-        print(f"🎯 [SpaCy] Filtres: {analysis['filters']}")
+        logger.debug("[SpaCy] Requête SPARQL générée pour %s", entity_type)
+        logger.debug("[SpaCy] Filtres: %s", analysis['filters'])
         return base_query
     
     def fallback_parser(self, query_text):
         """Parser de secours amélioré"""
-        print("🔄 [SpaCy] Utilisation du parser de secours")
+        logger.debug("[SpaCy] Utilisation du parser de secours")
         return self.build_advanced_fallback_query(query_text)
     
     def build_advanced_fallback_query(self, query_text):
         """Parser de secours avec extraction regex avancée"""
-        print(f"🔄 [Fallback] Analyse de: {query_text}")
+        logger.debug("[Fallback] Analyse de: %s", query_text)
         
         # Détection du type d'entité
         entity_type = "Aliment"  # Par défaut
@@ -619,7 +635,7 @@ class AdvancedNutritionQueryParser:
             ])
         
         # Extraction des critères
-        self.extract_numerical_criteria(query_text, analysis)
+        self.extract_numerical_criteria(query_text, analysis, entity_type)
         self.extract_name_search(query_text, analysis)
         
         return self.build_sparql_query(entity_type, analysis, query_text)
@@ -646,47 +662,6 @@ nutrition_parser = AdvancedNutritionQueryParser()
 
 
 
-def escape_sparql_string(s):
-    """Escape special characters in SPARQL string literals"""
-    if s is None:
-        return ""
-    s = str(s)
-    s = s.replace("\\", "\\\\")
-    s = s.replace('"', '\\"')
-    s = s.replace("\n", "\\n")
-    s = s.replace("\r", "\\r")
-    s = s.replace("\t", "\\t")
-    return s
-
-def build_sparql_value(value, data_type="string"):
-    """Build a properly formatted SPARQL value with type"""
-    if value is None:
-        return None
-    
-    if data_type == "string":
-        escaped = escape_sparql_string(value)
-        return f'"{escaped}"^^xsd:string'
-    elif data_type == "integer":
-        return f'"{int(value)}"^^xsd:integer'
-    elif data_type == "float":
-        return f'"{float(value)}"^^xsd:float'
-    elif data_type == "boolean":
-        return f'"{str(value).lower()}"^^xsd:boolean'
-    return None
-
-def check_fuseki_connection():
-    """Check if Fuseki is accessible"""
-    try:
-        response = requests.get(
-            f"{FUSEKI_URL}/$/ping",
-            timeout=5,
-            auth=HTTPBasicAuth(FUSEKI_USERNAME, FUSEKI_PASSWORD)
-        )
-        return response.status_code == 200
-    except Exception as e:
-        print(f"[v0] Fuseki connection error: {str(e)}")
-        return False
-
 def generate_uri(entity_type, entity_id=None):
     """Generate a URI for an entity - VERSION DEBUG"""
     if entity_id is None:
@@ -700,213 +675,770 @@ def generate_uri(entity_type, entity_id=None):
     else:
         uri = f"{ONTOLOGY_PREFIX}{entity_type}_{entity_id}"
     
-    print(f"🚨 [DEBUG URI] Type: {entity_type}, ID: {entity_id}")
-    print(f"🚨 [DEBUG URI] Generated: {uri}")
+    logger.debug("URI générée pour %s (%s): %s", entity_type, entity_id, uri)
     return uri
 
-def sparql_update(query):
-    """Execute a SPARQL UPDATE query"""
+def fuseki_labels(kind, query_id):
+    """Labels of the Fuseki metrics; ad-hoc queries share one query_id"""
+    return {"kind": kind, "query_id": query_id or "adhoc"}
+
+class FusekiCall:
+    """What one Fuseki request returned: status, size, row count, errors"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.status = None
+        self.bytes = None
+        self.rows = None
+        self.error = None
+
+    def received(self, status, size=None):
+        """Stop the clock once the store has answered"""
+        self.seconds = time.perf_counter() - self.started
+        self.status = status
+        self.bytes = size
+
+    @property
+    def ok(self):
+        return self.error is None and self.status in (200, 204)
+
+@contextmanager
+def fuseki_call(kind, query_id, query):
+    """Record one Fuseki request in the metrics, the query log and the slow-query log.
+
+    Inside the block, call.received(status, size) stops the clock as soon as
+    the response is in, so decoding it afterwards (to fill call.rows) is not
+    counted as Fuseki time. An exception or a status other than 200/204
+    counts as a failure. A store that cannot be reached (no answer or a 5xx)
+    makes the health monitor check it right away.
+    """
+    call = FusekiCall()
+    try:
+        yield call
+    except Exception as e:
+        call.error = str(e)
+        if not isinstance(e, StorageError) or (e.status or 0) >= 500:
+            health_monitor.report_failure()
+        raise
+    finally:
+        if call.seconds is None:
+            call.seconds = time.perf_counter() - call.started
+        labels = fuseki_labels(kind, query_id)
+        FUSEKI_LATENCY.observe(call.seconds, **labels)
+        if not call.ok:
+            FUSEKI_ERRORS.inc(**labels)
+        query_log.record(kind, query_id, query, call.seconds, call.status, call.error)
+        if call.seconds * 1000 >= slow_query_log.threshold_ms:
+            in_request = has_request_context()
+            slow_query_log.record(
+                kind, query_id, query, call.seconds,
+                route=g.get("metrics_route") if in_request else None,
+                search_text=g.get("search_text") if in_request else None,
+                rows=call.rows, size=call.bytes, status=call.status, error=call.error,
+            )
+
+def invalidate_caches(tags=()):
+    """Forget what a successful write may have changed
+
+    Every cached search is invalidated, and so are the cached query results
+    carrying one of `tags` (which also bumps their generation, so a read in
+    flight cannot cache what it saw before the write).
+    """
+    search_cache.bump_version()
+    if tags:
+        query_cache.invalidate(*tags)
+
+def sparql_update(query, tags=(), query_id=None):
+    """Execute a SPARQL UPDATE query
+
+    On success, cached query results carrying one of `tags` are invalidated.
+    `query_id` names the registered template the update was rendered from.
+    """
     try:
         # Ajouter les préfixes nécessaires
-        full_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-        {query}
-        """
-        print(f"[v0] SPARQL Update:\n{full_query}\n")
-        response = requests.post(
-            SPARQL_UPDATE_ENDPOINT,
-            data={"update": full_query},
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
-            auth=HTTPBasicAuth(FUSEKI_USERNAME, FUSEKI_PASSWORD),
-            timeout=10
-        )
+        full_query = f"{SPARQL_PREFIXES}{query}"
+        with fuseki_call("update", query_id, query) as call:
+            get_storage().update(full_query, call)
+        invalidate_caches(tags)
+        return True, ""
+    except StorageError as e:
+        return False, e.detail or str(e)
+    except Exception as e:
+        logger.error("Update Error: %s", e)
+        return False, str(e)
+
+def sparql_query(query, tags=None, query_id=None):
+    """Execute a SPARQL SELECT query
+
+    With `tags` (the entity types the query reads), the result is served from
+    the query cache until a write invalidates one of those tags. `query_id`
+    names the registered template the query was rendered from.
+    """
+    if tags is not None:
+        cached = query_cache.get(query)
+        if cached is not None:
+            return cached
+        # Relevée avant la requête : une écriture concurrente empêche la mise en cache
+        generation = query_cache.generation(tags)
+    try:
+        # Ajouter les préfixes nécessaires
+        full_query = f"{SPARQL_PREFIXES}{query}"
+        with fuseki_call("query", query_id, query) as call:
+            result = get_storage().select(full_query, call)
+            call.rows = len(result.get('results', {}).get('bindings', []))
+        logger.debug("Query returned %d results", call.rows)
+        if tags is not None:
+            query_cache.set(query, result, tags, call.bytes, generation)
+        return result
+    except Exception as e:
+        logger.error("Query Error: %s", e)
+        return {"results": {"bindings": []}, "error": str(e)}
+
+def sparql_query_compact(query, tags=None, query_id=None):
+    """Execute a SPARQL SELECT and return {"columns": [...], "rows": [[...]]}
+
+    Fuseki is asked for TSV, which is cheaper to parse than SPARQL JSON and
+    keeps datatypes, so numbers and booleans come back as native values; the
+    embedded store hands them over directly.
+    """
+    cache_key = ("compact", query)
+    if tags is not None:
+        cached = query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        generation = query_cache.generation(tags)
+    try:
+        full_query = f"{SPARQL_PREFIXES}{query}"
+        with fuseki_call("query", query_id, query) as call:
+            columns, rows = get_storage().select_rows(full_query, call)
+            call.rows = len(rows)
+        result = {"columns": columns, "rows": rows}
+        logger.debug("Query returned %d results", len(rows))
+        if tags is not None:
+            query_cache.set(cache_key, result, tags, call.bytes, generation)
+        return result
+    except Exception as e:
+        logger.error("Query Error: %s", e)
+        return {"columns": [], "rows": [], "error": str(e)}
+
+async def sparql_update_async(query, tags=(), query_id=None):
+    """Execute a SPARQL UPDATE query on the shared event loop
+
+    Caches are invalidated exactly as by sparql_update.
+    """
+    client = get_storage().async_client()
+    if client is None:
+        return await asyncio.to_thread(sparql_update, query, tags, query_id)
+    try:
+        full_query = f"{SPARQL_PREFIXES}{query}"
+        with fuseki_call("update", query_id, query) as call:
+            response = await client.update(full_query)
+            call.received(response.status_code)
         success = response.status_code == 200 or response.status_code == 204
         if not success:
-            print(f"[v0] Update Error: {response.status_code} - {response.text[:300]}")
+            logger.error("Async Update Error: %s - %s", response.status_code, response.text[:300])
         else:
-            print(f"[v0] Update successful")
+            invalidate_caches(tags)
         return success, response.text if not success else ""
     except Exception as e:
-        print(f"[v0] Update Error: {str(e)}")
+        logger.error("Async Update Error: %s", e)
         return False, str(e)
 
-def sparql_query(query):
-    """Execute a SPARQL SELECT query"""
+async def sparql_query_async(query, tags=None, query_id=None):
+    """Execute a SPARQL SELECT query on the shared event loop"""
+    client = get_storage().async_client()
+    if client is None:
+        # to_thread copie le contexte : le routeur y voit la dernière écriture du client
+        return await asyncio.to_thread(sparql_query, query, tags, query_id)
+    if tags is not None:
+        cached = query_cache.get(query)
+        if cached is not None:
+            return cached
+        generation = query_cache.generation(tags)
     try:
-        # Ajouter les préfixes nécessaires
-        full_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-        {query}
-        """
-        print(f"[v0] SPARQL Query:\n{full_query}\n")
-        response = requests.post(
-            SPARQL_QUERY_ENDPOINT,
-            data={"query": full_query},
-            headers={"Accept": "application/sparql-results+json"},
-            auth=HTTPBasicAuth(FUSEKI_USERNAME, FUSEKI_PASSWORD),
-            timeout=10
-        )
+        full_query = f"{SPARQL_PREFIXES}{query}"
+        with fuseki_call("query", query_id, query) as call:
+            response = await client.query(full_query)
+            call.received(response.status_code, len(response.content))
+            if response.status_code == 200:
+                result = response.json()
+                call.rows = len(result.get('results', {}).get('bindings', []))
         if response.status_code == 200:
-            result = response.json()
-            bindings = result.get('results', {}).get('bindings', [])
-            print(f"[v0] Query returned {len(bindings)} results")
+            if tags is not None:
+                query_cache.set(query, result, tags, call.bytes, generation)
             return result
-        else:
-            print(f"[v0] SPARQL Query Error: {response.status_code} - {response.text[:300]}")
-            return {"results": {"bindings": []}, "error": f"HTTP {response.status_code}"}
+        logger.error("Async SPARQL Query Error: %s - %s", response.status_code, response.text[:300])
+        return {"results": {"bindings": []}, "error": f"HTTP {response.status_code}"}
     except Exception as e:
-        print(f"[v0] Query Error: {str(e)}")
+        logger.error("Async Query Error: %s", e)
         return {"results": {"bindings": []}, "error": str(e)}
 
+def sparql_query_many(*queries, tags=None):
+    """Run several SPARQL SELECT queries concurrently, results in the same order"""
+    async def gather_all():
+        return await asyncio.gather(*(sparql_query_async(q, tags) for q in queries))
+    return run_async(gather_all())
+
+# ==================== NAME INDEX ====================
+
+def load_name_rows():
+    """(uri, class, name) of every named entity in the dataset"""
+    result = sparql_query(render_query("names.all"), query_id="names.all")
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return [
+        (binding["entity"]["value"], binding.get("type", {}).get("value"), binding["nom"]["value"])
+        for binding in result["results"]["bindings"]
+    ]
+
+def load_indexed_names():
+    """Rows for the name index; the autocomplete trie is rebuilt from the same read"""
+    autocomplete.begin_load()
+    try:
+        rows = load_name_rows()
+    except Exception:
+        autocomplete.abort_load()
+        raise
+    autocomplete.load_names((uri, name) for uri, _, name in rows)
+    return rows
+
+def ensure_name_index(force=False):
+    """Start (re)building the name index when missing, older than NAME_INDEX_TTL or forced.
+
+    Writes made outside this process (other workers, init_data.py,
+    generate_data.py, direct updates) only reach the index through these
+    rebuilds. The current index keeps serving until the new one is ready;
+    failed attempts are retried at most every 30s.
+    """
+    if not NAME_INDEX_ENABLED:
+        return
+    if force:
+        name_index.build_async(load_indexed_names, retry_after=0)
+    elif not name_index.ready or (NAME_INDEX_TTL and name_index.age() >= NAME_INDEX_TTL):
+        name_index.build_async(load_indexed_names)
+
+def name_constraint(name, entity_class=None):
+    """SPARQL restricting ?entity to the entities whose name contains `name`.
+
+    Candidates come from the in-process name index as a VALUES block, so
+    Fuseki no longer regex-matches every name of the type. Until the index
+    is built, when the fragment matches too many entities, or when it
+    matches none (the entity may have been written since the last rebuild),
+    this falls back to FILTER(REGEX(?nom ...)).
+    """
+    ensure_name_index()
+    uris = name_index.search(name, entity_class) if NAME_INDEX_ENABLED else None
+    if not uris or len(uris) > NAME_INDEX_MAX_CANDIDATES:
+        return f'FILTER(REGEX(?nom, {format_param("regex", name)}, "i"))'
+    return f"VALUES ?entity {{ {format_param('values:iri', uris)} }}"
+
+# Marque d'une contrainte de nom à résoudre : le JSON (ASCII) ne peut contenir les délimiteurs
+_NAME_MARKER = re.compile("\ue000(.*?)\ue001")
+
+def deferred_name_constraint(name, entity_class=None):
+    """Placeholder for name_constraint(name, entity_class), see resolve_name_constraints"""
+    return "\ue000" + json.dumps([name, entity_class]) + "\ue001"
+
+def resolve_name_constraints(sparql):
+    """Replace the placeholders of deferred_name_constraint with the current constraints
+
+    A parsed search can then be cached while its candidates follow the index.
+    """
+    return _NAME_MARKER.sub(lambda m: name_constraint(*json.loads(m.group(1))), sparql)
+
+def set_indexed_names(uri, entity_class, names):
+    """Replace the names of `uri` in the name index and the autocomplete trie"""
+    name_index.set_names(uri, entity_class, names)
+    autocomplete.set_names(uri, names)
+
+def add_indexed_names(uri, entity_class, names):
+    name_index.add_names(uri, entity_class, names)
+    autocomplete.add_names(uri, names)
+
+def remove_indexed_names(uri):
+    name_index.remove(uri)
+    autocomplete.remove(uri)
+
+def index_entity_name(entity, uri, data, created=False):
+    """Mirror the nutrition:nom written by a create or a patch"""
+    name = written_name(entity, data, created)
+    if name is not None:
+        set_indexed_names(uri, ENTITY_LISTS[entity]["class"], [name])
+
+# ==================== LIST ENDPOINTS ====================
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+def wants_ndjson():
+    """True when the client asked for `Accept: application/x-ndjson`"""
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(query, limit=None):
+    """Stream a SELECT as NDJSON, one flattened row per line.
+
+    Rows are decoded from the store's response as it arrives, so memory
+    stays flat whatever the result size. When `limit` is given (keyset page of
+    that many entities), a final `{"next_cursor": ...}` line announces the
+    following page.
+    """
+    try:
+        # Le flux est chronométré jusqu'à la réception des en-têtes
+        with fuseki_call("stream", None, query) as call:
+            bindings = get_storage().stream_bindings(f"{SPARQL_PREFIXES}{query}", call)
+    except Exception as e:
+        logger.error("Stream Query Error: %s", e)
+        return jsonify({"error": str(e)}), 502
+
+    def generate():
+        try:
+            last_uri = None
+            entities = 0
+            for binding in bindings:
+                row = flatten_binding(binding)
+                uri = row.pop("s", None)
+                if uri != last_uri:
+                    if limit is not None and entities == limit:
+                        yield json.dumps({"next_cursor": encode_cursor(last_uri)}) + "\n"
+                        break
+                    entities += 1
+                    last_uri = uri
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+        finally:
+            bindings.close()
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def response_format():
+    """Value of the `format` query parameter ("json" or "compact")"""
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'compact'):
+        raise ValueError("format doit valoir 'json' ou 'compact'")
+    return fmt
+
+def compact_response(query, tags, limit=None, query_id=None):
+    """Return a SELECT as {"columns", "rows"}, paginated like the JSON lists"""
+    result = sparql_query_compact(query, tags=tags, query_id=query_id)
+    columns, rows = result["columns"], result["rows"]
+    next_cursor = None
+    if "s" in columns:
+        # Le résultat peut venir du cache : on construit de nouvelles listes
+        s_index = columns.index("s")
+        if limit is not None:
+            keep, last_uri = page_cut([row[s_index] for row in rows], limit)
+            rows = rows[:keep]
+            next_cursor = encode_cursor(last_uri) if last_uri else None
+        columns = [c for i, c in enumerate(columns) if i != s_index]
+        rows = [[v for i, v in enumerate(row) if i != s_index] for row in rows]
+    body = {"columns": columns, "rows": rows}
+    if "error" in result:
+        body["error"] = result["error"]
+    response = jsonify(body)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+def bindings_response(query, tags, query_id=None):
+    """Return the bindings of a SELECT as JSON, compact rows or NDJSON"""
+    try:
+        fmt = response_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt == 'compact':
+        return compact_response(query, tags, query_id=query_id)
+    if wants_ndjson():
+        return ndjson_response(query)
+    results = sparql_query(query, tags=tags, query_id=query_id)
+    return jsonify(results.get("results", {}).get("bindings", []))
+
+def list_entities(entity):
+    """Serve a list endpoint with optional keyset pagination and field projection
+
+    Without `limit`/`cursor` the whole list is returned as before. With them,
+    at most `limit` entities are returned (all the rows of each, so a
+    multi-valued field can yield more rows) and the token for the next page, if
+    any, is sent in the X-Next-Cursor header. `format=compact` returns
+    {"columns": [...], "rows": [[...]]} with numbers already converted.
+    """
+    try:
+        fields = parse_fields(entity, request.args.get('fields'))
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor) if cursor else None
+        limit = request.args.get('limit')
+        if limit is not None:
+            if not limit.isdigit():
+                raise ValueError("limit doit être un entier")
+            limit = int(limit)
+        elif after is not None:
+            limit = DEFAULT_PAGE_SIZE
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit doit être compris entre 1 et {MAX_PAGE_SIZE}")
+        fmt = response_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = build_list_query(entity, fields, after, limit)
+    if fmt == 'compact':
+        return compact_response(query, (entity,), limit)
+    if limit is None:
+        return bindings_response(query, tags=(entity,))
+    if wants_ndjson():
+        return ndjson_response(query, limit)
+
+    results = sparql_query(query, tags=(entity,))
+    bindings = results.get("results", {}).get("bindings", [])
+
+    keep, last_uri = page_cut([binding["s"]["value"] for binding in bindings], limit)
+    bindings = bindings[:keep]
+    next_cursor = encode_cursor(last_uri) if last_uri else None
+    # Le résultat peut venir du cache : on ne modifie pas les bindings en place
+    bindings = [{k: v for k, v in binding.items() if k != "s"} for binding in bindings]
+    response = jsonify(bindings)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+def warm_query_cache():
+    """Pre-load the unpaginated entity lists into the query cache"""
+    for entity in ENTITY_LISTS:
+        sparql_query(build_list_query(entity), tags=(entity,))
+    logger.info("[Cache] Préchargement terminé: %d entrées", query_cache.stats()['entries'])
+
+# ==================== ADMIN ====================
+
+@app.route('/api/admin/cache', methods=['GET'])
+def get_cache_stats():
+    """Hit/miss statistics of the query cache and of the search cache tiers"""
+    return jsonify({**query_cache.stats(), "search": search_cache.stats()})
+
+@app.route('/api/admin/cache', methods=['DELETE'])
+def clear_cache():
+    """Empty the query cache and the search cache, and rebuild the name index"""
+    query_cache.clear()
+    search_cache.clear()
+    ensure_name_index(force=True)
+    return jsonify({"success": True})
+
+@app.route('/api/admin/queries', methods=['GET'])
+def get_recent_queries():
+    """Most recent Fuseki requests, filtered by ?kind=, ?query_id= or ?trace_id="""
+    try:
+        limit = min(int(request.args.get('limit', 50)), QUERY_LOG_SIZE)
+    except ValueError:
+        return jsonify({"success": False, "error": "limit doit être un entier"}), 400
+    return jsonify({
+        **query_log.stats(),
+        "queries": query_log.recent(
+            limit,
+            kind=request.args.get('kind'),
+            query_id=request.args.get('query_id'),
+            trace_id=request.args.get('trace_id'),
+        ),
+    })
+
+# ==================== DEBUG ====================
+
+@app.route('/api/debug/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """Fuseki requests over SLOW_QUERY_MS, most recent first and grouped by query shape"""
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit doit être un entier"}), 400
+    return jsonify({
+        **slow_query_log.stats(),
+        "shapes": slow_query_log.shapes(),
+        "queries": slow_query_log.recent(limit),
+    })
+
+@app.route('/api/debug/slow-queries', methods=['DELETE'])
+def clear_slow_queries():
+    slow_query_log.clear()
+    return jsonify({"success": True})
+
+# ==================== METRICS ====================
+
+@app.before_request
+def start_request_trace():
+    g.trace_id = start_trace(request.headers.get("X-Request-ID"))
+
+# Lire ses écritures : heure de la dernière écriture du client, renvoyée par cookie
+# (ou en-tête pour les clients d'API) pour que seules ses lectures aillent au primaire
+LAST_WRITE_COOKIE = "fuseki_last_write"
+LAST_WRITE_HEADER = "X-Fuseki-Last-Write"
+
+@app.before_request
+def restore_client_last_write():
+    if not REPLICA_READS:
+        return
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    try:
+        last_write = float(value) if value else None
+    except ValueError:
+        last_write = None
+    g.client_last_write = last_write
+    g.client_last_write_token = set_client_last_write(last_write)
+
+@app.after_request
+def remember_client_last_write(response):
+    if "client_last_write_token" in g:
+        last_write = client_last_write()
+        if last_write is not None and last_write != g.client_last_write:
+            response.set_cookie(LAST_WRITE_COOKIE, repr(last_write), max_age=max(1, math.ceil(FUSEKI_STICKY_SECONDS)),
+                                httponly=True, samesite="Lax")
+            response.headers[LAST_WRITE_HEADER] = repr(last_write)
+    return response
+
+@app.teardown_request
+def forget_client_last_write(exc):
+    token = g.pop("client_last_write_token", None)
+    if token is not None:
+        reset_client_last_write(token)
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    # Le gabarit de route, pas le chemin, pour borner le nombre de séries
+    g.metrics_route = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_IN_FLIGHT.inc(route=g.metrics_route)
+    g.metrics_in_flight = True
+
+# Routes servies sans le store : elles restent disponibles quand il est injoignable
+STORE_FREE_ENDPOINTS = {
+    "health_check", "get_metrics", "get_cache_stats", "clear_cache", "get_recent_queries",
+    "get_slow_queries", "clear_slow_queries", "get_search_examples", "get_search_suggestions",
+    "get_autocomplete", "get_recommandations_generation",
+}
+# Routes POST qui ne font que lire : servies par les réplicas comme les GET
+READ_ONLY_POST_ENDPOINTS = {"semantic_search"}
+
+def is_read_request():
+    if request.method in ("GET", "HEAD"):
+        return True
+    return request.method == "POST" and request.endpoint in READ_ONLY_POST_ENDPOINTS
+
+@app.before_request
+def fail_fast_when_store_down():
+    """Answer 503 at once while the store breaker is open, instead of waiting for timeouts.
+
+    Writes need the primary; reads only need one live read node.
+    """
+    if not HEALTH_FAST_FAIL or request.method == "OPTIONS":
+        return None
+    if request.endpoint is None or request.endpoint in STORE_FREE_ENDPOINTS:
+        return None
+    if health_monitor.read_available if is_read_request() else health_monitor.available:
+        return None
+    HTTP_FAST_FAILED.inc(route=g.metrics_route)
+    retry_after = max(1, round(health_monitor.breaker.retry_after()))
+    response = jsonify({
+        "success": False,
+        "error": "Base de connaissances (Fuseki) indisponible, nouvel essai automatique en cours",
+        "retry_after": retry_after,
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+def record_request_metrics(status, size=None):
+    labels = {"method": request.method, "route": g.metrics_route}
+    HTTP_LATENCY.observe(time.perf_counter() - g.metrics_started, **labels)
+    HTTP_REQUESTS.inc(status=status, **labels)
+    if status >= 400:
+        HTTP_ERRORS.inc(status=status, **labels)
+    if size is not None:
+        HTTP_RESPONSE_SIZE.observe(size, **labels)
+    g.metrics_recorded = True
+
+@app.after_request
+def add_trace_header(response):
+    if "trace_id" in g:
+        response.headers["X-Request-ID"] = g.trace_id
+    return response
+
+@app.after_request
+def observe_response(response):
+    if "metrics_started" in g:
+        # Réponses en flux : la taille n'est pas connue ici
+        size = None if response.is_streamed else response.calculate_content_length()
+        record_request_metrics(response.status_code, size)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if "metrics_started" not in g:
+        return
+    if "metrics_recorded" not in g:
+        # Exception non gérée : after_request n'a pas été appelé
+        record_request_metrics(500)
+    # Une réponse en flux peut déclencher le teardown une seconde fois
+    if g.pop("metrics_in_flight", False):
+        HTTP_IN_FLIGHT.dec(route=g.metrics_route)
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Request, Fuseki, NLP and serialization metrics in the Prometheus text format"""
+    FUSEKI_UP.set(1 if health_monitor.ok else 0)
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_MIMETYPE)
+
 # ==================== HEALTH CHECK ====================
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Check if backend and Fuseki are running"""
-    fuseki_ok = check_fuseki_connection()
+    """Backend and Fuseki status, from the background health monitor's last check"""
+    if health_monitor.ok is None:
+        # Pas encore de résultat (démarrage) : une vérification immédiate
+        health_monitor.check()
     return jsonify({
         "backend": "ok",
-        "fuseki": "ok" if fuseki_ok else "error",
+        "fuseki": "ok" if health_monitor.ok else "error",
+        "fuseki_check": health_monitor.stats(),
+        "storage": get_storage().stats(),
         "fuseki_url": FUSEKI_URL,
-        "dataset": DATASET_NAME
+        "dataset": DATASET_NAME,
+        "nlp": spacy_loader.stats(),
+        "names": name_index.stats(),
+        "autocomplete": autocomplete.stats(),
     })
 
-# ==================== PERSONNE CRUD ====================
-
-@app.route('/api/personnes', methods=['GET'])
-def get_personnes():
-    """Get all persons"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom ?âge ?poids ?taille ?objectifPoids WHERE {{
-        ?person a nutrition:Personne ;
-                nutrition:nom ?nom ;
-                nutrition:âge ?âge ;
-                nutrition:poids ?poids ;
-                nutrition:taille ?taille .
-        OPTIONAL {{ ?person nutrition:objectifPoids ?objectifPoids }}
-        BIND(STRAFTER(STR(?person), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+# ==================== WRITE HELPERS ====================
 
-@app.route('/api/personnes', methods=['POST'])
-def create_personne():
-    """Create a new person"""
+def create_entity(entity):
+    """Create one entity of the given list from the JSON body of the request"""
     try:
         data = request.json
-        
-        # Generate a stable person_id
-        person_id = data.get('id')
-        if not person_id:
-            person_id = uuid.uuid4().hex[:8]  # short UUID only
-        
-        person_uri = generate_uri("personne", person_id)
-        
-        # Build your triples
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        age_val = build_sparql_value(data.get('âge', 0), 'integer')
-        poids_val = build_sparql_value(data.get('poids', 0.0), 'float')
-        taille_val = build_sparql_value(data.get('taille', 0.0), 'float')
-        
-        triples = f"""
-            <{person_uri}> a nutrition:Personne ;
-                           nutrition:nom {nom_val} ;
-                           nutrition:âge {age_val} ;
-                           nutrition:poids {poids_val} ;
-                           nutrition:taille {taille_val}"""
-        
-        if data.get('objectifPoids'):
-            objectifPoids_val = build_sparql_value(data.get('objectifPoids'), 'float')
-            triples += f" ;\n                           nutrition:objectifPoids {objectifPoids_val}"
-        
-        triples += " ."
-        
-        insert_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(insert_query)
-        
+        entity_id = new_entity_id(entity, data)
+        uri = entity_uri(ENTITY_SCHEMAS[entity]["uri_type"], entity_id)
+        triples = build_entity_triples(entity, uri, data)
+
+        success, error = sparql_update(f"INSERT DATA {{\n{triples}\n}}", tags=(entity,))
         if success:
-            # ✅ This is the correct place to return the ID to the frontend
-            return jsonify({"success": True, "id": person_id}), 201
+            index_entity_name(entity, uri, data, created=True)
+            return jsonify({"success": True, "id": entity_id}), 201
         else:
             return jsonify({"success": False, "error": error}), 400
-        
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid data format: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
-@app.route('/api/personnes/<person_id>', methods=['PUT'])
-def update_personne(person_id):
-    """Update a person"""
+def update_entity(entity, entity_id):
+    """Patch one entity with the properties present in the JSON body.
+
+    The change is sent as a single DELETE/INSERT/WHERE update, so readers
+    never see the entity half-written and a failure leaves it unchanged.
+    Its WHERE clause requires the entity, so an unknown id writes nothing,
+    atomically. An unknown entity is a 404, but SPARQL Update does not say
+    whether anything matched: when the name index already knows the entity,
+    the patch is the only round trip; otherwise an ASK follows it to choose
+    between 200 and 404. The index is the trade-off: an entity deleted
+    concurrently or by another writer may still get a 200 for a no-op patch.
+    """
     try:
-        data = request.json
-        person_uri = generate_uri("personne", person_id)
-        
-        # Delete old data
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{person_uri}> ?p ?o }}
-        WHERE {{ <{person_uri}> ?p ?o }}
-        """
-        sparql_update(delete_query)
-        
-        # Insert new data
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        age_val = build_sparql_value(data.get('âge', 0), 'integer')
-        poids_val = build_sparql_value(data.get('poids', 0.0), 'float')
-        taille_val = build_sparql_value(data.get('taille', 0.0), 'float')
-        
-        triples = f"""
-            <{person_uri}> a nutrition:Personne ;
-                           nutrition:nom {nom_val} ;
-                           nutrition:âge {age_val} ;
-                           nutrition:poids {poids_val} ;
-                           nutrition:taille {taille_val}"""
-        
-        if data.get('objectifPoids'):
-            objectifPoids_val = build_sparql_value(data.get('objectifPoids'), 'float')
-            triples += f" ;\n                           nutrition:objectifPoids {objectifPoids_val}"
-        
-        triples += " ."
-        
-        insert_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(insert_query)
+        uri = entity_uri(ENTITY_SCHEMAS[entity]["uri_type"], validate_id(entity_id))
+        data = request.get_json() or {}
+        update_query = build_patch_update(entity, uri, data)
+        entity_class = ENTITY_LISTS[entity]["class"]
+        known = name_index.ready and name_index.contains(uri, entity_class)
+        success, error = sparql_update(update_query, tags=(entity,))
+        if not success:
+            return jsonify({"success": False, "error": error}), 400
+        if not known:
+            exists = sparql_query(render_query("entity.exists", uri=uri,
+                                               entity_class=nutrition_iri(entity_class)),
+                                  query_id="entity.exists")
+            if "error" in exists:
+                return jsonify({"success": False, "error": exists["error"]}), 502
+            if not exists.get("boolean"):
+                return jsonify({"success": False, "error": f"Entité introuvable: {entity_id}"}), 404
+        index_entity_name(entity, uri, data)
+        return jsonify({"success": True, "error": ""})
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid data format: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+def delete_entity(entity, entity_id):
+    """Delete every statement whose subject is the given entity"""
+    try:
+        uri = entity_uri(ENTITY_SCHEMAS[entity]["uri_type"], validate_id(entity_id))
+        success, error = sparql_update(render_query("entity.delete", uri=uri),
+                                       tags=(entity,), query_id="entity.delete")
+        if success:
+            remove_indexed_names(uri)
         return jsonify({"success": success, "error": error if not success else ""})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
+# ==================== DASHBOARD ====================
+
+DASHBOARD_ENTITIES = ("personnes", "aliments", "activites", "recommandations")
+
+def binding_number(binding, var):
+    """Numeric value of a binding variable, or None when unbound"""
+    if var not in binding:
+        return None
+    return round(float(binding[var]["value"]), 2)
+
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard():
+    """Counts, averages and latest items for the dashboard in one payload"""
+    counts_query = build_count_query(DASHBOARD_ENTITIES)
+    personnes_query = render_query("dashboard.personnes_averages")
+    aliments_query = render_query("dashboard.aliments_averages")
+    recent_query = render_query("dashboard.recent_recommandations", limit=5)
+    results = sparql_query_many(counts_query, personnes_query, aliments_query, recent_query,
+                                tags=DASHBOARD_ENTITIES)
+    errors = [r["error"] for r in results if "error" in r]
+    if errors:
+        return jsonify({"success": False, "error": errors[0]}), 502
+
+    counts_res, personnes_res, aliments_res, recent_res = [
+        r.get("results", {}).get("bindings", []) for r in results
+    ]
+    counts = {entity: 0 for entity in DASHBOARD_ENTITIES}
+    for binding in counts_res:
+        counts[binding["entity"]["value"]] = int(binding["count"]["value"])
+    personnes_avg = personnes_res[0] if personnes_res else {}
+    aliments_avg = aliments_res[0] if aliments_res else {}
+
+    return jsonify({
+        "counts": counts,
+        "averages": {
+            "âge": binding_number(personnes_avg, "âge"),
+            "poids": binding_number(personnes_avg, "poids"),
+            "taille": binding_number(personnes_avg, "taille"),
+            "calories": binding_number(aliments_avg, "calories"),
+            "indexGlycémique": binding_number(aliments_avg, "indexGlycémique"),
+        },
+        "recent_recommandations": [
+            {key: binding[key]["value"] for key in binding} for binding in recent_res
+        ],
+    })
+
+# ==================== PERSONNE CRUD ====================
+
+@app.route('/api/personnes', methods=['GET'])
+def get_personnes():
+    """Get all persons"""
+    return list_entities("personnes")
+
+@app.route('/api/personnes', methods=['POST'])
+def create_personne():
+    """Create a new person"""
+    return create_entity("personnes")
+
+@app.route('/api/personnes/<person_id>', methods=['PUT'])
+def update_personne(person_id):
+    """Update a person"""
+    return update_entity("personnes", person_id)
+
 
 
 @app.route('/api/personnes/<person_id>', methods=['DELETE'])
 def delete_personne(person_id):
     """Delete a person"""
-    try:
-        print("DELETE PERSONNE CALLED WITH:", person_id)
-        person_uri = generate_uri("personne", person_id)
-        print("PERSON URI TO DELETE:", person_uri)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{person_uri}> ?p ?o }}
-        WHERE {{ <{person_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("personnes", person_id)
 
 
 
@@ -918,45 +1450,9 @@ def delete_personne(person_id):
 @app.route('/api/relations-personnes', methods=['GET'])
 def get_all_relations_personnes():
     """Get all person relations - VERSION ULTRA SIMPLE"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?personneId ?personneNom ?typeRelation ?cibleId ?cibleNom WHERE {{
-        # Trouve TOUTES les relations, même si la personne n'a pas de nom
-        {{
-            ?personne nutrition:aAllergie ?cible .
-            BIND("ALLERGIE" AS ?typeRelation)
-            OPTIONAL {{ ?cible nutrition:nom ?cibleNom }}
-        }}
-        UNION
-        {{
-            ?personne nutrition:aCondition ?cible .
-            BIND("CONDITION" AS ?typeRelation)
-            OPTIONAL {{ ?cible nutrition:nom ?cibleNom }}
-        }}
-        UNION
-        {{
-            ?personne nutrition:aPreference ?cible .
-            BIND("PREFERENCE" AS ?typeRelation)
-            OPTIONAL {{ ?cible nutrition:nom ?cibleNom }}
-        }}
-        UNION
-        {{
-            ?personne nutrition:participeÀ ?cible .
-            BIND("OBJECTIF" AS ?typeRelation)
-            OPTIONAL {{ ?cible nutrition:nom ?cibleNom }}
-        }}
-        
-        # OPTIONAL pour le nom de la personne
-        OPTIONAL {{ ?personne nutrition:nom ?personneNom }}
-        BIND(STRAFTER(STR(?personne), "#") AS ?personneId)
-        BIND(STRAFTER(STR(?cible), "#") AS ?cibleId)
-    }}
-    ORDER BY ?personneNom ?typeRelation
-    """
-    print(f"[DEBUG] SPARQL Query: {query}")
-    results = sparql_query(query)
-    print(f"[DEBUG] SPARQL Results: {results}")
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return bindings_response(render_query("relations.personnes"),
+                             tags=("personnes", "allergies", "conditions", "preferences", "objectifs"),
+                             query_id="relations.personnes")
 
 @app.route('/api/personnes/<personne_id>/relations', methods=['POST', 'OPTIONS'])
 def create_personne_relation(personne_id):
@@ -969,7 +1465,7 @@ def create_personne_relation(personne_id):
         type_relation = data.get('typeRelation')
         cible_id = data.get('cibleId')
         
-        print(f"🎯 [DEBUG] Creating relation: {personne_id} -> {type_relation} -> {cible_id}")
+        logger.debug("Creating relation: %s -> %s -> %s", personne_id, type_relation, cible_id)
         
         # URIs
         personne_uri = f"{ONTOLOGY_PREFIX}personne_{personne_id}"
@@ -990,29 +1486,24 @@ def create_personne_relation(personne_id):
             return jsonify({"success": False, "error": "Type de relation invalide"}), 400
         
         # REQUÊTE SPARQL qui CRÉE la personne si elle n'existe pas
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        INSERT DATA {{
-            <{personne_uri}> rdf:type nutrition:Personne .
-            <{personne_uri}> nutrition:nom "{personne_id}" .
-            <{personne_uri}> nutrition:{propriete} <{cible_uri}> .
-        }}
-        """
-        
-        print(f"🎯 [DEBUG] SPARQL Query: {update_query}")
+        update_query = render_query(
+            "personne.relation.insert",
+            personne=personne_uri, nom=personne_id,
+            predicate=nutrition_iri(propriete), cible=cible_uri,
+        )
         
-        success, error = sparql_update(update_query)
+        success, error = sparql_update(update_query, tags=("personnes",), query_id="personne.relation.insert")
         
         if success:
-            print("✅ [SUCCESS] Relation créée avec succès!")
+            add_indexed_names(personne_uri, "Personne", [personne_id])
+            logger.debug("Relation créée avec succès!")
             return jsonify({"success": True}), 201
         else:
-            print(f"❌ [ERROR] Erreur SPARQL: {error}")
+            logger.error("Erreur SPARQL: %s", error)
             return jsonify({"success": False, "error": error}), 400
             
     except Exception as e:
-        print(f"❌ [EXCEPTION] Erreur: {str(e)}")
+        logger.error("Erreur: %s", e)
         return jsonify({"success": False, "error": str(e)}), 400
 
 @app.route('/api/personnes/<personne_id>/relations/<type_relation>/<cible_id>', methods=['DELETE', 'OPTIONS'])
@@ -1037,14 +1528,12 @@ def delete_personne_relation(personne_id, type_relation, cible_id):
         propriete, type_cible = relation_mapping[type_relation]
         cible_uri = generate_uri(type_cible, cible_id)
         
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE WHERE {{
-            <{personne_uri}> nutrition:{propriete} <{cible_uri}> .
-        }}
-        """
+        delete_query = render_query(
+            "personne.relation.delete",
+            personne=personne_uri, predicate=nutrition_iri(propriete), cible=cible_uri,
+        )
         
-        success, error = sparql_update(delete_query)
+        success, error = sparql_update(delete_query, tags=("personnes",), query_id="personne.relation.delete")
         return jsonify({"success": success, "error": error if not success else ""})
         
     except Exception as e:
@@ -1056,44 +1545,9 @@ def delete_personne_relation(personne_id, type_relation, cible_id):
 @app.route('/api/relations-aliments', methods=['GET'])
 def get_all_relations_aliments():
     """Get all food relations"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?alimentId ?alimentNom ?typeRelation ?cibleId ?cibleNom ?quantite ?unite WHERE {{
-        ?aliment a nutrition:Aliment ;
-                 nutrition:nom ?alimentNom .
-        BIND(STRAFTER(STR(?aliment), "#") AS ?alimentId)
-        
-        {{
-            ?aliment nutrition:contientNutriment ?cible .
-            ?aliment nutrition:quantiteNutriment ?quantite .
-            ?aliment nutrition:uniteNutriment ?unite .
-            BIND("NUTRIMENT" AS ?typeRelation)
-            OPTIONAL {{ ?cible nutrition:nom ?cibleNom }}
-            BIND(STRAFTER(STR(?cible), "#") AS ?cibleId)
-        }}
-        UNION
-        {{
-            ?aliment nutrition:estDansRepas ?cible .
-            ?aliment nutrition:quantiteRepas ?quantite .
-            ?aliment nutrition:uniteRepas ?unite .
-            BIND("REPAS" AS ?typeRelation)
-            OPTIONAL {{ ?cible nutrition:nom ?cibleNom }}
-            BIND(STRAFTER(STR(?cible), "#") AS ?cibleId)
-        }}
-        UNION
-        {{
-            ?aliment nutrition:estDansRecette ?cible .
-            ?aliment nutrition:quantiteRecette ?quantite .
-            ?aliment nutrition:uniteRecette ?unite .
-            BIND("RECETTE" AS ?typeRelation)
-            OPTIONAL {{ ?cible nutrition:nom ?cibleNom }}
-            BIND(STRAFTER(STR(?cible), "#") AS ?cibleId)
-        }}
-    }}
-    ORDER BY ?alimentNom ?typeRelation
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return bindings_response(render_query("relations.aliments"),
+                             tags=("aliments", "nutriments", "repas", "recettes"),
+                             query_id="relations.aliments")
 
 @app.route('/api/aliments/<aliment_id>/relations', methods=['POST', 'OPTIONS'])
 def create_aliment_relation(aliment_id):
@@ -1108,7 +1562,7 @@ def create_aliment_relation(aliment_id):
         quantite = data.get('quantite', 0)
         unite = data.get('unite', 'g')
         
-        print(f"🎯 [DEBUG] Creating food relation: {aliment_id} -> {type_relation} -> {cible_id} ({quantite}{unite})")
+        logger.debug("Creating food relation: %s -> %s -> %s (%s%s)", aliment_id, type_relation, cible_id, quantite, unite)
         
         # URIs CORRIGÉES - sans préfixes en double
         aliment_uri = f"{ONTOLOGY_PREFIX}{aliment_id}"
@@ -1131,34 +1585,28 @@ def create_aliment_relation(aliment_id):
         else:
             return jsonify({"success": False, "error": "Type de relation invalide"}), 400
         
-        print(f"🎯 [DEBUG] Aliment URI: {aliment_uri}")
-        print(f"🎯 [DEBUG] Cible URI: {cible_uri}")
+        logger.debug("Aliment URI: %s", aliment_uri)
+        logger.debug("Cible URI: %s", cible_uri)
         
         # REQUÊTE SPARQL
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-        INSERT DATA {{
-            <{aliment_uri}> nutrition:{propriete_relation} <{cible_uri}> .
-            <{aliment_uri}> nutrition:{propriete_quantite} "{quantite}"^^xsd:float .
-            <{aliment_uri}> nutrition:{propriete_unite} "{unite}"^^xsd:string .
-        }}
-        """
-        
-        print(f"🎯 [DEBUG] SPARQL Query: {update_query}")
+        update_query = render_query(
+            "aliment.relation.insert",
+            aliment=aliment_uri, relation=nutrition_iri(propriete_relation), cible=cible_uri,
+            quantite_predicate=nutrition_iri(propriete_quantite), quantite=quantite,
+            unite_predicate=nutrition_iri(propriete_unite), unite=unite,
+        )
         
-        success, error = sparql_update(update_query)
+        success, error = sparql_update(update_query, tags=("aliments",), query_id="aliment.relation.insert")
         
         if success:
-            print("✅ [SUCCESS] Relation aliment créée avec succès!")
+            logger.debug("Relation aliment créée avec succès!")
             return jsonify({"success": True}), 201
         else:
-            print(f"❌ [ERROR] Erreur SPARQL: {error}")
+            logger.error("Erreur SPARQL: %s", error)
             return jsonify({"success": False, "error": error}), 400
             
     except Exception as e:
-        print(f"❌ [EXCEPTION] Erreur: {str(e)}")
+        logger.error("Erreur: %s", e)
         return jsonify({"success": False, "error": str(e)}), 400
 
         
@@ -1189,16 +1637,13 @@ def delete_aliment_relation(aliment_id, type_relation, cible_id):
         else:
             return jsonify({"success": False, "error": "Type de relation invalide"}), 400
         
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE WHERE {{
-            <{aliment_uri}> nutrition:{propriete_relation} <{cible_uri}> .
-            <{aliment_uri}> nutrition:{propriete_quantite} ?quantite .
-            <{aliment_uri}> nutrition:{propriete_unite} ?unite .
-        }}
-        """
+        delete_query = render_query(
+            "aliment.relation.delete",
+            aliment=aliment_uri, relation=nutrition_iri(propriete_relation), cible=cible_uri,
+            quantite_predicate=nutrition_iri(propriete_quantite), unite_predicate=nutrition_iri(propriete_unite),
+        )
         
-        success, error = sparql_update(delete_query)
+        success, error = sparql_update(delete_query, tags=("aliments",), query_id="aliment.relation.delete")
         return jsonify({"success": success, "error": error if not success else ""})
         
     except Exception as e:
@@ -1209,599 +1654,123 @@ def delete_aliment_relation(aliment_id, type_relation, cible_id):
 @app.route('/api/aliments', methods=['GET'])
 def get_aliments():
     """Get all foods"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom ?calories ?indexGlycémique ?teneurFibres ?teneurSodium WHERE {{
-        ?aliment a nutrition:Aliment ;
-                 nutrition:nom ?nom ;
-                 nutrition:calories ?calories ;
-                 nutrition:indexGlycémique ?indexGlycémique .
-        OPTIONAL {{ ?aliment nutrition:teneurFibres ?teneurFibres }}
-        OPTIONAL {{ ?aliment nutrition:teneurSodium ?teneurSodium }}
-        BIND(STRAFTER(STR(?aliment), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("aliments")
 
 @app.route('/api/aliments', methods=['POST'])
 def create_aliment():
     """Create a new food"""
-    try:
-        data = request.json
-        aliment_id = data.get('id')
-        if not aliment_id:
-            aliment_id = uuid.uuid4().hex[:8]  # short UUID only
-        
-        aliment_uri = generate_uri("aliment", aliment_id)
-        
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        calories_val = build_sparql_value(data.get('calories', 0), 'integer')
-        indexGlycemique_val = build_sparql_value(data.get('indexGlycémique', 0), 'integer')
-        
-        triples = f"""
-            <{aliment_uri}> a nutrition:Aliment ;
-                            nutrition:nom {nom_val} ;
-                            nutrition:calories {calories_val} ;
-                            nutrition:indexGlycémique {indexGlycemique_val}"""
-        
-        if data.get('teneurFibres'):
-            teneurFibres_val = build_sparql_value(data.get('teneurFibres'), 'float')
-            triples += f" ;\n                            nutrition:teneurFibres {teneurFibres_val}"
-        
-        if data.get('teneurSodium'):
-            teneurSodium_val = build_sparql_value(data.get('teneurSodium'), 'float')
-            triples += f" ;\n                            nutrition:teneurSodium {teneurSodium_val}"
-        
-        triples += " ."
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": aliment_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except ValueError as e:
-        return jsonify({"success": False, "error": f"Invalid data format: {str(e)}"}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("aliments")
 
 @app.route('/api/aliments/<aliment_id>', methods=['PUT'])
 def update_aliment(aliment_id):
     """Update a food"""
-    try:
-        data = request.json
-        aliment_uri = generate_uri("aliment", aliment_id)
-        
-        # Delete old data
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{aliment_uri}> ?p ?o }}
-        WHERE {{ <{aliment_uri}> ?p ?o }}
-        """
-        sparql_update(delete_query)
-        
-        # Insert new data
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        calories_val = build_sparql_value(data.get('calories', 0), 'integer')
-        indexGlycemique_val = build_sparql_value(data.get('indexGlycémique', 0), 'integer')
-        
-        triples = f"""
-            <{aliment_uri}> a nutrition:Aliment ;
-                            nutrition:nom {nom_val} ;
-                            nutrition:calories {calories_val} ;
-                            nutrition:indexGlycémique {indexGlycemique_val}"""
-        
-        if data.get('teneurFibres'):
-            teneurFibres_val = build_sparql_value(data.get('teneurFibres'), 'float')
-            triples += f" ;\n                            nutrition:teneurFibres {teneurFibres_val}"
-        
-        if data.get('teneurSodium'):
-            teneurSodium_val = build_sparql_value(data.get('teneurSodium'), 'float')
-            triples += f" ;\n                            nutrition:teneurSodium {teneurSodium_val}"
-        
-        triples += " ."
-        
-        insert_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(insert_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return update_entity("aliments", aliment_id)
 
 @app.route('/api/aliments/<aliment_id>', methods=['DELETE'])
 def delete_aliment(aliment_id):
     """Delete a food"""
-    try:
-        aliment_uri = generate_uri("aliment", aliment_id)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{aliment_uri}> ?p ?o }}
-        WHERE {{ <{aliment_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("aliments", aliment_id)
 
 # ==================== ACTIVITÉ PHYSIQUE CRUD ====================
 
 @app.route('/api/activites', methods=['GET'])
 def get_activites():
     """Get all physical activities"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom ?dureeActivite ?type WHERE {{
-        ?activite a nutrition:ActivitePhysique ;
-                  nutrition:nom ?nom ;
-                  nutrition:dureeActivite ?dureeActivite .
-        OPTIONAL {{ ?activite nutrition:type ?type }}
-        BIND(STRAFTER(STR(?activite), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("activites")
 
 @app.route('/api/activites', methods=['POST'])
 def create_activite():
     """Create a new physical activity"""
-    try:
-        data = request.json
-        
-        activite_id = data.get('id')
-        if not activite_id:
-            activite_id = uuid.uuid4().hex[:8]  # short UUID only
-        
-        activite_uri = generate_uri("activite", activite_id)
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        dureeActivite_val = build_sparql_value(data.get('dureeActivite', 0), 'integer')
-        
-        triples = f"""
-            <{activite_uri}> a nutrition:ActivitePhysique ;
-                             nutrition:nom {nom_val} ;
-                             nutrition:dureeActivite {dureeActivite_val}"""
-        
-        if data.get('type'):
-            type_val = build_sparql_value(data.get('type'), 'string')
-            triples += f" ;\n                             nutrition:type {type_val}"
-        
-        triples += " ."
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": activite_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except ValueError as e:
-        return jsonify({"success": False, "error": f"Invalid data format: {str(e)}"}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("activites")
 
 @app.route('/api/activites/<activite_id>', methods=['PUT'])
 def update_activite(activite_id):
     """Update a physical activity"""
-    try:
-        data = request.json
-        activite_uri = generate_uri("activite", activite_id)
-        
-        # Delete old data
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{activite_uri}> ?p ?o }}
-        WHERE {{ <{activite_uri}> ?p ?o }}
-        """
-        sparql_update(delete_query)
-        
-        # Insert new data
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        dureeActivite_val = build_sparql_value(data.get('dureeActivite', 0), 'integer')
-        
-        triples = f"""
-            <{activite_uri}> a nutrition:ActivitePhysique ;
-                             nutrition:nom {nom_val} ;
-                             nutrition:dureeActivite {dureeActivite_val}"""
-        
-        if data.get('type'):
-            type_val = build_sparql_value(data.get('type'), 'string')
-            triples += f" ;\n                             nutrition:type {type_val}"
-        
-        triples += " ."
-        
-        insert_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(insert_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return update_entity("activites", activite_id)
 
 @app.route('/api/activites/<activite_id>', methods=['DELETE'])
 def delete_activite(activite_id):
     """Delete a physical activity"""
-    try:
-        activite_uri = generate_uri("activite", activite_id)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{activite_uri}> ?p ?o }}
-        WHERE {{ <{activite_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("activites", activite_id)
 
 # ==================== NUTRIMENT CRUD ====================
 
 @app.route('/api/nutriments', methods=['GET'])
 def get_nutriments():
     """Get all nutrients"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom ?doseRecommandée ?unitéDose WHERE {{
-        ?nutriment a nutrition:Nutriment ;
-                   nutrition:nom ?nom ;
-                   nutrition:doseRecommandée ?doseRecommandée ;
-                   nutrition:unitéDose ?unitéDose .
-        BIND(STRAFTER(STR(?nutriment), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("nutriments")
 
 @app.route('/api/nutriments', methods=['POST'])
 def create_nutriment():
     """Create a new nutrient"""
-    try:
-        data = request.json
-        
-        nutriment_id = data.get('id')
-        if not nutriment_id:
-            nutriment_id = uuid.uuid4().hex[:8]  # short UUID only
-        
-        nutriment_uri = generate_uri("nutriment", nutriment_id)
-        
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        doseRecommandee_val = build_sparql_value(data.get('doseRecommandée', 0.0), 'float')
-        uniteDose_val = build_sparql_value(data.get('unitéDose', 'mg'), 'string')
-        
-        triples = f"""
-            <{nutriment_uri}> a nutrition:Nutriment ;
-                              nutrition:nom {nom_val} ;
-                              nutrition:doseRecommandée {doseRecommandee_val} ;
-                              nutrition:unitéDose {uniteDose_val} ."""
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": nutriment_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("nutriments")
 
 @app.route('/api/nutriments/<nutriment_id>', methods=['PUT'])
 def update_nutriment(nutriment_id):
     """Update a nutriment"""
-    try:
-        data = request.json
-        nutriment_uri = generate_uri("nutriment", nutriment_id)
-        print("UPDATE NUTRIMENT URI:", nutriment_uri)
-
-        # Delete old data
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{nutriment_uri}> ?p ?o }}
-        WHERE {{ <{nutriment_uri}> ?p ?o }}
-        """
-        sparql_update(delete_query)
-
-        # Insert new data
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        dose_val = build_sparql_value(data.get('doseRecommandée', 0.0), 'float')
-        unite_val = build_sparql_value(data.get('unitéDose', 'mg'), 'string')
-
-        triples = f"""
-            <{nutriment_uri}> a nutrition:Nutriment ;
-                               nutrition:nom {nom_val} ;
-                               nutrition:doseRecommandée {dose_val} ;
-                               nutrition:unitéDose {unite_val} .
-        """
-
-        insert_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-
-        success, error = sparql_update(insert_query)
-        print("UPDATE NUTRIMENT CALLED WITH:", nutriment_id)
-        print("REQUEST JSON:", request.json)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return update_entity("nutriments", nutriment_id)
 
 @app.route('/api/nutriments/<nutriment_id>', methods=['DELETE'])
 def delete_nutriment(nutriment_id):
     """Delete a nutrient"""
-    try:
-        nutriment_uri = generate_uri("nutriment", nutriment_id)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{nutriment_uri}> ?p ?o }}
-        WHERE {{ <{nutriment_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("nutriments", nutriment_id)
 
 # ==================== CONDITION MÉDICALE CRUD ====================
 
 @app.route('/api/conditions', methods=['GET'])
 def get_conditions():
     """Get all medical conditions"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom WHERE {{
-        ?condition a nutrition:ConditionMedicale ;
-                   nutrition:nom ?nom .
-        BIND(STRAFTER(STR(?condition), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("conditions")
 
 @app.route('/api/conditions', methods=['POST'])
 def create_condition():
     """Create a new medical condition"""
-    try:
-        data = request.json
-        condition_id = data.get('id')
-        if not condition_id:
-            condition_id = uuid.uuid4().hex[:8]  # short UUID only
-        
-        condition_uri = generate_uri("condition", condition_id)
-        
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        
-        triples = f"""
-            <{condition_uri}> a nutrition:ConditionMedicale ;
-                              nutrition:nom {nom_val} ."""
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": condition_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("conditions")
 @app.route('/api/conditions/<condition_id>', methods=['PUT'])
 def update_condition(condition_id):
     """Update a medical condition safely"""
-    try:
-        data = request.json
-        condition_uri = generate_uri("condition", condition_id)
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{condition_uri}> nutrition:nom ?oldNom }}
-        INSERT {{ <{condition_uri}> nutrition:nom {nom_val} }}
-        WHERE {{ <{condition_uri}> nutrition:nom ?oldNom }}
-        """
-
-        success, error = sparql_update(update_query)
-        print("UPDATE CONDITION CALLED WITH:", condition_id)
-        print("REQUEST JSON:", data)
-        return jsonify({"success": success, "error": error if not success else ""})
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return update_entity("conditions", condition_id)
 
 
 @app.route('/api/conditions/<condition_id>', methods=['DELETE'])
 def delete_condition(condition_id):
     """Delete a medical condition"""
-    try:
-        condition_uri = generate_uri("condition", condition_id)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{condition_uri}> ?p ?o }}
-        WHERE {{ <{condition_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("conditions", condition_id)
 
 # ==================== ALLERGIE CRUD ====================
 
 @app.route('/api/allergies', methods=['GET'])
 def get_allergies():
     """Get all allergies"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom ?typeAllergie WHERE {{
-        ?allergie a nutrition:Allergie ;
-                  nutrition:nom ?nom ;
-                  nutrition:typeAllergie ?typeAllergie .
-        BIND(STRAFTER(STR(?allergie), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("allergies")
 
 @app.route('/api/allergies', methods=['POST'])
 def create_allergie():
     """Create a new allergy"""
-    try:
-        data = request.json
-        allergie_id = data.get('id', f"allergie_{uuid.uuid4().hex[:8]}")
-        allergie_uri = generate_uri("allergie", allergie_id)
-        
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        typeAllergie_val = build_sparql_value(data.get('typeAllergie', 'Unknown'), 'string')
-        
-        triples = f"""
-            <{allergie_uri}> a nutrition:Allergie ;
-                             nutrition:nom {nom_val} ;
-                             nutrition:typeAllergie {typeAllergie_val} ."""
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": allergie_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("allergies")
     
 @app.route('/api/allergies/<allergie_id>', methods=['PUT'])
 def update_allergie(allergie_id):
     """Update an allergie"""
-    try:
-        data = request.json
-        allergie_uri = generate_uri("allergie", allergie_id)
-        print("UPDATE ALLERGIE URI:", allergie_uri)
-
-        # Delete old data
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{allergie_uri}> ?p ?o }}
-        WHERE {{ <{allergie_uri}> ?p ?o }}
-        """
-        sparql_update(delete_query)
-
-        # Insert new data
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        type_val = build_sparql_value(data.get('typeAllergie', 'Inconnu'), 'string')
-
-        triples = f"""
-            <{allergie_uri}> a nutrition:Allergie ;
-                             nutrition:nom {nom_val} ;
-                             nutrition:typeAllergie {type_val} .
-        """
-
-        insert_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        print("Triples to insert:", triples)
-
-        success, error = sparql_update(insert_query)
-        print("UPDATE ALLERGIE CALLED WITH:", allergie_id)
-        print("REQUEST JSON:", request.json)
-        return jsonify({"success": success, "error": error if not success else ""})
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return update_entity("allergies", allergie_id)
 
 
 @app.route('/api/allergies/<allergie_id>', methods=['DELETE'])
 def delete_allergie(allergie_id):
     """Delete an allergy"""
-    try:
-        allergie_uri = generate_uri("allergie", allergie_id)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{allergie_uri}> ?p ?o }}
-        WHERE {{ <{allergie_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("allergies", allergie_id)
 
 # ==================== OBJECTIF CRUD ====================
 
 @app.route('/api/objectifs', methods=['GET'])
 def get_objectifs():
     """Get all objectives"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom WHERE {{
-        ?objectif a nutrition:Objectif ;
-                  nutrition:nom ?nom .
-        BIND(STRAFTER(STR(?objectif), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    bindings = results.get("results", {}).get("bindings", [])
-    print("[DEBUG] SPARQL bindings:", bindings)
-    return jsonify(bindings)
+    return list_entities("objectifs")
 
 @app.route('/api/objectifs', methods=['POST'])
 def create_objectif():
     """Create a new objective"""
-    try:
-        data = request.json
-        objectif_id = data.get('id', f"objectif_{uuid.uuid4().hex[:8]}")
-        objectif_uri = generate_uri("objectif", objectif_id)
-        
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        
-        triples = f"""
-            <{objectif_uri}> a nutrition:Objectif ;
-                             nutrition:nom {nom_val} ."""
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": objectif_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("objectifs")
 def clean_objectif_id(objectif_id):
     while objectif_id.startswith("objectif_objectif_"):
         objectif_id = objectif_id[len("objectif_"):]
@@ -1809,42 +1778,13 @@ def clean_objectif_id(objectif_id):
 @app.route('/api/objectifs/<objectif_id>', methods=['DELETE'])
 def delete_objectif(objectif_id):
     """Delete an objective"""
-    try:
-        objectif_uri = generate_uri("objectif", clean_objectif_id(objectif_id))
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{objectif_uri}> ?p ?o }}
-        WHERE {{ <{objectif_uri}> ?p ?o }}
-        """
-        print("[DEBUG] SPARQL Delete:", delete_query)
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("objectifs", clean_objectif_id(objectif_id))
 
 
 @app.route('/api/objectifs/<objectif_id>', methods=['PUT'])
 def update_objectif(objectif_id):
-    try:
-        data = request.get_json()
-        print(f"[DEBUG] Data reçue pour {objectif_id}:", data)
-
-        new_name = data.get("nom")
-        if not new_name:
-            return jsonify({"success": False, "error": "Nom manquant"}), 400
-
-        objectif_uri = generate_uri("objectif", clean_objectif_id(objectif_id))
-        update_query = f"""
-PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-DELETE {{ <{objectif_uri}> nutrition:nom ?oldName }}
-INSERT {{ <{objectif_uri}> nutrition:nom "{new_name}" }}
-WHERE {{ <{objectif_uri}> nutrition:nom ?oldName }}
-"""
-        print("[DEBUG] SPARQL Update:", update_query)
-        success, error = sparql_update(update_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    """Update an objective"""
+    return update_entity("objectifs", clean_objectif_id(objectif_id))
 
 
 
@@ -1853,55 +1793,12 @@ WHERE {{ <{objectif_uri}> nutrition:nom ?oldName }}
 @app.route('/api/recettes', methods=['GET'])
 def get_recettes():
     """Get all recipes"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom ?description ?tempsPréparation ?niveauDifficulté WHERE {{
-        ?recette a nutrition:Recette ;
-                 nutrition:nom ?nom .
-        OPTIONAL {{ ?recette nutrition:description ?description }}
-        OPTIONAL {{ ?recette nutrition:tempsPréparation ?tempsPréparation }}
-        OPTIONAL {{ ?recette nutrition:niveauDifficulté ?niveauDifficulté }}
-        BIND(STRAFTER(STR(?recette), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("recettes")
 
 @app.route('/api/recettes', methods=['POST'])
 def create_recette():
     """Create a new recipe"""
-    try:
-        data = request.json
-        recette_id = data.get('id', f"recette_{uuid.uuid4().hex[:8]}")
-        recette_uri = generate_uri("recette", recette_id)
-        
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        description_val = build_sparql_value(data.get('description', 'Unknown'), 'string')
-        temps_val = build_sparql_value(data.get('tempsPréparation', 'Unknown'), 'integer')
-        niveau_val = build_sparql_value(data.get('niveauDifficulté', 'Unknown'), 'string')
-
-        triples = f"""
-            <{recette_uri}> a nutrition:Recette ;
-                            nutrition:nom {nom_val} ;
-                            nutrition:description {description_val} ;
-                            nutrition:tempsPréparation {temps_val} ;
-                            nutrition:niveauDifficulté {niveau_val} .
-        """
-
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": recette_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("recettes")
 def clean_recette_id(recette_id):
     """Supprime les doublons de 'recette_' dans l'ID"""
     while recette_id.startswith("recette_recette_"):
@@ -1910,64 +1807,11 @@ def clean_recette_id(recette_id):
 @app.route('/api/recettes/<recette_id>', methods=['DELETE'])
 def delete_recette(recette_id):
     """Delete a recipe"""
-    try:
-        recette_uri = generate_uri("recette", clean_recette_id(recette_id))
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{recette_uri}> ?p ?o }}
-        WHERE {{ <{recette_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("recettes", clean_recette_id(recette_id))
 @app.route('/api/recettes/<recette_id>', methods=['PUT'])
 def update_recette(recette_id):
-    try:
-        data = request.get_json()
-        recette_uri = generate_uri("recette", clean_recette_id(recette_id))
-
-        # Mandatory
-        new_name = data.get("nom")
-        if not new_name:
-            return jsonify({"success": False, "error": "Nom manquant"}), 400
-
-        # Optional fields
-        new_description = data.get("description")
-        new_temps = data.get("tempsPréparation")
-        new_niveau = data.get("niveauDifficulté")
-
-        # Update name (always exists)
-        name_update = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{recette_uri}> nutrition:nom ?oldName }}
-        INSERT {{ <{recette_uri}> nutrition:nom {build_sparql_value(new_name, 'string')} }}
-        WHERE {{ <{recette_uri}> nutrition:nom ?oldName }}
-        """
-        sparql_update(name_update)
-
-        # Optional updates (use INSERT DATA, no DELETE needed)
-        optional_triples = []
-        if new_description is not None:
-            optional_triples.append(f"<{recette_uri}> nutrition:description {build_sparql_value(new_description, 'string')} .")
-        if new_temps is not None:
-            optional_triples.append(f"<{recette_uri}> nutrition:tempsPréparation {build_sparql_value(new_temps, 'integer')} .")
-        if new_niveau is not None:
-            optional_triples.append(f"<{recette_uri}> nutrition:niveauDifficulté {build_sparql_value(new_niveau, 'string')} .")
-
-        if optional_triples:
-            insert_data = f"""
-            PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-            INSERT DATA {{
-                {' '.join(optional_triples)}
-            }}
-            """
-            sparql_update(insert_data)
-
-        return jsonify({"success": True}), 200
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    """Update a recipe"""
+    return update_entity("recettes", clean_recette_id(recette_id))
 
 
 # ==================== REPAS CRUD ====================
@@ -1975,48 +1819,12 @@ def update_recette(recette_id):
 @app.route('/api/repas', methods=['GET'])
 def get_repas():
     """Get all meals"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom ?type WHERE {{
-        ?repas a nutrition:Repas ;
-               nutrition:nom ?nom .
-        OPTIONAL {{ ?repas nutrition:type ?type }}
-        BIND(STRAFTER(STR(?repas), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("repas")
 
 @app.route('/api/repas', methods=['POST'])
 def create_repas():
     """Create a new meal"""
-    try:
-        data = request.json
-        repas_id = data.get('id', f"repas_{uuid.uuid4().hex[:8]}")
-        repas_uri = generate_uri("repas", repas_id)
-        
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        type_val = build_sparql_value(data.get('type', 'Unknown'), 'string')
-        
-        triples = f"""
-            <{repas_uri}> a nutrition:Repas ;
-                          nutrition:nom {nom_val} ;
-                          nutrition:type {type_val} ."""
-
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": repas_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("repas")
 
 def clean_repas_id(repas_id):
     """Supprime les doublons de 'repas_' dans l'ID"""
@@ -2027,253 +1835,238 @@ def clean_repas_id(repas_id):
 @app.route('/api/repas/<repas_id>', methods=['DELETE'])
 def delete_repas(repas_id):
     """Delete a meal"""
-    try:
-        clean_id = clean_repas_id(repas_id)
-        repas_uri = generate_uri("repas", clean_id)  # ici "repas", pas "repas_id"
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{repas_uri}> ?p ?o }}
-        WHERE {{ <{repas_uri}> ?p ?o }}
-        """
-        print("[DEBUG] SPARQL Delete:", delete_query)
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("repas", clean_repas_id(repas_id))
 @app.route('/api/repas/<repas_id>', methods=['PUT'])
 def update_repas(repas_id):
     """Update a meal"""
-    try:
-        data = request.get_json()
-        print(f"[DEBUG] Data reçue pour {repas_id}:", data)
-
-        new_name = data.get("nom")
-        new_type = data.get("type")
-
-        if not new_name:
-            return jsonify({"success": False, "error": "Nom manquant"}), 400
-
-        clean_id = clean_repas_id(repas_id)
-        repas_uri = generate_uri("repas", clean_id)
-
-        # Construction sécurisée de la requête SPARQL
-        type_line = ""
-        if new_type:
-            type_line = f'<{repas_uri}> nutrition:type "{new_type}"^^xsd:string .'
-        
-        # --- Requête SPARQL corrigée ---
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-
-        DELETE {{
-            <{repas_uri}> nutrition:nom ?oldName .
-            <{repas_uri}> nutrition:type ?oldType .
-        }}
-        INSERT {{
-            <{repas_uri}> nutrition:nom "{new_name}"^^xsd:string .
-            {type_line}
-        }}
-        WHERE {{
-            OPTIONAL {{ <{repas_uri}> nutrition:nom ?oldName . }}
-            OPTIONAL {{ <{repas_uri}> nutrition:type ?oldType . }}
-        }}
-        """
-
-        print("[DEBUG] SPARQL Update:", update_query)
-
-        success, error = sparql_update(update_query)
-        return jsonify({"success": success, "error": error if not success else ""}), 200 if success else 400
-
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return update_entity("repas", clean_repas_id(repas_id))
 # ==================== PROGRAMME BIEN-ÊTRE CRUD ====================
 
 @app.route('/api/programmes', methods=['GET'])
 def get_programmes():
     """Get all wellness programs"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?personneId ?objectifId ?dateDebut ?dateFin WHERE {{
-        ?programme a nutrition:ProgrammeBienEtre ;
-                   nutrition:AProgramme ?personne ;
-                   nutrition:Vise ?objectif .
-        OPTIONAL {{ ?programme nutrition:dateDebut ?dateDebut }}
-        OPTIONAL {{ ?programme nutrition:dateFin ?dateFin }}
-        BIND(STRAFTER(STR(?programme), "#") AS ?id)
-        BIND(STRAFTER(STR(?personne), "#") AS ?personneId)
-        BIND(STRAFTER(STR(?objectif), "#") AS ?objectifId)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("programmes")
 
 @app.route('/api/programmes', methods=['POST'])
 def create_programme():
     """Create a new wellness program"""
-    try:
-        data = request.json
-        programme_id = data.get('id', f"programme_{uuid.uuid4().hex[:8]}")
-        programme_uri = generate_uri("programme", programme_id)
-        personne_uri = generate_uri("personne", data.get('personneId'))
-        objectif_uri = generate_uri("objectif", data.get('objectifId'))
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            <{programme_uri}> a nutrition:ProgrammeBienEtre ;
-                              nutrition:AProgramme <{personne_uri}> ;
-                              nutrition:Vise <{objectif_uri}> .
-        }}
-        """
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": programme_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("programmes")
 
 @app.route('/api/programmes/<programme_id>', methods=['DELETE'])
 def delete_programme(programme_id):
     """Delete a wellness program"""
-    try:
-        programme_uri = generate_uri("programme", programme_id)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{programme_uri}> ?p ?o }}
-        WHERE {{ <{programme_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("programmes", programme_id)
 
 # ==================== PRÉFÉRENCE ALIMENTAIRE CRUD ====================
 
 @app.route('/api/preferences', methods=['GET'])
 def get_preferences():
     """Get all food preferences"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?nom WHERE {{
-        ?pref a nutrition:PreferenceAlimentaire ;
-              nutrition:nom ?nom .
-        BIND(STRAFTER(STR(?pref), "#") AS ?id)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("preferences")
 
 @app.route('/api/preferences', methods=['POST'])
 def create_preference():
     """Create a new food preference"""
-    try:
-        data = request.json
-        pref_id = data.get('id', f"pref_{uuid.uuid4().hex[:8]}")
-        pref_uri = generate_uri("pref", pref_id)
-        
-        nom_val = build_sparql_value(data.get('nom', 'Unknown'), 'string')
-        
-        triples = f"""
-            <{pref_uri}> a nutrition:PreferenceAlimentaire ;
-                         nutrition:nom {nom_val} ."""
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            {triples}
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": pref_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("preferences")
 
 @app.route('/api/preferences/<pref_id>', methods=['DELETE'])
 def delete_preference(pref_id):
     """Delete a food preference"""
-    try:
-        pref_uri = generate_uri("pref", pref_id)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{pref_uri}> ?p ?o }}
-        WHERE {{ <{pref_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return delete_entity("preferences", pref_id)
 
 # ==================== RECOMMANDATION CRUD ====================
 
 @app.route('/api/recommandations', methods=['GET'])
 def get_recommandations():
     """Get all recommendations"""
-    query = f"""
-    PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-    SELECT ?id ?personneId ?alimentId ?activiteId ?dateCreation WHERE {{
-        ?rec a nutrition:Recommandation ;
-             nutrition:recommande ?personne ;
-             nutrition:associeAliment ?aliment .
-        OPTIONAL {{ ?rec nutrition:associeActivite ?activite }}
-        OPTIONAL {{ ?rec nutrition:dateCreation ?dateCreation }}
-        BIND(STRAFTER(STR(?rec), "#") AS ?id)
-        BIND(STRAFTER(STR(?personne), "#") AS ?personneId)
-        BIND(STRAFTER(STR(?aliment), "#") AS ?alimentId)
-        BIND(STRAFTER(STR(?activite), "#") AS ?activiteId)
-    }}
-    """
-    results = sparql_query(query)
-    return jsonify(results.get("results", {}).get("bindings", []))
+    return list_entities("recommandations")
 
 @app.route('/api/recommandations', methods=['POST'])
 def create_recommandation():
     """Create a new recommendation"""
-    try:
-        data = request.json
-        rec_id = data.get('id', f"recommandation_{uuid.uuid4().hex[:8]}")
-        rec_uri = generate_uri("recommandation", rec_id)
-        personne_uri = generate_uri("personne", data.get('personneId'))
-        aliment_uri = generate_uri("aliment", data.get('alimentId'))
-        
-        update_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        INSERT DATA {{
-            <{rec_uri}> a nutrition:Recommandation ;
-                        nutrition:recommande <{personne_uri}> ;
-                        nutrition:associeAliment <{aliment_uri}> ;
-                        nutrition:dateCreation "{datetime.now().isoformat()}"^^<http://www.w3.org/2001/XMLSchema#string> .
-        }}
-        """
-        
-        success, error = sparql_update(update_query)
-        if success:
-            return jsonify({"success": True, "id": rec_id}), 201
-        else:
-            return jsonify({"success": False, "error": error}), 400
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 400
+    return create_entity("recommandations")
 
 @app.route('/api/recommandations/<rec_id>', methods=['DELETE'])
 def delete_recommandation(rec_id):
     """Delete a recommendation"""
+    return delete_entity("recommandations", rec_id)
+
+# ==================== RECOMMANDATIONS GÉNÉRÉES ====================
+
+def recommendation_rows(query_id, tags=None, **params):
+    """(columns, rows) of a recommender query; raises when the store fails"""
+    result = sparql_query_compact(render_query(query_id, **params), tags=tags, query_id=query_id)
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result["columns"], result["rows"]
+
+def render_generated_delete(personnes):
+    return render_query("recommandations.delete_generated", personnes=personnes, prefix=GENERATED_URI_PREFIX)
+
+def requested_top_k():
+    """topK from the query string or the JSON body, between 1 and MAX_PAGE_SIZE"""
+    body = request.get_json(silent=True) or {}
+    value = request.args.get('topK', body.get('topK', RECOMMENDATION_TOP_K))
+    top_k = int(value)
+    if not 1 <= top_k <= MAX_PAGE_SIZE:
+        raise ValueError(f"topK doit être compris entre 1 et {MAX_PAGE_SIZE}")
+    return top_k
+
+@app.route('/api/recommandations/generate', methods=['POST'])
+def generate_recommandations():
+    """Recommend foods to every person and replace their generated recommendations.
+
+    Runs in the background (202) unless ?wait=true; progress and the last
+    run are reported by GET on the same route.
+    """
     try:
-        rec_uri = generate_uri("recommandation", rec_id)
-        delete_query = f"""
-        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
-        DELETE {{ <{rec_uri}> ?p ?o }}
-        WHERE {{ <{rec_uri}> ?p ?o }}
-        """
-        success, error = sparql_update(delete_query)
-        return jsonify({"success": success, "error": error if not success else ""})
+        top_k = requested_top_k()
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    # Réservée avant de répondre : deux POST simultanés ne peuvent pas obtenir 202
+    if not recommender.claim():
+        return jsonify({"success": False, "error": "Une génération est déjà en cours",
+                        "status": recommender.status()}), 409
+    if request.args.get('wait') == 'true':
+        try:
+            return jsonify({"success": True,
+                            **recommender.run_batch(render_generated_delete, top_k, claimed=True)})
+        except Exception as e:
+            return jsonify({"success": False, "error": str(e)}), 502
+
+    def run():
+        try:
+            recommender.run_batch(render_generated_delete, top_k, claimed=True)
+        except Exception as e:
+            logger.warning("Génération des recommandations en arrière-plan interrompue: %s", e)
+    threading.Thread(target=run, name="recommendations", daemon=True).start()
+    return jsonify({"success": True, "status": recommender.status()}), 202
+
+@app.route('/api/recommandations/generate', methods=['GET'])
+def get_recommandations_generation():
+    """State of the batch generation and summary of its last run"""
+    return jsonify(recommender.status())
+
+@app.route('/api/personnes/<person_id>/recommandations', methods=['GET', 'POST'])
+def recommend_for_personne(person_id):
+    """Top-k foods for one person, computed on demand; POST also writes them"""
+    try:
+        top_k = requested_top_k()
+        uri = entity_uri("personne", validate_id(person_id))
+        recommendations = recommender.recommend([uri], top_k)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 502
+    if not recommendations.personnes:
+        return jsonify({"success": False, "error": "Personne introuvable"}), 404
+
+    _, items = next(iter(recommendations))
+    result = {
+        "success": True,
+        "personneId": person_id,
+        "recommandations": [
+            {"rang": rank, "alimentId": aliment.rsplit("#", 1)[-1], "score": round(score, 4)}
+            for rank, (aliment, score) in enumerate(items, 1)
+        ],
+        "stats": recommendations.stats,
+    }
+    if request.method == 'POST':
+        written = recommender.write(recommendations, render_generated_delete)
+        result["success"] = written["failed"] == 0
+        result.update(written)
+    return jsonify(result), 200 if result["success"] else 502
+
+# ==================== BULK CREATE / UPDATE ====================
+
+def iter_bulk_rows():
+    """Yield (index, row) from a JSON array body or an NDJSON stream.
+
+    NDJSON is read line by line so large uploads are never held in memory
+    at once; a line that is not valid JSON yields a ValueError as its row.
+    """
+    if request.mimetype in ("application/x-ndjson", "application/jsonl"):
+        index = 0
+        for line in request.stream:
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as e:
+                yield index, ValueError(f"JSON invalide: {e}")
+            index += 1
+        return
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise ValueError("Un tableau JSON ou un flux NDJSON est attendu")
+    yield from enumerate(rows)
+
+def flush_bulk_chunk(entity, chunk, upsert):
+    """Write one chunk of prepared rows in a single SPARQL update"""
+    insert = "INSERT DATA {\n" + "\n".join(triples for _, _, _, triples, _ in chunk) + "\n}"
+    if upsert:
+        # Remplace uniquement les propriétés gérées, les relations sont conservées
+        delete = render_query(
+            "entity.delete_properties",
+            subjects=[uri for _, _, uri, _, _ in chunk],
+            predicates=[nutrition_iri(p) for _, p, _, _ in ENTITY_SCHEMAS[entity]["properties"]],
+        )
+        insert = f"{delete} ;\n{insert}"
+    success, error = sparql_update(insert, tags=(entity,))
+    if success:
+        for _, _, uri, _, name in chunk:
+            if name is not None:
+                set_indexed_names(uri, ENTITY_LISTS[entity]["class"], [name])
+    return [
+        {"index": index, "id": entity_id, "success": True} if success
+        else {"index": index, "id": entity_id, "success": False, "error": error}
+        for index, entity_id, _, _, _ in chunk
+    ]
+
+@app.route('/api/<entity>/bulk', methods=['POST'])
+def bulk_write(entity):
+    """Create (or with ?mode=upsert, replace) many entities in chunked updates"""
+    if entity not in ENTITY_SCHEMAS:
+        return jsonify({"success": False, "error": f"Type d'entité inconnu: {entity}"}), 404
+    upsert = request.args.get('mode') == 'upsert'
+    uri_type = ENTITY_SCHEMAS[entity]["uri_type"]
+
+    results = []
+    chunk = []
+    chunk_bytes = 0
+    try:
+        for index, row in iter_bulk_rows():
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                if not isinstance(row, dict):
+                    raise ValueError("objet JSON attendu")
+                entity_id = new_entity_id(entity, row)
+                uri = entity_uri(uri_type, entity_id)
+                triples = build_entity_triples(entity, uri, row)
+            except ValueError as e:
+                results.append({"index": index, "success": False, "error": str(e)})
+                continue
+            chunk.append((index, entity_id, uri, triples, written_name(entity, row, created=True)))
+            chunk_bytes += len(triples.encode("utf-8"))
+            if chunk_bytes >= BULK_CHUNK_BYTES or len(chunk) >= BULK_CHUNK_ROWS:
+                results.extend(flush_bulk_chunk(entity, chunk, upsert))
+                chunk, chunk_bytes = [], 0
+        if chunk:
+            results.extend(flush_bulk_chunk(entity, chunk, upsert))
+    except ValueError as e:
         return jsonify({"success": False, "error": str(e)}), 400
 
+    results.sort(key=lambda r: r["index"])
+    failed = sum(1 for r in results if not r["success"])
+    return jsonify({
+        "success": failed == 0,
+        "total": len(results),
+        "written": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    })
+
 # ==================== SEMANTIC SEARCH ENDPOINTS ====================
 
 @app.route('/api/semantic-search', methods=['POST'])
@@ -2285,11 +2078,15 @@ def semantic_search():
         
         if not query_text:
             return jsonify({"error": "La requête est requise"}), 400
+        g.search_text = query_text
         
-        print(f"🎯 [Recherche] Requête reçue: '{query_text}'")
+        logger.debug("[Recherche] Requête reçue: '%s'", query_text)
         
-        # Analyse sémantique
-        sparql_query_text = nutrition_parser.parse_query(query_text)
+        # Analyse sémantique du texte saisi, mise en cache par texte normalisé ;
+        # les candidats des recherches par nom sont résolus ensuite, à chaque fois
+        parsed_query = search_cache.sparql_for(query_text, spacy_loader.ready,
+                                               nutrition_parser.parse_query)
+        sparql_query_text = resolve_name_constraints(parsed_query) if parsed_query else parsed_query
         
         if not sparql_query_text:
             return jsonify({
@@ -2302,10 +2099,10 @@ def semantic_search():
                 ]
             }), 400
         
-        print(f"📊 [Recherche] Requête SPARQL générée:\n{sparql_query_text}")
+        logger.debug("[Recherche] Requête SPARQL générée:\n%s", sparql_query_text)
         
-        # Exécution
-        results = sparql_query(sparql_query_text)
+        # Exécution (résultat mis en cache jusqu'à la prochaine écriture)
+        results = search_cache.results_for(sparql_query_text, sparql_query)
         
         if "error" in results:
             return jsonify({
@@ -2314,6 +2111,8 @@ def semantic_search():
             }), 400
             
         bindings = results.get("results", {}).get("bindings", [])
+        if bindings:
+            autocomplete.record_query(query_text)
         
         return jsonify({
             "results": bindings,
@@ -2324,54 +2123,47 @@ def semantic_search():
         })
         
     except Exception as e:
-        print(f"❌ [Recherche] Erreur: {str(e)}")
+        logger.error("[Recherche] Erreur: %s", e)
         return jsonify({
             "error": f"Erreur lors de la recherche: {str(e)}",
             "success": False
         }), 400
 
+SEARCH_EXAMPLES = {
+    "personnes": [
+        "Personnes de plus de 60 ans",
+        "Utilisateurs pesant moins de 70kg", 
+        "Jeunes de moins de 30 ans",
+        "Personnes avec taille 175 cm"
+    ],
+    "aliments": [
+        "Aliments riches en fibres",
+        "Faible index glycémique",
+        "Aliments moins de 200 calories",
+        "Riche en protéines"
+    ],
+    "recettes": [
+        "Recettes pour diabétiques",
+        "Plats végétariens",
+        "Recettes rapides",
+        "Cuisine santé"
+    ],
+    "activités": [
+        "Activités pour brûler des calories",
+        "Exercices cardio",
+        "Sports d'endurance"
+    ]
+}
+
 @app.route('/api/search-examples', methods=['GET'])
 def get_search_examples():
     """Retourne des exemples de recherche par catégorie"""
-    examples = {
-        "personnes": [
-            "Personnes de plus de 60 ans",
-            "Utilisateurs pesant moins de 70kg", 
-            "Jeunes de moins de 30 ans",
-            "Personnes avec taille 175 cm"
-        ],
-        "aliments": [
-            "Aliments riches en fibres",
-            "Faible index glycémique",
-            "Aliments moins de 200 calories",
-            "Riche en protéines"
-        ],
-        "recettes": [
-            "Recettes pour diabétiques",
-            "Plats végétariens",
-            "Recettes rapides",
-            "Cuisine santé"
-        ],
-        "activités": [
-            "Activités pour brûler des calories",
-            "Exercices cardio",
-            "Sports d'endurance"
-        ]
-    }
-    return jsonify(examples)
+    return jsonify(SEARCH_EXAMPLES)
 
 @app.route('/api/search-stats', methods=['GET'])
 def get_search_stats():
     """Statistiques sur les données disponibles"""
-    stats_query = """
-    PREFIX nutrition: <http://www.semanticweb.org/user/ontologies/2025/8/nutrition#>
-    SELECT ?type (COUNT(?entity) as ?count) WHERE {
-        ?entity a ?class .
-        BIND(REPLACE(STR(?class), ".*#", "") AS ?type)
-    } GROUP BY ?type
-    """
-    
-    results = sparql_query(stats_query)
+    results = sparql_query(render_query("search.stats"), tags=tuple(ENTITY_LISTS), query_id="search.stats")
     stats = {}
     
     for binding in results.get("results", {}).get("bindings", []):
@@ -2433,7 +2225,7 @@ def build_sparql_from_natural_language_old(query_text):
             name_match = re.search(r'(appel[ée]s?|nomm[ée]s?|prénom)\s+([^,.!?]+)', query_text)
             if name_match:
                 person_name = name_match.group(2).strip()
-                filters.append(f'REGEX(?nom, "{person_name}", "i")')
+                additional_triples.append(name_constraint(person_name, "Personne"))
         
         # Filtres spécifiques aux personnes
         if any(word in query_text for word in ["âge", "vieille", "jeune"]):
@@ -2506,7 +2298,7 @@ def build_sparql_from_natural_language_old(query_text):
             name_match = re.search(r'(appel[ée]s?|nomm[ée]s?)\s+([^,.!?]+)', query_text)
             if name_match:
                 food_name = name_match.group(2).strip()
-                filters.append(f'REGEX(?nom, "{food_name}", "i")')
+                additional_triples.append(name_constraint(food_name, "Aliment"))
     
     # Pour les RECETTES et ACTIVITÉS (logique simplifiée)
     elif entity_type in ["Recette", "ActivitePhysique"]:
@@ -2515,7 +2307,7 @@ def build_sparql_from_natural_language_old(query_text):
             name_match = re.search(r'(appel[ée]s?|nomm[ée]s?)\s+([^,.!?]+)', query_text)
             if name_match:
                 item_name = name_match.group(2).strip()
-                filters.append(f'REGEX(?nom, "{item_name}", "i")')
+                additional_triples.append(name_constraint(item_name, entity_type))
     
     # Construction de la requête finale selon le type d'entité
     if entity_type == "Aliment":
@@ -2568,10 +2360,17 @@ def build_sparql_from_natural_language_old(query_text):
 def build_multi_entity_search(query_text):
     """Recherche dans plusieurs types d'entités quand le type n'est pas clair"""
     
+    # Recherche par nom
+    name_clause = ""
+    name_match = re.search(r'(appel[ée]s?|nomm[ée]s?|prénom|qui s\'appelle)\s+([^,.!?]+)', query_text)
+    if name_match:
+        name_clause = name_constraint(name_match.group(2).strip())
+    
     base_query = f"""
     PREFIX nutrition: <{ONTOLOGY_PREFIX}>
     PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
     SELECT ?id ?nom ?type ?score ?details ?calories ?indexGlycemique ?teneurFibres ?teneurSodium WHERE {{
+    {name_clause}
     {{
         # Recherche dans les aliments
         ?entity a nutrition:Aliment ;
@@ -2619,16 +2418,8 @@ def build_multi_entity_search(query_text):
         BIND("" AS ?teneurFibres)
         BIND("" AS ?teneurSodium)
     }}
-    
-    # Filtre par nom si spécifié
     """
     
-    # Recherche par nom
-    name_match = re.search(r'(appel[ée]s?|nomm[ée]s?|prénom|qui s\'appelle)\s+([^,.!?]+)', query_text)
-    if name_match:
-        search_name = name_match.group(2).strip()
-        base_query += f'    FILTER(REGEX(?nom, "{search_name}", "i"))\n'
-    
     base_query += """
         BIND(1.0 AS ?score)
         BIND("" AS ?details)
@@ -2637,19 +2428,44 @@ def build_multi_entity_search(query_text):
     
     return base_query
 
+SEARCH_SUGGESTIONS = [
+    "Personnes vieux ?",
+    "Personnes Jeunes ?",
+    "Personnes de taille 183 cm ?",
+    "Moins de 200 calories ",
+    "Activités physiques pour brûler des calories",
+]
+
+def suggestion_limit():
+    try:
+        return max(1, int(request.args.get('limit', AUTOCOMPLETE_TOP_K)))
+    except ValueError:
+        return AUTOCOMPLETE_TOP_K
+
 @app.route('/api/search-suggestions', methods=['GET'])
 def get_search_suggestions():
-    """Get search suggestions based on common queries"""
-    suggestions = [
-        "Personnes vieux ?",
-        "Personnes Jeunes ?",
-        "Personnes de taille 183 cm ?",
-        "Moins de 200 calories ",
-        "Activités physiques pour brûler des calories",
+    """Get search suggestions: the common queries, or completions of ?q="""
+    prefix = request.args.get('q')
+    if not prefix:
+        return jsonify(SEARCH_SUGGESTIONS)
+    return jsonify([s["text"] for s in autocomplete.suggest(prefix, suggestion_limit())])
 
-        
-    ]
-    return jsonify(suggestions)
+@app.route('/api/autocomplete', methods=['GET'])
+def get_autocomplete():
+    """Top entity names, past searches and example queries starting with ?q=
+
+    Served from the in-memory trie only: Fuseki is never queried.
+    """
+    prefix = request.args.get('q', '')
+    return jsonify(autocomplete.suggest(prefix, suggestion_limit()))
+
+if CACHE_WARMUP:
+    threading.Thread(target=warm_query_cache, name="cache-warmup", daemon=True).start()
+
+# Construire l'index des noms (et l'autocomplétion) en arrière-plan
+autocomplete.add_templates(SEARCH_SUGGESTIONS + [q for examples in SEARCH_EXAMPLES.values() for q in examples])
+ensure_name_index()
+health_monitor.start()
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
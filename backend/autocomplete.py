@@ -0,0 +1,229 @@
+"""Search-as-you-type suggestions from a compressed prefix trie"""
+
+import heapq
+import threading
+
+from name_index import normalize_name
+
+
+class _Node:
+    __slots__ = ("edges", "items", "top")
+
+    def __init__(self):
+        self.edges = {}  # premier caractère -> (étiquette, noeud)
+        self.items = {}  # (kind, key) -> poids, pour les clés qui se terminent ici
+        self.top = []    # k meilleurs (-poids, texte, kind, key) du sous-arbre
+
+
+class PrefixTrie:
+    """Radix trie whose nodes keep the k heaviest items of their subtree.
+
+    A lookup walks at most len(prefix) characters and returns the list stored
+    on the node it reaches, so its cost does not depend on how many keys
+    share the prefix. A weight change only recomputes the tops along the
+    path of its key.
+    """
+
+    def __init__(self, top_k=10):
+        self.top_k = top_k
+        self.root = _Node()
+        self.texts = {}  # (kind, key) -> texte affiché (le premier vu)
+
+    def add(self, key, kind, text, delta=1):
+        """Add `delta` to the weight of (kind, key); the item disappears at 0"""
+        path = [self.root]
+        node, rest = self.root, key
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                child = _Node()
+                node.edges[rest[0]] = (rest, child)
+                path.append(child)
+                node = child
+                break
+            label, child = edge
+            common = 1
+            while common < len(label) and common < len(rest) and label[common] == rest[common]:
+                common += 1
+            if common < len(label):
+                # Couper l'arête au préfixe commun
+                middle = _Node()
+                middle.edges[label[common]] = (label[common:], child)
+                middle.top = list(child.top)
+                node.edges[rest[0]] = (label[:common], middle)
+                child = middle
+            path.append(child)
+            node, rest = child, rest[common:]
+
+        ident = (kind, key)
+        weight = node.items.get(ident, 0) + delta
+        if weight > 0:
+            node.items[ident] = weight
+            self.texts.setdefault(ident, text)
+        else:
+            node.items.pop(ident, None)
+            self.texts.pop(ident, None)
+        for step in reversed(path):
+            self._refresh(step)
+
+    def _refresh(self, node):
+        candidates = [(-weight, self.texts[ident], *ident) for ident, weight in node.items.items()]
+        for _, child in node.edges.values():
+            candidates.extend(child.top)
+        node.top = heapq.nsmallest(self.top_k, candidates)
+
+    def weight(self, key, kind):
+        node = self._find(key, exact=True)
+        return node.items.get((kind, key), 0) if node else 0
+
+    def _find(self, key, exact=False):
+        node, rest = self.root, key
+        while rest:
+            edge = node.edges.get(rest[0])
+            if edge is None:
+                return None
+            label, child = edge
+            if rest.startswith(label):
+                node, rest = child, rest[len(label):]
+            elif label.startswith(rest) and not exact:
+                return child
+            else:
+                return None
+        return node
+
+    def top(self, prefix, limit=None):
+        """[(text, kind, weight)] of the heaviest keys starting with `prefix`"""
+        node = self._find(prefix)
+        if node is None:
+            return []
+        return [(text, kind, -weight) for weight, text, kind, _ in node.top[:limit]]
+
+
+class Autocomplete:
+    """Entity names and past searches, ranked by frequency.
+
+    Names weigh the number of entities carrying them, searches the number of
+    times they succeeded. Keys are normalized like the name index, so "cre"
+    suggests "Crème brûlée".
+    """
+
+    def __init__(self, top_k=10, max_queries=10000):
+        self.top_k = top_k
+        self.max_queries = max_queries
+        self._trie = PrefixTrie(top_k)
+        self._entity_names = {}  # uri -> [noms]
+        self._queries = {}       # clé -> [texte, nombre de recherches]
+        self._templates = []
+        self._lock = threading.Lock()
+        # Modifications faites pendant un chargement, rejouées sur le trie qui en sort
+        self._pending = None
+
+    def set_names(self, uri, names):
+        """Replace the names of `uri`"""
+        with self._lock:
+            self._set(uri, names)
+            self._record(self._set, uri, names)
+
+    def add_names(self, uri, names):
+        with self._lock:
+            self._add(uri, names)
+            self._record(self._add, uri, names)
+
+    def remove(self, uri):
+        with self._lock:
+            self._remove(uri)
+            self._record(self._remove, uri)
+
+    def begin_load(self):
+        """Start recording changes, to replay them after load_names()"""
+        with self._lock:
+            self._pending = []
+
+    def abort_load(self):
+        with self._lock:
+            self._pending = None
+
+    def _record(self, change, *args):
+        if self._pending is not None:
+            self._pending.append((change, args))
+
+    def _set(self, uri, names):
+        self._remove(uri)
+        self._add(uri, names)
+
+    def _add(self, uri, names):
+        current = self._entity_names.get(uri, [])
+        # Un nom déjà présent n'est pas recompté (rejeu d'un ajout déjà chargé)
+        names = [str(name) for name in names
+                 if name is not None and normalize_name(name) and str(name) not in current]
+        if not names:
+            return
+        self._entity_names.setdefault(uri, []).extend(names)
+        for name in names:
+            self._trie.add(normalize_name(name), "name", name)
+
+    def _remove(self, uri):
+        for name in self._entity_names.pop(uri, ()):
+            self._trie.add(normalize_name(name), "name", name, -1)
+
+    def load_names(self, rows):
+        """Rebuild from (uri, name) rows, keeping the recorded searches
+
+        Changes made since begin_load() are replayed on the new trie.
+        """
+        trie = PrefixTrie(self.top_k)
+        entity_names = {}
+        for uri, name in rows:
+            key = normalize_name(name)
+            if key:
+                entity_names.setdefault(uri, []).append(name)
+                trie.add(key, "name", name)
+        with self._lock:
+            for key, (text, count) in self._queries.items():
+                trie.add(key, "query", text, count)
+            for key, text in self._templates:
+                trie.add(key, "template", text)
+            self._trie = trie
+            self._entity_names = entity_names
+            for change, args in self._pending or ():
+                change(*args)
+            self._pending = None
+
+    def add_templates(self, texts):
+        """Example queries suggested before any search has been recorded"""
+        with self._lock:
+            for text in texts:
+                key = normalize_name(text)
+                if key and self._trie.weight(key, "template") == 0:
+                    self._templates.append((key, text))
+                    self._trie.add(key, "template", text)
+
+    def record_query(self, text):
+        """Count one successful search for `text`"""
+        key = normalize_name(text)
+        if not key:
+            return
+        with self._lock:
+            entry = self._queries.get(key)
+            if entry is None:
+                if len(self._queries) >= self.max_queries:
+                    return
+                entry = self._queries[key] = [text, 0]
+            entry[1] += 1
+            self._trie.add(key, "query", entry[0])
+
+    def suggest(self, prefix, limit=None):
+        """[{"text", "kind", "weight"}] for `prefix`, heaviest first"""
+        limit = min(limit or self.top_k, self.top_k)
+        with self._lock:
+            top = self._trie.top(normalize_name(prefix), limit)
+        return [{"text": text, "kind": kind, "weight": weight} for text, kind, weight in top]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entities": len(self._entity_names),
+                "queries": len(self._queries),
+                "templates": len(self._templates),
+                "top_k": self.top_k,
+            }
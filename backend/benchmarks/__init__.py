@@ -0,0 +1 @@
+"""Micro-benchmarks (python -m benchmarks.run) and load tests (python -m benchmarks.loadtest)"""
@@ -0,0 +1,84 @@
+"""Reproducible corpus of French natural-language searches for the benchmarks"""
+
+import random
+
+PRENOMS = ["Marie", "Jean", "Sophie", "Lucas", "Camille", "Hugo", "Léa", "Thomas", "Chloé", "Nicolas",
+           "Inès", "Éloïse", "Jérôme", "Anaïs", "François"]
+ALIMENTS = ["pomme", "banane", "brocoli", "saumon", "lentilles", "riz complet", "yaourt nature",
+            "crème brûlée", "pain de seigle", "épinards", "avocat", "quinoa", "pois chiches", "tofu"]
+RECETTES = ["ratatouille", "soupe de légumes", "salade niçoise", "gratin dauphinois", "curry de lentilles",
+            "taboulé", "quiche lorraine"]
+ACTIVITES = ["course à pied", "natation", "vélo", "yoga", "musculation", "marche rapide", "cardio"]
+
+TEMPLATES = [
+    # Personnes
+    "Personnes de plus de {age} ans",
+    "personnes de moins de {age} ans",
+    "Utilisateurs pesant moins de {poids} kg",
+    "utilisateurs pesant plus de {poids}kg",
+    "Personnes entre {age} et {age2} ans",
+    "Personnes de taille {taille} cm ?",
+    "patients de plus de {age} ans qui pèsent plus de {poids} kg",
+    "Jeunes de moins de {age} ans",
+    "personnes âgées de {age} ans",
+    "Personnes vieux ?",
+    "Personnes Jeunes ?",
+    "une personne appelée {prenom}",
+    "qui s'appelle {prenom} ?",
+    "utilisateur nommé {prenom}",
+    "patients mesurant au moins {taille} cm",
+    "personnes âge >= {age} et poids <= {poids}",
+    # Aliments
+    "Aliments moins de {calories} calories",
+    "aliments de plus de {calories} kcal",
+    "Aliments riches en fibres",
+    "aliments avec au moins {fibres} g de fibres",
+    "nourriture faible en sel, moins de {sodium} mg de sodium",
+    "Faible index glycémique",
+    "aliments faibles en calories",
+    "aliment nommé {aliment}",
+    "un aliment appelé {aliment}",
+    "fruits entre {calories} et {calories2} calories",
+    "légumes riches en fibres avec moins de {calories} calories",
+    # Recettes
+    "Recettes faibles en calories",
+    "recette appelée {recette}",
+    "plats végétariens de moins de {calories} kcal",
+    "Recettes rapides",
+    "cuisine santé pour diabétiques",
+    # Activités
+    "Activités physiques pour brûler des calories",
+    "activités de plus de {minutes} minutes",
+    "sport pendant au moins {heures} heures",
+    "exercice nommé {activite}",
+    "Exercices cardio de moins de {minutes} min",
+    # Sans type explicite
+    "{aliment}",
+    "quelque chose appelé {aliment}",
+    "{prenom}",
+]
+
+
+def build_corpus(size=400, seed=2025):
+    """`size` distinct queries, always the same for a given seed"""
+    rng = random.Random(seed)
+    queries = []
+    seen = set()
+    attempts = 0
+    while len(queries) < size and attempts < size * 50:
+        attempts += 1
+        age = rng.randint(18, 80)
+        calories = rng.choice(range(50, 900, 25))
+        query = rng.choice(TEMPLATES).format(
+            age=age, age2=age + rng.randint(5, 20),
+            poids=rng.randint(45, 120), taille=rng.randint(150, 200),
+            calories=calories, calories2=calories + rng.choice(range(50, 400, 50)),
+            fibres=rng.randint(2, 15), sodium=rng.choice(range(50, 1000, 50)),
+            minutes=rng.choice(range(10, 120, 5)), heures=rng.randint(1, 4),
+            prenom=rng.choice(PRENOMS), aliment=rng.choice(ALIMENTS),
+            recette=rng.choice(RECETTES), activite=rng.choice(ACTIVITES),
+        )
+        if query not in seen:
+            seen.add(query)
+            queries.append(query)
+    return queries
@@ -0,0 +1,376 @@
+"""Open-loop load test of the Flask app against a local SPARQL stand-in.
+
+Run from backend/:
+
+    python -m benchmarks.loadtest --rates 20,50,100,200 --duration 30
+    python -m benchmarks.loadtest --rates 50 --stub-latency-ms 30 --stub-failure-rate 0.02
+    python -m benchmarks.loadtest --rates 50 --record traffic.jsonl
+    python -m benchmarks.loadtest --replay traffic.jsonl --speed 4
+
+The app is served in-process by a threaded werkzeug server and its Fuseki
+is a benchmarks.sparql_stub instance, unless --target points at a running
+app. Arrivals are a Poisson process at each rate of --rates: a request is
+sent at its scheduled time whether or not the previous ones have finished,
+and its latency counts from that time, so a saturated app shows up as
+growing latencies instead of a silently lower load. A stage is reported as
+saturated when the throughput falls below 90 % of the offered rate or its
+p99 exceeds --slo-ms.
+
+Replay files hold one JSON request per line:
+{"t": seconds since the start of the run, "method": "GET", "path": "/api/...", "json": {...}}.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Avant le premier import de config : pas de téléchargement, pas de logs par requête
+os.environ.setdefault("SPACY_LOAD_MODE", "eager")
+os.environ.setdefault("SPACY_OFFLINE", "True")
+os.environ.setdefault("CACHE_WARMUP", "False")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import build_corpus, ALIMENTS  # noqa: E402
+from benchmarks.sparql_stub import SparqlStub  # noqa: E402
+
+DEFAULT_MIX = "search=40,list=20,autocomplete=10,relation=10,create=8,update=8,delete=4"
+LIST_ENTITIES = ["personnes", "aliments", "recettes", "nutriments", "allergies"]
+_ID_SEGMENT = re.compile(r"\d")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+def route_label(method, path):
+    """"GET /api/personnes/<id>" for a replayed path"""
+    segments = path.split("?", 1)[0].split("/")
+    return f"{method} " + "/".join(
+        "<id>" if i > 2 and _ID_SEGMENT.search(segment) else segment
+        for i, segment in enumerate(segments)
+    )
+
+
+class Scenarios:
+    """Build the requests of the traffic mix; ids match generate_data.py's dataset"""
+
+    def __init__(self, personnes, seed=7):
+        self.personnes = max(1, personnes)
+        self.aliments = max(24, personnes // 20)
+        self.corpus = build_corpus(500)
+        self.rng = random.Random(seed)
+        self.created = []
+        self._lock = threading.Lock()
+
+    def personne_id(self):
+        return f"gen{self.rng.randrange(self.personnes):07d}"
+
+    def aliment_id(self):
+        return f"gen{self.rng.randrange(self.aliments):07d}"
+
+    def build(self, name):
+        """(route label, method, path, json body) of one request of the given kind"""
+        rng = self.rng
+        if name == "search":
+            return ("POST /api/semantic-search", "POST", "/api/semantic-search",
+                    {"query": rng.choice(self.corpus)})
+        if name == "list":
+            entity = rng.choice(LIST_ENTITIES)
+            return (f"GET /api/{entity}", "GET", f"/api/{entity}", None)
+        if name == "autocomplete":
+            word = rng.choice(ALIMENTS)
+            prefix = word[:rng.randint(1, len(word))]
+            return ("GET /api/autocomplete", "GET", f"/api/autocomplete?q={prefix}", None)
+        if name == "relation":
+            if rng.random() < 0.5:
+                return ("POST /api/personnes/<id>/relations", "POST",
+                        f"/api/personnes/{self.personne_id()}/relations",
+                        {"typeRelation": "ALLERGIE", "cibleId": f"allergie_gen{rng.randrange(9):07d}"})
+            return ("POST /api/aliments/<id>/relations", "POST",
+                    f"/api/aliments/aliment_{self.aliment_id()}/relations",
+                    {"typeRelation": "NUTRIMENT", "cibleId": f"nutriment_gen{rng.randrange(12):07d}",
+                     "quantite": round(rng.uniform(1, 200), 1), "unite": "mg"})
+        if name == "create":
+            return ("POST /api/aliments", "POST", "/api/aliments", {
+                "nom": f"{rng.choice(ALIMENTS).capitalize()} test {rng.randrange(10 ** 6)}",
+                "calories": rng.randint(10, 600), "indexGlycémique": rng.randint(0, 100),
+            })
+        if name == "update":
+            return ("PUT /api/personnes/<id>", "PUT", f"/api/personnes/{self.personne_id()}", {
+                "nom": f"Charge {rng.randrange(10 ** 6)}", "âge": rng.randint(18, 90),
+                "poids": round(rng.uniform(45, 120), 1), "taille": round(rng.uniform(150, 200), 1),
+            })
+        if name == "delete":
+            with self._lock:
+                created = self.created.pop() if self.created else None
+            if created is None:
+                return self.build("create")
+            return ("DELETE /api/aliments/<id>", "DELETE", f"/api/aliments/{created}", None)
+        raise ValueError(f"scénario inconnu: {name}")
+
+    def completed(self, label, response):
+        """Remember the foods created so that the delete scenario has targets"""
+        if label == "POST /api/aliments" and response is not None and response.status_code == 201:
+            try:
+                entity_id = response.json().get("id")
+            except ValueError:
+                return
+            if entity_id:
+                with self._lock:
+                    self.created.append(entity_id)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class LoadTest:
+    """Send scheduled requests from a thread pool and keep one sample per request"""
+
+    def __init__(self, base_url, concurrency=200, timeout=30, scenarios=None, record=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.scenarios = scenarios
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.samples = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._record = record
+        # Origine des offsets enregistrés : le début du premier palier, pour tout le run
+        self._record_origin = None
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _send(self, stage, scheduled, label, method, path, body):
+        # Attente du créneau : la latence se mesure depuis l'heure prévue
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        response = error = None
+        try:
+            response = self._session().request(method, self.base_url + path, json=body, timeout=self.timeout)
+            response.content
+        except requests.RequestException as e:
+            error = type(e).__name__
+        latency = time.perf_counter() - scheduled
+        status = response.status_code if response is not None else None
+        with self._lock:
+            self.samples.append((stage, label, status, latency, error))
+        if self.scenarios:
+            self.scenarios.completed(label, response)
+
+    def _submit(self, stage, scheduled, label, method, path, body):
+        if self._record:
+            with self._lock:
+                self._record.write(json.dumps({"t": round(scheduled - self._record_origin, 6), "method": method,
+                                               "path": path, "json": body}, ensure_ascii=False) + "\n")
+        return self.pool.submit(self._send, stage, scheduled, label, method, path, body)
+
+    def run_stage(self, stage, rate, duration, mix, seed=1):
+        """Poisson arrivals at `rate` req/s for `duration` seconds"""
+        rng = random.Random(seed)
+        names, weights = list(mix), list(mix.values())
+        started = time.perf_counter()
+        if self._record_origin is None:
+            self._record_origin = started
+        scheduled = started
+        futures = []
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled - started >= duration:
+                break
+            # Ne pas prendre trop d'avance sur l'horloge : les scénarios dépendent des réponses
+            ahead = scheduled - time.perf_counter() - 0.05
+            if ahead > 0:
+                time.sleep(ahead)
+            label, method, path, body = self.scenarios.build(rng.choices(names, weights)[0])
+            futures.append(self._submit(stage, scheduled, label, method, path, body))
+        for future in futures:
+            future.result()
+        return time.perf_counter() - started
+
+    def replay(self, stage, entries, speed=1.0):
+        """Send recorded requests at their original offsets, `speed` times faster"""
+        started = time.perf_counter()
+        futures = []
+        for entry in entries:
+            scheduled = started + entry.get("t", 0) / speed
+            ahead = scheduled - time.perf_counter() - 0.05
+            if ahead > 0:
+                time.sleep(ahead)
+            method = entry.get("method", "GET").upper()
+            path = entry["path"]
+            label = entry.get("route") or route_label(method, path)
+            futures.append(self.pool.submit(self._send, stage, scheduled, label, method, path,
+                                            entry.get("json")))
+        for future in futures:
+            future.result()
+        return time.perf_counter() - started
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def summarize(samples, elapsed):
+    """Per-route counts, throughput, error rate and latency percentiles (ms)"""
+    by_route = {}
+    for _, label, status, latency, error in samples:
+        by_route.setdefault(label, []).append((status, latency, error))
+    by_route["TOTAL"] = [(status, latency, error) for _, _, status, latency, error in samples]
+
+    report = {}
+    for label, entries in by_route.items():
+        latencies = sorted(latency * 1000 for _, latency, _ in entries)
+        errors = sum(1 for status, _, error in entries if error or status is None or status >= 500)
+        client_errors = sum(1 for status, _, _ in entries if status is not None and 400 <= status < 500)
+        report[label] = {
+            "count": len(entries),
+            "throughput": round(len(entries) / elapsed, 2) if elapsed else None,
+            "error_rate": round(errors / len(entries), 4),
+            "client_error_rate": round(client_errors / len(entries), 4),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+        }
+    return report
+
+
+def print_report(title, report):
+    print(f"\n{title}")
+    print(f"{'route':<40}{'n':>7}{'req/s':>9}{'err %':>8}{'4xx %':>8}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, row in sorted(report.items(), key=lambda item: (item[0] == "TOTAL", item[0])):
+        print(f"{label:<40}{row['count']:>7}{row['throughput']:>9.1f}{row['error_rate'] * 100:>8.2f}"
+              f"{row['client_error_rate'] * 100:>8.2f}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}")
+
+
+def start_app(stub_url):
+    """Import the app against the stub and serve it from a background thread"""
+    os.environ["FUSEKI_URL"] = stub_url
+    import logging
+    from werkzeug.serving import make_server
+    import app
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadtest-app", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", help="URL of a running app (its Fuseki is then left as configured)")
+    parser.add_argument("--rates", default="20,50,100", help="offered requests/s, one stage per value")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per stage")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight list")
+    parser.add_argument("--replay", help="JSON-lines request log to replay instead of the mix")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed-up factor")
+    parser.add_argument("--record", help="write the generated requests to this JSON-lines file")
+    parser.add_argument("--concurrency", type=int, default=200, help="client threads")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--slo-ms", type=float, default=1000, help="p99 above which a stage is saturated")
+    parser.add_argument("--stub-latency-ms", type=float, default=5.0)
+    parser.add_argument("--stub-jitter", type=float, default=0.5)
+    parser.add_argument("--stub-failure-rate", type=float, default=0.0)
+    parser.add_argument("--stub-failure-status", type=int, default=503)
+    parser.add_argument("--personnes", type=int, default=2000, help="size of the stub's dataset")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    stub = server = None
+    base_url = args.target
+    if not base_url:
+        stub = SparqlStub().start()
+        # L'URL du stub doit être connue avant le premier import de config
+        os.environ["FUSEKI_URL"] = stub.url
+        stub.load_generated(args.personnes)
+        server, base_url = start_app(stub.url)
+        # Latence et erreurs injectées seulement une fois l'app démarrée
+        stub.latency_ms = args.stub_latency_ms
+        stub.jitter = args.stub_jitter
+        stub.failure_rate = args.stub_failure_rate
+        stub.failure_status = args.stub_failure_status
+        print(f"App sur {base_url}, SPARQL de substitution sur {stub.url} "
+              f"({'pyoxigraph' if stub.store is not None else 'réponses vides'})")
+
+    record = open(args.record, "w", encoding="utf-8") if args.record else None
+    scenarios = Scenarios(args.personnes)
+    test = LoadTest(base_url, args.concurrency, args.timeout, scenarios, record)
+    results = {"stages": []}
+    try:
+        if args.replay:
+            with open(args.replay, encoding="utf-8") as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+            entries.sort(key=lambda entry: entry.get("t", 0))
+            elapsed = test.replay("replay", entries, args.speed)
+            span = entries[-1].get("t", 0) / args.speed if entries else 0
+            stages = [("replay", len(entries) / span if span else 0, elapsed)]
+        else:
+            mix = parse_mix(args.mix)
+            stages = []
+            for i, rate in enumerate(float(r) for r in args.rates.split(",")):
+                print(f"Palier {rate:g} req/s pendant {args.duration:g}s…", flush=True)
+                elapsed = test.run_stage(f"{rate:g}/s", rate, args.duration, mix, seed=i + 1)
+                stages.append((f"{rate:g}/s", rate, elapsed))
+    finally:
+        test.close()
+        if record:
+            record.close()
+
+    saturation = None
+    for stage, offered, elapsed in stages:
+        samples = [s for s in test.samples if s[0] == stage]
+        if not samples:
+            continue
+        report = summarize(samples, elapsed)
+        total = report["TOTAL"]
+        saturated = total["throughput"] < 0.9 * offered or total["p99_ms"] > args.slo_ms
+        if saturated and saturation is None:
+            saturation = stage
+        print_report(f"== {stage} : {total['throughput']:.1f} req/s servies pour {offered:.1f} offertes"
+                     f"{'  ⚠️ saturé' if saturated else ''}", report)
+        results["stages"].append({"stage": stage, "offered": offered, "elapsed": round(elapsed, 3),
+                                  "saturated": saturated, "routes": report})
+
+    if stub:
+        print(f"\nSPARQL de substitution : {stub.stats}")
+        results["stub"] = dict(stub.stats)
+    if not args.replay:
+        print(f"Saturation : {saturation}" if saturation else "Aucun palier saturé")
+    results["saturation"] = saturation
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if server:
+        server.shutdown()
+    if stub:
+        stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Micro-benchmarks of the search parser, the query builders and the JSON paths.
+
+Run from backend/:
+
+    python -m benchmarks.run                  # compare with benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline  # record the baseline of this machine
+
+Each benchmark processes the whole corpus (or a fixed result set) once per
+round; the median of the rounds, per item, is compared with the baseline.
+The command exits with status 1 when a benchmark is slower than the
+baseline by more than --max-ratio. Baselines are only comparable on the
+same machine and Python version.
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+# Avant l'import de l'application : pas de Fuseki, pas de téléchargement, pas de logs
+os.environ.setdefault("SPACY_LOAD_MODE", "eager")
+os.environ.setdefault("SPACY_OFFLINE", "True")
+os.environ.setdefault("NAME_INDEX_ENABLED", "False")
+os.environ.setdefault("CACHE_WARMUP", "False")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from sparql_results import decode_tsv, flatten_binding  # noqa: E402
+from sparql_utils import ONTOLOGY_PREFIX, escape_sparql_string, build_sparql_value  # noqa: E402
+from benchmarks.corpus import build_corpus  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def sample_bindings(count=200):
+    """SPARQL JSON bindings shaped like the /api/aliments list"""
+    def literal(value, datatype=None):
+        term = {"type": "literal", "value": str(value)}
+        if datatype:
+            term["datatype"] = f"http://www.w3.org/2001/XMLSchema#{datatype}"
+        return term
+
+    return [
+        {
+            "s": {"type": "uri", "value": f"{ONTOLOGY_PREFIX}aliment_{i:08x}"},
+            "id": literal(f"aliment_{i:08x}"),
+            "nom": literal(f"Aliment n°{i} « bio »", "string"),
+            "calories": literal(50 + i % 700, "integer"),
+            "indexGlycémique": literal(i % 100, "integer"),
+            "teneurFibres": literal(round(i % 150 / 10, 1), "float"),
+        }
+        for i in range(count)
+    ]
+
+
+def sample_tsv(bindings):
+    """The same result set in Fuseki's TSV serialization"""
+    columns = ["id", "nom", "calories", "indexGlycémique", "teneurFibres"]
+    lines = ["\t".join(f"?{c}" for c in columns)]
+    for binding in bindings:
+        cells = []
+        for column in columns:
+            term = binding[column]
+            if "datatype" in term and not term["datatype"].endswith("#string"):
+                cells.append(f'"{term["value"]}"^^<{term["datatype"]}>')
+            else:
+                cells.append('"' + term["value"].replace('"', '\\"') + '"')
+        lines.append("\t".join(cells))
+    return "\n".join(lines) + "\n"
+
+
+def recorded_builds(parser, corpus):
+    """(entity_type, analysis, text) passed to build_sparql_query for each query"""
+    calls = []
+    original = parser.build_sparql_query
+
+    def record(entity_type, analysis, original_query):
+        calls.append((entity_type, copy.deepcopy(analysis), original_query))
+        return original(entity_type, analysis, original_query)
+
+    parser.build_sparql_query = record
+    try:
+        for query in corpus:
+            parser.fallback_parser(query)
+    finally:
+        del parser.build_sparql_query
+    return calls
+
+
+def benchmarks(corpus):
+    """{name: (items per round, function running one round)}"""
+    parser = app.nutrition_parser
+    cases = {}
+
+    if app.spacy_loader.ready:
+        cases["parse_query.spacy"] = (len(corpus), lambda: [parser.parse_query(q) for q in corpus])
+    cases["parse_query.fallback"] = (len(corpus), lambda: [parser.fallback_parser(q) for q in corpus])
+
+    builds = recorded_builds(parser, corpus)
+    cases["build_sparql_query"] = (
+        len(builds), lambda: [parser.build_sparql_query(*args) for args in builds]
+    )
+    cases["build_multi_entity_search"] = (
+        len(corpus), lambda: [app.build_multi_entity_search(q) for q in corpus]
+    )
+    cases["escape_sparql_string"] = (len(corpus), lambda: [escape_sparql_string(q) for q in corpus])
+    values = [(q, "string") for q in corpus] + [(len(q), "integer") for q in corpus] \
+        + [(len(q) / 7, "float") for q in corpus]
+    cases["build_sparql_value"] = (len(values), lambda: [build_sparql_value(v, t) for v, t in values])
+
+    bindings = sample_bindings()
+    tsv = sample_tsv(bindings)
+
+    def jsonify_bindings():
+        with app.app.app_context():
+            return app.jsonify(bindings).get_data()
+
+    cases["bindings.jsonify"] = (len(bindings), jsonify_bindings)
+    cases["bindings.flatten_dumps"] = (
+        len(bindings),
+        lambda: json.dumps([flatten_binding(b) for b in bindings], ensure_ascii=False),
+    )
+    cases["bindings.decode_tsv"] = (len(bindings), lambda: decode_tsv(tsv))
+    return cases
+
+
+def measure(items, run, rounds):
+    run()  # échauffement
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) / items * 1e6)
+    return {"median_us": round(statistics.median(timings), 3), "min_us": round(min(timings), 3)}
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--corpus-size", type=int, default=400)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-ratio", type=float, default=1.3,
+                        help="slowdown vs the baseline above which a benchmark fails")
+    parser.add_argument("--only", help="run the benchmarks whose name contains this text")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.corpus_size)
+    results = {}
+    for name, (items, run) in benchmarks(corpus).items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(items, run, args.rounds)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "corpus_size": len(corpus),
+                "spacy": app.spacy_loader.ready,
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+        print(f"Baseline enregistrée dans {args.baseline}")
+
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    reference = (baseline or {}).get("results", {})
+    if baseline and baseline.get("corpus_size") != len(corpus):
+        print(f"⚠️  Corpus de {baseline.get('corpus_size')} requêtes dans la baseline, {len(corpus)} ici")
+
+    print(f"{'benchmark':<28}{'médiane µs/op':>15}{'min µs/op':>12}{'baseline':>12}{'ratio':>9}")
+    regressions = []
+    for name, result in results.items():
+        line = f"{name:<28}{result['median_us']:>15.2f}{result['min_us']:>12.2f}"
+        if name in reference:
+            ratio = result["median_us"] / reference[name]["median_us"]
+            flag = "  ❌" if ratio > args.max_ratio else ""
+            line += f"{reference[name]['median_us']:>12.2f}{ratio:>8.2f}x{flag}"
+            if ratio > args.max_ratio:
+                regressions.append(name)
+        print(line)
+
+    if baseline is None and not args.save_baseline:
+        print(f"Aucune baseline ({args.baseline}) : lancer avec --save-baseline pour en créer une")
+    if regressions:
+        print(f"Régressions au-delà de {args.max_ratio}x : {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
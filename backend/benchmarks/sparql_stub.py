@@ -0,0 +1,208 @@
+"""Local stand-in for Fuseki with injectable latency and failures.
+
+Serves the endpoints the app uses (/<dataset>/sparql, /update, /data and
+/$/ping) from a background thread. With pyoxigraph installed the queries run
+against an in-memory store, preloaded with generate_data.py's dataset, so
+the responses have realistic sizes. Without it every SELECT returns no rows,
+ASK returns false and updates are accepted: only the injected latency and
+failures remain, which is enough to measure the app's own overhead.
+
+    python -m benchmarks.sparql_stub --port 3030 --latency-ms 20 --failure-rate 0.01
+"""
+
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import pyoxigraph
+except ImportError:
+    pyoxigraph = None
+
+_ASK = re.compile(r"^\s*ASK\b", re.IGNORECASE | re.MULTILINE)
+_RESULT_FORMATS = [
+    ("tab-separated-values", "text/tab-separated-values", "TSV"),
+    ("csv", "text/csv", "CSV"),
+    ("xml", "application/sparql-results+xml", "XML"),
+]
+
+
+class SparqlStub:
+    """Fake Fuseki server; `latency_ms` is the median of a log-normal delay"""
+
+    def __init__(self, host="127.0.0.1", port=0, dataset="nutrition", latency_ms=0.0,
+                 jitter=0.5, failure_rate=0.0, failure_status=503, personnes=0, seed=42):
+        self.dataset = dataset
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.store = pyoxigraph.Store() if pyoxigraph else None
+        self.stats = {"query": 0, "update": 0, "data": 0, "failed": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        if personnes and self.store is not None:
+            self.load_generated(personnes, seed)
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def load_generated(self, personnes, seed=42):
+        """Preload the store with the synthetic dataset of generate_data.py"""
+        from generate_data import DatasetGenerator
+        data = "".join(DatasetGenerator(personnes, seed=seed).triples()).encode("utf-8")
+        self.store.bulk_load(data, format=pyoxigraph.RdfFormat.N_TRIPLES)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="sparql-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _delay(self):
+        """Sleep for the injected latency; True when this request must fail"""
+        with self._lock:
+            delay = self.latency_ms * self._rng.lognormvariate(0, self.jitter) if self.latency_ms else 0
+            fail = self.failure_rate and self._rng.random() < self.failure_rate
+        if delay:
+            time.sleep(delay / 1000)
+        if fail:
+            with self._lock:
+                self.stats["failed"] += 1
+        return fail
+
+    def _count(self, kind):
+        with self._lock:
+            self.stats[kind] += 1
+
+    def run_query(self, query, accept):
+        if self.store is None:
+            if _ASK.search(query):
+                return json.dumps({"head": {}, "boolean": False}).encode(), "application/sparql-results+json"
+            return json.dumps({"head": {"vars": []}, "results": {"bindings": []}}).encode(), \
+                "application/sparql-results+json"
+        results = self.store.query(query)
+        if isinstance(results, pyoxigraph.QueryTriples):
+            return results.serialize(format=pyoxigraph.RdfFormat.N_TRIPLES), "application/n-triples"
+        for token, mimetype, name in _RESULT_FORMATS:
+            if token in accept:
+                return results.serialize(format=getattr(pyoxigraph.QueryResultsFormat, name)), mimetype
+        return results.serialize(format=pyoxigraph.QueryResultsFormat.JSON), "application/sparql-results+json"
+
+    def run_update(self, update):
+        if self.store is not None:
+            self.store.update(update)
+
+    def load_data(self, body):
+        if self.store is not None:
+            self.store.load(body, format=pyoxigraph.RdfFormat.N_TRIPLES)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # En-têtes et corps en une seule écriture (sinon Nagle + ACK retardé : +40 ms)
+            wbufsize = -1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", content_type="text/plain; charset=utf-8"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _params(self, body):
+                params = parse_qs(urlparse(self.path).query)
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("application/sparql-query"):
+                    params["query"] = [body.decode("utf-8")]
+                elif content_type.startswith("application/sparql-update"):
+                    params["update"] = [body.decode("utf-8")]
+                elif body:
+                    params.update(parse_qs(body.decode("utf-8")))
+                return {key: values[0] for key, values in params.items()}
+
+            def _dispatch(self, body=b""):
+                path = urlparse(self.path).path
+                if path.startswith("/$/ping"):
+                    return self._send(200, b"ok")
+                prefix = f"/{stub.dataset}/"
+                if not path.startswith(prefix):
+                    return self._send(404, b"Not found")
+                service = path[len(prefix):]
+                if service not in ("sparql", "query", "update", "data"):
+                    return self._send(404, b"Not found")
+                if stub._delay():
+                    return self._send(stub.failure_status, b"Injected failure")
+                try:
+                    if service == "data":
+                        stub._count("data")
+                        if self.headers.get("Content-Encoding") == "gzip":
+                            body = gzip.decompress(body)
+                        stub.load_data(body)
+                        return self._send(200, b"{}", "application/json")
+                    params = self._params(body)
+                    if service == "update":
+                        stub._count("update")
+                        stub.run_update(params["update"])
+                        return self._send(204)
+                    stub._count("query")
+                    result, content_type = stub.run_query(params["query"], self.headers.get("Accept", ""))
+                    return self._send(200, result, content_type)
+                except KeyError as e:
+                    return self._send(400, f"Missing parameter {e}".encode())
+                except (SyntaxError, ValueError, OSError) as e:
+                    return self._send(400, str(e).encode())
+
+            def do_GET(self):
+                self._dispatch()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self._dispatch(self.rfile.read(length))
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3030)
+    parser.add_argument("--dataset", default="nutrition")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="median injected latency")
+    parser.add_argument("--jitter", type=float, default=0.5, help="sigma of the log-normal latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument("--personnes", type=int, default=2000, help="size of the preloaded dataset")
+    args = parser.parse_args(argv)
+
+    stub = SparqlStub(args.host, args.port, args.dataset, args.latency_ms, args.jitter,
+                      args.failure_rate, args.failure_status, args.personnes)
+    print(f"SPARQL de substitution sur {stub.url}/{args.dataset} "
+          f"({'pyoxigraph' if stub.store is not None else 'réponses vides'})")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
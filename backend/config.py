@@ -6,6 +6,90 @@ FUSEKI_USERNAME = os.getenv("FUSEKI_USERNAME", "admin")
 FUSEKI_PASSWORD = os.getenv("FUSEKI_PASSWORD", "admin")
 DATASET_NAME = "nutrition"
 
+# Réplicas en lecture (URLs séparées par des virgules) ; FUSEKI_URL reste le primaire des écritures
+FUSEKI_REPLICAS = [u.strip().rstrip("/") for u in os.getenv("FUSEKI_REPLICAS", "").split(",") if u.strip()]
+FUSEKI_READ_FROM_PRIMARY = os.getenv("FUSEKI_READ_FROM_PRIMARY", "False") == "True"
+# Lecture doublée sur un autre réplica au-delà de ce centile de latence (0 : désactivée)
+FUSEKI_HEDGE_PERCENTILE = float(os.getenv("FUSEKI_HEDGE_PERCENTILE", 0.0))
+FUSEKI_HEDGE_MIN_MS = float(os.getenv("FUSEKI_HEDGE_MIN_MS", 20))
+# Lectures envoyées au primaire pendant ce délai après une écriture (lire ses écritures)
+FUSEKI_STICKY_SECONDS = float(os.getenv("FUSEKI_STICKY_SECONDS", 2))
+# Threads des lectures doublées (0 : FUSEKI_POOL_SIZE connexions par nœud)
+FUSEKI_HEDGE_WORKERS = int(os.getenv("FUSEKI_HEDGE_WORKERS", 0))
+# Disjoncteur par nœud : échecs consécutifs avant exclusion, délai avant nouvel essai
+FUSEKI_BREAKER_FAILURES = int(os.getenv("FUSEKI_BREAKER_FAILURES", 5))
+FUSEKI_BREAKER_RESET = float(os.getenv("FUSEKI_BREAKER_RESET", 30))
+
+# Surveillance du store : ping en arrière-plan, échecs avant ouverture du disjoncteur,
+# délai entre deux sondes tant qu'il est ouvert ; les routes de données répondent alors 503
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", 5))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", 2))
+HEALTH_FAILURE_THRESHOLD = int(os.getenv("HEALTH_FAILURE_THRESHOLD", 2))
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", 2))
+HEALTH_FAST_FAIL = os.getenv("HEALTH_FAST_FAIL", "True") == "True"
+
+# Stockage : "fuseki" (serveur HTTP) ou "oxigraph" (store embarqué, paquet pyoxigraph)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "fuseki")
+# Répertoire du store Oxigraph (vide : en mémoire) et fichier chargé s'il est vide
+OXIGRAPH_PATH = os.getenv("OXIGRAPH_PATH", "")
+OXIGRAPH_LOAD_FILE = os.getenv("OXIGRAPH_LOAD_FILE", "")
+
+# Pool de connexions HTTP vers Fuseki
+FUSEKI_POOL_SIZE = int(os.getenv("FUSEKI_POOL_SIZE", 20))
+FUSEKI_CONNECT_TIMEOUT = float(os.getenv("FUSEKI_CONNECT_TIMEOUT", 3))
+FUSEKI_TIMEOUT = float(os.getenv("FUSEKI_TIMEOUT", 10))
+FUSEKI_RETRIES = int(os.getenv("FUSEKI_RETRIES", 2))
+FUSEKI_BACKOFF = float(os.getenv("FUSEKI_BACKOFF", 0.2))
+# Requêtes asynchrones simultanées (client asyncio)
+FUSEKI_ASYNC_MAX_CONNECTIONS = int(os.getenv("FUSEKI_ASYNC_MAX_CONNECTIONS", 200))
+
+# Cache des résultats SPARQL (invalidé par les écritures de l'API)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "True") == "True"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+CACHE_TTL = float(os.getenv("CACHE_TTL", 300))
+CACHE_WARMUP = os.getenv("CACHE_WARMUP", "False") == "True"
+# Cache de la recherche sémantique : requêtes analysées et résultats
+SEARCH_CACHE_MAX_QUERIES = int(os.getenv("SEARCH_CACHE_MAX_QUERIES", 2048))
+SEARCH_CACHE_MAX_RESULTS = int(os.getenv("SEARCH_CACHE_MAX_RESULTS", 512))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+# Index des noms en mémoire (recherche par nom sans FILTER(REGEX))
+NAME_INDEX_ENABLED = os.getenv("NAME_INDEX_ENABLED", "True") == "True"
+# Au-delà, la recherche retombe sur FILTER(REGEX) plutôt qu'un bloc VALUES géant
+NAME_INDEX_MAX_CANDIDATES = int(os.getenv("NAME_INDEX_MAX_CANDIDATES", 1000))
+# Reconstruction périodique (secondes, 0 : jamais) pour voir les écritures faites hors de ce processus
+NAME_INDEX_TTL = float(os.getenv("NAME_INDEX_TTL", 300))
+# Autocomplétion : suggestions par préfixe et nombre de recherches mémorisées
+AUTOCOMPLETE_TOP_K = int(os.getenv("AUTOCOMPLETE_TOP_K", 10))
+AUTOCOMPLETE_MAX_QUERIES = int(os.getenv("AUTOCOMPLETE_MAX_QUERIES", 10000))
+
+# Import en masse : taille maximale d'un INSERT DATA
+BULK_CHUNK_BYTES = int(os.getenv("BULK_CHUNK_BYTES", 256 * 1024))
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", 1000))
+
+# Moteur de recommandation : aliments retenus par personne, mémoire des scores par bloc de profils
+RECOMMENDATION_TOP_K = int(os.getenv("RECOMMENDATION_TOP_K", 5))
+RECOMMENDATION_SCORE_BUDGET_BYTES = int(os.getenv("RECOMMENDATION_SCORE_BUDGET_BYTES", 64 * 1024 * 1024))
+
+# Modèle SpaCy : chargement "eager", "lazy", "background" ou "off"
+SPACY_MODEL = os.getenv("SPACY_MODEL", "fr_core_news_sm")
+SPACY_LOAD_MODE = os.getenv("SPACY_LOAD_MODE", "background")
+# Composants non utilisés par le parser (le parser de dépendances sert à token.children)
+SPACY_EXCLUDE = [c.strip() for c in os.getenv("SPACY_EXCLUDE", "ner").split(",") if c.strip()]
+# Mode hors ligne : ne jamais tenter de télécharger le modèle
+SPACY_OFFLINE = os.getenv("SPACY_OFFLINE", "False") == "True"
+
+# Journalisation : niveau, échantillonnage du texte des requêtes SPARQL
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Fraction des requêtes réussies dont le texte est journalisé (les échecs le sont toujours)
+QUERY_LOG_SAMPLE_RATE = float(os.getenv("QUERY_LOG_SAMPLE_RATE", 0.0))
+# Requêtes récentes conservées en mémoire pour /api/admin/queries
+QUERY_LOG_SIZE = int(os.getenv("QUERY_LOG_SIZE", 200))
+# Requêtes lentes : seuil en millisecondes et nombre conservé pour /api/debug/slow-queries
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 500))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", 500))
+
 # Configuration Flask
 DEBUG = os.getenv("DEBUG", "True") == "True"
 PORT = int(os.getenv("PORT", 5000))
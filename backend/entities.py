@@ -0,0 +1,444 @@
+"""Declarative description of the entity list endpoints"""
+
+import base64
+import binascii
+import json
+import re
+import uuid
+from datetime import datetime
+
+from sparql_utils import ONTOLOGY_PREFIX, escape_sparql_string, build_sparql_value
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Pour chaque liste : la classe RDF et les champs exposés.
+# Un champ = (nom de variable, motif sur ?s, obligatoire). Les champs
+# obligatoires restent dans le WHERE même s'ils ne sont pas projetés, afin
+# que `fields=` ne change pas l'ensemble des entités renvoyées.
+ENTITY_LISTS = {
+    "personnes": {
+        "class": "Personne",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+            ("âge", "?s nutrition:âge ?âge .", True),
+            ("poids", "?s nutrition:poids ?poids .", True),
+            ("taille", "?s nutrition:taille ?taille .", True),
+            ("objectifPoids", "?s nutrition:objectifPoids ?objectifPoids .", False),
+        ],
+    },
+    "aliments": {
+        "class": "Aliment",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+            ("calories", "?s nutrition:calories ?calories .", True),
+            ("indexGlycémique", "?s nutrition:indexGlycémique ?indexGlycémique .", True),
+            ("teneurFibres", "?s nutrition:teneurFibres ?teneurFibres .", False),
+            ("teneurSodium", "?s nutrition:teneurSodium ?teneurSodium .", False),
+        ],
+    },
+    "activites": {
+        "class": "ActivitePhysique",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+            ("dureeActivite", "?s nutrition:dureeActivite ?dureeActivite .", True),
+            ("type", "?s nutrition:type ?type .", False),
+        ],
+    },
+    "nutriments": {
+        "class": "Nutriment",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+            ("doseRecommandée", "?s nutrition:doseRecommandée ?doseRecommandée .", True),
+            ("unitéDose", "?s nutrition:unitéDose ?unitéDose .", True),
+        ],
+    },
+    "conditions": {
+        "class": "ConditionMedicale",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+        ],
+    },
+    "allergies": {
+        "class": "Allergie",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+            ("typeAllergie", "?s nutrition:typeAllergie ?typeAllergie .", True),
+        ],
+    },
+    "objectifs": {
+        "class": "Objectif",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+        ],
+    },
+    "recettes": {
+        "class": "Recette",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+            ("description", "?s nutrition:description ?description .", False),
+            ("tempsPréparation", "?s nutrition:tempsPréparation ?tempsPréparation .", False),
+            ("niveauDifficulté", "?s nutrition:niveauDifficulté ?niveauDifficulté .", False),
+        ],
+    },
+    "repas": {
+        "class": "Repas",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+            ("type", "?s nutrition:type ?type .", False),
+        ],
+    },
+    "programmes": {
+        "class": "ProgrammeBienEtre",
+        "fields": [
+            ("personneId", '?s nutrition:AProgramme ?personne . BIND(STRAFTER(STR(?personne), "#") AS ?personneId)', True),
+            ("objectifId", '?s nutrition:Vise ?objectif . BIND(STRAFTER(STR(?objectif), "#") AS ?objectifId)', True),
+            ("dateDebut", "?s nutrition:dateDebut ?dateDebut .", False),
+            ("dateFin", "?s nutrition:dateFin ?dateFin .", False),
+        ],
+    },
+    "preferences": {
+        "class": "PreferenceAlimentaire",
+        "fields": [
+            ("nom", "?s nutrition:nom ?nom .", True),
+        ],
+    },
+    "recommandations": {
+        "class": "Recommandation",
+        "fields": [
+            ("personneId", '?s nutrition:recommande ?personne . BIND(STRAFTER(STR(?personne), "#") AS ?personneId)', True),
+            ("alimentId", '?s nutrition:associeAliment ?aliment . BIND(STRAFTER(STR(?aliment), "#") AS ?alimentId)', True),
+            ("activiteId", '?s nutrition:associeActivite ?activite . BIND(STRAFTER(STR(?activite), "#") AS ?activiteId)', False),
+            ("dateCreation", "?s nutrition:dateCreation ?dateCreation .", False),
+            ("score", "?s nutrition:score ?score .", False),
+        ],
+    },
+}
+
+# Propriétés écrites à la création : (clé JSON, prédicat, type, valeur par défaut).
+# Une propriété sans valeur par défaut n'est écrite que si elle est renseignée ;
+# le type "link:<type>" désigne une référence obligatoire vers une autre entité.
+# `id_prefix` reproduit le format d'identifiant par défaut de chaque handler.
+ENTITY_SCHEMAS = {
+    "personnes": {
+        "uri_type": "personne",
+        "id_prefix": None,
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+            ("âge", "âge", "integer", 0),
+            ("poids", "poids", "float", 0.0),
+            ("taille", "taille", "float", 0.0),
+            ("objectifPoids", "objectifPoids", "float", None),
+        ],
+    },
+    "aliments": {
+        "uri_type": "aliment",
+        "id_prefix": None,
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+            ("calories", "calories", "integer", 0),
+            ("indexGlycémique", "indexGlycémique", "integer", 0),
+            ("teneurFibres", "teneurFibres", "float", None),
+            ("teneurSodium", "teneurSodium", "float", None),
+        ],
+    },
+    "activites": {
+        "uri_type": "activite",
+        "id_prefix": None,
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+            ("dureeActivite", "dureeActivite", "integer", 0),
+            ("type", "type", "string", None),
+        ],
+    },
+    "nutriments": {
+        "uri_type": "nutriment",
+        "id_prefix": None,
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+            ("doseRecommandée", "doseRecommandée", "float", 0.0),
+            ("unitéDose", "unitéDose", "string", "mg"),
+        ],
+    },
+    "conditions": {
+        "uri_type": "condition",
+        "id_prefix": None,
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+        ],
+    },
+    "allergies": {
+        "uri_type": "allergie",
+        "id_prefix": "allergie_",
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+            ("typeAllergie", "typeAllergie", "string", "Unknown"),
+        ],
+    },
+    "objectifs": {
+        "uri_type": "objectif",
+        "id_prefix": "objectif_",
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+        ],
+    },
+    "recettes": {
+        "uri_type": "recette",
+        "id_prefix": "recette_",
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+            ("description", "description", "string", "Unknown"),
+            ("tempsPréparation", "tempsPréparation", "integer", None),
+            ("niveauDifficulté", "niveauDifficulté", "string", "Unknown"),
+        ],
+    },
+    "repas": {
+        "uri_type": "repas",
+        "id_prefix": "repas_",
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+            ("type", "type", "string", "Unknown"),
+        ],
+    },
+    "programmes": {
+        "uri_type": "programme",
+        "id_prefix": "programme_",
+        "properties": [
+            ("personneId", "AProgramme", "link:personne", None),
+            ("objectifId", "Vise", "link:objectif", None),
+        ],
+    },
+    "preferences": {
+        "uri_type": "pref",
+        "id_prefix": "pref_",
+        "properties": [
+            ("nom", "nom", "string", "Unknown"),
+        ],
+    },
+    "recommandations": {
+        "uri_type": "recommandation",
+        "id_prefix": "recommandation_",
+        "properties": [
+            ("personneId", "recommande", "link:personne", None),
+            ("alimentId", "associeAliment", "link:aliment", None),
+            ("dateCreation", "dateCreation", "string", lambda: datetime.now().isoformat()),
+            ("score", "score", "float", None),
+        ],
+    },
+}
+
+
+_UNSAFE_ID = re.compile(r'[\s<>"{}|^`\\]')
+
+
+def validate_id(entity_id):
+    """Reject identifiers that cannot be embedded in an IRI"""
+    if not isinstance(entity_id, str) or not entity_id or _UNSAFE_ID.search(entity_id):
+        raise ValueError(f"identifiant invalide: {entity_id!r}")
+    return entity_id
+
+
+def entity_uri(uri_type, entity_id):
+    """URI of an entity, as built by generate_uri"""
+    return f"{ONTOLOGY_PREFIX}{uri_type}_{entity_id}"
+
+
+def new_entity_id(entity, data):
+    """Identifier of an entity about to be created from `data`"""
+    id_prefix = ENTITY_SCHEMAS[entity]["id_prefix"]
+    if id_prefix is None:
+        return validate_id(data.get("id") or uuid.uuid4().hex[:8])
+    return validate_id(data.get("id", f"{id_prefix}{uuid.uuid4().hex[:8]}"))
+
+
+def build_entity_triples(entity, uri, data):
+    """Triples describing a new entity; raises ValueError on invalid values"""
+    statements = [f"a nutrition:{ENTITY_LISTS[entity]['class']}"]
+    for key, predicate, data_type, default in ENTITY_SCHEMAS[entity]["properties"]:
+        value = data.get(key)
+        if data_type.startswith("link:"):
+            if not value:
+                raise ValueError(f"{key} manquant")
+            statements.append(f"nutrition:{predicate} <{entity_uri(data_type[5:], validate_id(value))}>")
+            continue
+        if default is None and not value:
+            continue
+        if value is None:
+            value = default() if callable(default) else default
+        try:
+            literal = build_sparql_value(value, data_type)
+        except (TypeError, ValueError):
+            raise ValueError(f"valeur invalide pour {key}: {value!r}")
+        statements.append(f"nutrition:{predicate} {literal}")
+    return f"<{uri}> " + " ;\n    ".join(statements) + " ."
+
+
+def written_name(entity, data, created=False):
+    """Value a create (or a patch) writes to nutrition:nom, or None if left untouched.
+
+    An empty string means the name is removed.
+    """
+    for key, predicate, _, default in ENTITY_SCHEMAS[entity]["properties"]:
+        if predicate != "nom":
+            continue
+        if not created:
+            return (data.get(key) or "") if key in data else None
+        value = data.get(key)
+        if value is None and default is not None:
+            value = default() if callable(default) else default
+        return value or ""
+    return None
+
+
+def build_patch_update(entity, uri, data):
+    """Single DELETE/INSERT/WHERE update replacing the properties present in `data`.
+
+    Properties absent from `data` are left untouched; an optional property
+    sent as null or empty is removed. The WHERE clause requires the entity to
+    exist, so patching an unknown URI is a no-op rather than a partial insert.
+    Raises ValueError on invalid values or when nothing is to be updated.
+    """
+    deletes, inserts, optionals = [], [], []
+    for index, (key, predicate, data_type, default) in enumerate(ENTITY_SCHEMAS[entity]["properties"]):
+        if key not in data:
+            continue
+        value = data[key]
+        old = f"?old{index}"
+        deletes.append(f"<{uri}> nutrition:{predicate} {old} .")
+        optionals.append(f"OPTIONAL {{ <{uri}> nutrition:{predicate} {old} }}")
+        if value is None or value == "":
+            if default is not None or data_type.startswith("link:"):
+                raise ValueError(f"{key} manquant")
+            continue
+        if data_type.startswith("link:"):
+            inserts.append(f"<{uri}> nutrition:{predicate} <{entity_uri(data_type[5:], validate_id(value))}> .")
+            continue
+        try:
+            literal = build_sparql_value(value, data_type)
+        except (TypeError, ValueError):
+            raise ValueError(f"valeur invalide pour {key}: {value!r}")
+        inserts.append(f"<{uri}> nutrition:{predicate} {literal} .")
+    if not deletes:
+        raise ValueError("aucune propriété à mettre à jour")
+
+    where = "\n    ".join([f"<{uri}> a nutrition:{ENTITY_LISTS[entity]['class']} ."] + optionals)
+    return (
+        "DELETE {\n    " + "\n    ".join(deletes) + "\n}\n"
+        "INSERT {\n    " + "\n    ".join(inserts) + "\n}\n"
+        "WHERE {\n    " + where + "\n}"
+    )
+
+
+def parse_fields(entity, fields_param):
+    """Turn a `fields=a,b` parameter into the list of projected fields"""
+    if not fields_param:
+        return None
+    known = [name for name, _, _ in ENTITY_LISTS[entity]["fields"]]
+    requested = [f.strip() for f in fields_param.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in known and f != "id"]
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(unknown)} (disponibles: {', '.join(known)})")
+    return [f for f in requested if f != "id"]
+
+
+def build_list_query(entity, fields=None, after=None, limit=None):
+    """Build the SELECT for a list endpoint.
+
+    `fields` limits the projection (and the OPTIONAL joins) to the given
+    fields; `after` and `limit` turn it into a keyset page ordered on the
+    entity URI. A page holds `limit` entities, not rows: the entities are
+    picked in a subquery (one extra to know whether a next page exists) and
+    their fields joined outside it, so an entity with a multi-valued field
+    is never split across two pages. See page_cut().
+    """
+    spec = ENTITY_LISTS[entity]
+    selected = [name for name, _, _ in spec["fields"] if fields is None or name in fields]
+
+    required = [f"?s a nutrition:{spec['class']} ."]
+    required += [pattern for _, pattern, is_required in spec["fields"] if is_required]
+    patterns = list(required)
+    for name, pattern, is_required in spec["fields"]:
+        if not is_required and name in selected:
+            patterns.append(f"OPTIONAL {{ {pattern} }}")
+    patterns.append('BIND(STRAFTER(STR(?s), "#") AS ?id)')
+
+    variables = ["?id"] + [f"?{name}" for name in selected]
+    if limit is not None:
+        variables.append("?s")
+        if after is not None:
+            required.append(f'FILTER(STR(?s) > "{escape_sparql_string(after)}")')
+        page = "\n                ".join(required)
+        patterns.insert(0, f"""{{
+            SELECT DISTINCT ?s WHERE {{
+                {page}
+            }} ORDER BY STR(?s) LIMIT {int(limit) + 1}
+        }}""")
+    elif after is not None:
+        patterns.append(f'FILTER(STR(?s) > "{escape_sparql_string(after)}")')
+    body = "\n        ".join(patterns)
+    query = f"""
+    SELECT {' '.join(variables)} WHERE {{
+        {body}
+    }}
+    """
+    if limit is not None:
+        query += "ORDER BY STR(?s)\n"
+    return query
+
+
+def page_cut(subjects, limit):
+    """(number of rows to keep, URI for the next cursor or None) of a keyset page.
+
+    `subjects` is the ?s of each row, in order; rows of the same entity are
+    contiguous. The rows of the first `limit` entities are kept; when an
+    extra entity follows, the last kept one becomes the cursor.
+    """
+    seen = 0
+    previous = None
+    for index, subject in enumerate(subjects):
+        if subject != previous:
+            if seen == limit:
+                return index, previous
+            seen += 1
+            previous = subject
+    return len(subjects), None
+
+
+def build_count_query(entities):
+    """Count the members of several lists in one grouped SELECT.
+
+    Each list keeps the required patterns of its list query so the counts
+    match the length of the corresponding endpoints.
+    """
+    branches = []
+    for entity in entities:
+        spec = ENTITY_LISTS[entity]
+        patterns = [f"?s a nutrition:{spec['class']} ."]
+        patterns += [pattern for _, pattern, required in spec["fields"] if required]
+        patterns.append(f'BIND("{entity}" AS ?entity)')
+        branches.append("{ " + " ".join(patterns) + " }")
+    union = "\n        UNION\n        ".join(branches)
+    return f"""
+    SELECT ?entity (COUNT(DISTINCT ?s) AS ?count) WHERE {{
+        {union}
+    }} GROUP BY ?entity
+    """
+
+
+def encode_cursor(uri):
+    """Opaque continuation token for the page following `uri`"""
+    raw = json.dumps({"after": uri}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; raises ValueError on a malformed token"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        after = data["after"]
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Curseur de pagination invalide")
+    if not isinstance(after, str):
+        raise ValueError("Curseur de pagination invalide")
+    return after
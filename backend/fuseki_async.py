@@ -0,0 +1,106 @@
+"""Asyncio SPARQL client for concurrent Fuseki fan-out inside a request
+
+Flask stays a WSGI app: every HTTP request still holds a worker thread.
+What runs on the event loop is the fan-out of one handler, whose Fuseki
+calls are gathered instead of made one after the other.
+"""
+
+import asyncio
+import threading
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from config import (
+    FUSEKI_URL, FUSEKI_USERNAME, FUSEKI_PASSWORD, DATASET_NAME,
+    FUSEKI_POOL_SIZE, FUSEKI_CONNECT_TIMEOUT, FUSEKI_TIMEOUT,
+    FUSEKI_ASYNC_MAX_CONNECTIONS,
+)
+
+
+class AsyncFusekiClient:
+    """Non-blocking counterpart of ``FusekiClient`` built on httpx.
+
+    All requests share one keep-alive pool, so the queries gathered by every
+    handler can be in flight on a single event loop without a thread each.
+    """
+
+    def __init__(self, base_url=FUSEKI_URL, dataset=DATASET_NAME,
+                 username=FUSEKI_USERNAME, password=FUSEKI_PASSWORD,
+                 max_connections=FUSEKI_ASYNC_MAX_CONNECTIONS,
+                 keepalive=FUSEKI_POOL_SIZE, connect_timeout=FUSEKI_CONNECT_TIMEOUT,
+                 timeout=FUSEKI_TIMEOUT):
+        base_url = base_url.rstrip("/")
+        self.query_endpoint = f"{base_url}/{dataset}/sparql"
+        self.update_endpoint = f"{base_url}/{dataset}/update"
+        self.client = httpx.AsyncClient(
+            auth=(username, password),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=keepalive),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+
+    async def query(self, query, accept="application/sparql-results+json", timeout=None):
+        """POST a SPARQL query and return the raw HTTP response"""
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        return await self.client.post(self.query_endpoint, data={"query": query},
+                                      headers={"Accept": accept}, **kwargs)
+
+    async def update(self, update, timeout=None):
+        """POST a SPARQL update and return the raw HTTP response"""
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        return await self.client.post(self.update_endpoint, data={"update": update}, **kwargs)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class _EventLoopThread:
+    """Dedicated event loop shared by every worker thread of the process.
+
+    httpx connections are bound to the loop that opened them, so the client
+    lives on this loop and synchronous Flask handlers submit coroutines to it.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.client = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self.loop is not None:
+            return
+        with self._lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="fuseki-async", daemon=True)
+            thread.start()
+            self.loop = loop
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the shared loop and wait for its result"""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+_loop_thread = _EventLoopThread()
+_client_lock = threading.Lock()
+
+
+def get_async_client():
+    """Return the AsyncFusekiClient of the running loop (None without httpx)"""
+    if httpx is None:
+        return None
+    if _loop_thread.client is None:
+        with _client_lock:
+            if _loop_thread.client is None:
+                _loop_thread.client = AsyncFusekiClient()
+    return _loop_thread.client
+
+
+def run_async(coro, timeout=None):
+    """Execute a coroutine on the shared Fuseki event loop from sync code"""
+    return _loop_thread.run(coro, timeout)
@@ -0,0 +1,103 @@
+"""Shared, pooled HTTP client for all Fuseki traffic"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+
+from config import (
+    FUSEKI_URL, FUSEKI_USERNAME, FUSEKI_PASSWORD, DATASET_NAME,
+    FUSEKI_POOL_SIZE, FUSEKI_CONNECT_TIMEOUT, FUSEKI_TIMEOUT,
+    FUSEKI_RETRIES, FUSEKI_BACKOFF,
+)
+
+
+class FusekiClient:
+    """Keep-alive client for one Fuseki dataset.
+
+    A single ``requests.Session`` is shared by every worker thread: the
+    underlying urllib3 pool is thread-safe and reuses TCP connections, and
+    the basic-auth credentials are built once. Reads (SPARQL queries and
+    pings) are retried with exponential backoff; updates are never retried
+    because they are not idempotent.
+    """
+
+    def __init__(self, base_url=FUSEKI_URL, dataset=DATASET_NAME,
+                 username=FUSEKI_USERNAME, password=FUSEKI_PASSWORD,
+                 pool_size=FUSEKI_POOL_SIZE, connect_timeout=FUSEKI_CONNECT_TIMEOUT,
+                 timeout=FUSEKI_TIMEOUT, retries=FUSEKI_RETRIES, backoff=FUSEKI_BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.query_endpoint = f"{self.base_url}/{dataset}/sparql"
+        self.update_endpoint = f"{self.base_url}/{dataset}/update"
+        self.ping_endpoint = f"{self.base_url}/$/ping"
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+
+        read_retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "POST"]),
+            raise_on_status=False,
+        )
+        read_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                   max_retries=read_retry)
+        write_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                                    max_retries=0)
+
+        session = requests.Session()
+        session.auth = HTTPBasicAuth(username, password)
+        # Le préfixe le plus long l'emporte : seules les lectures sont rejouées
+        session.mount(self.base_url, write_adapter)
+        session.mount(self.query_endpoint, read_adapter)
+        session.mount(self.ping_endpoint, read_adapter)
+        self.session = session
+
+    def _timeout(self, timeout):
+        return (self.connect_timeout, timeout if timeout is not None else self.timeout)
+
+    def query(self, query, accept="application/sparql-results+json", timeout=None, stream=False):
+        """POST a SPARQL query and return the raw HTTP response"""
+        return self.session.post(
+            self.query_endpoint,
+            data={"query": query},
+            headers={"Accept": accept},
+            timeout=self._timeout(timeout),
+            stream=stream,
+        )
+
+    def update(self, update, timeout=None):
+        """POST a SPARQL update and return the raw HTTP response"""
+        return self.session.post(
+            self.update_endpoint,
+            data={"update": update},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=self._timeout(timeout),
+        )
+
+    def ping(self, timeout=5):
+        """Return True if the Fuseki server answers its ping endpoint"""
+        response = self.session.get(self.ping_endpoint, timeout=self._timeout(timeout))
+        return response.status_code == 200
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_fuseki_client():
+    """Return the process-wide FusekiClient, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FusekiClient()
+    return _client
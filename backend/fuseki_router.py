@@ -0,0 +1,295 @@
+"""Route Fuseki requests between a primary and read replicas"""
+
+import contextvars
+import logging
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from circuit_breaker import CircuitBreaker
+from fuseki_client import FusekiClient
+
+logger = logging.getLogger(__name__)
+
+# Heure (time.time()) de la dernière écriture du client servi par le contexte courant.
+# L'app la relit d'un cookie à chaque requête : un client ne rend collant que lui-même.
+_client_last_write = contextvars.ContextVar("fuseki_client_last_write", default=None)
+
+
+def set_client_last_write(timestamp):
+    """Declare when the current client last wrote; returns a token for reset_client_last_write"""
+    return _client_last_write.set(timestamp)
+
+
+def reset_client_last_write(token):
+    _client_last_write.reset(token)
+
+
+def client_last_write():
+    """Time of the current client's last write, or None"""
+    return _client_last_write.get()
+
+
+def percentile(samples, fraction, min_samples=1):
+    """Nearest-rank percentile of `samples`; None when there are too few"""
+    samples = sorted(samples)
+    if len(samples) < min_samples:
+        return None
+    return samples[max(0, math.ceil(fraction * len(samples)) - 1)]
+
+
+class FusekiNode:
+    """One Fuseki server: its client, in-flight count, recent latencies and breaker"""
+
+    def __init__(self, url, client, breaker, latency_window=256):
+        self.url = url
+        self.client = client
+        self.breaker = breaker
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.outstanding += 1
+            self.requests += 1
+
+    def finish(self, seconds, failed):
+        with self._lock:
+            self.outstanding -= 1
+            if failed:
+                self.failures += 1
+            elif seconds is not None:
+                self._latencies.append(seconds)
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def latency_percentile(self, fraction):
+        with self._lock:
+            samples = list(self._latencies)
+        return percentile(samples, fraction)
+
+    def stats(self):
+        p50 = self.latency_percentile(0.5)
+        p95 = self.latency_percentile(0.95)
+        return {
+            "url": self.url,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "p50_ms": round(p50 * 1000, 3) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 3) if p95 is not None else None,
+            "breaker": self.breaker.stats(),
+        }
+
+
+class ReplicaRouter:
+    """Drop-in replacement for FusekiClient spreading reads over replicas.
+
+    Updates always go to the primary. Reads go to the available replica
+    with the fewest requests in flight; a node whose breaker is open is
+    skipped, and a read failing on one node (connection error or 5xx) is
+    retried on the next. With `hedge_percentile`, a duplicate read is sent
+    to the second-best node when the first has not answered within that
+    percentile of the recent read latencies, and the first answer wins. For
+    `sticky_seconds` after one of its updates, a client's reads go to the
+    primary so that it reads its own writes despite replication lag; the
+    time of that update is per client (see set_client_last_write), so other
+    clients keep reading from the replicas. Such sticky reads are never
+    hedged, since a lagging replica could answer first; a replica is only
+    tried once the primary has failed. Hedged attempts run on a pool of
+    `hedge_workers` threads.
+    """
+
+    def __init__(self, primary_url, replica_urls, read_from_primary=False, hedge_percentile=0.0,
+                 hedge_min_ms=20.0, sticky_seconds=2.0, breaker_failures=5, breaker_reset=30.0,
+                 client_factory=None, hedge_workers=32):
+        client_factory = client_factory or (lambda url: FusekiClient(base_url=url, retries=0))
+
+        def node(url):
+            return FusekiNode(url, client_factory(url), CircuitBreaker(breaker_failures, breaker_reset, url))
+
+        self.primary = node(primary_url)
+        self.replicas = [node(url) for url in replica_urls if url != primary_url]
+        self.readers = self.replicas + ([self.primary] if read_from_primary or not self.replicas else [])
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_seconds = hedge_min_ms / 1000
+        self.sticky_seconds = sticky_seconds
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.sticky_reads = 0
+        self._read_latencies = deque(maxlen=512)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="fuseki-hedge") \
+            if hedge_percentile else None
+
+    @property
+    def nodes(self):
+        return [self.primary] + self.replicas
+
+    def sticky(self):
+        """True while the current client's reads must go to the primary after its update"""
+        last_write = client_last_write()
+        return last_write is not None and time.time() - last_write < self.sticky_seconds
+
+    def read_order(self, sticky=None):
+        """Nodes to try for a read, best first"""
+        if sticky is None:
+            sticky = self.sticky()
+        if sticky:
+            self.sticky_reads += 1
+            return [self.primary] + [n for n in self.readers if n is not self.primary]
+        available = [n for n in self.readers if n.breaker.available()]
+        # Moins de requêtes en cours d'abord ; le hasard départage les ex aequo
+        available.sort(key=lambda n: (n.outstanding, random.random()))
+        return available or list(self.readers)
+
+    def _attempt(self, node, send):
+        node.start()
+        started = time.perf_counter()
+        try:
+            response = send(node.client)
+        except requests.RequestException:
+            node.finish(None, failed=True)
+            raise
+        failed = response.status_code >= 500
+        node.finish(time.perf_counter() - started, failed)
+        return response
+
+    def _hedged(self, first, second, send, tried):
+        """Send to `first`, and to `second` too if `first` is slower than usual
+
+        `second` is added to `tried` once the duplicate read is sent.
+        """
+        # Latences des lectures abouties, tous nœuds confondus : un nœud devenu
+        # lent ne relève pas son propre seuil
+        with self._lock:
+            samples = list(self._read_latencies)
+        threshold = percentile(samples, self.hedge_percentile, min_samples=20)
+        delay = max(self.hedge_min_seconds, threshold or 0)
+        primary_future = self._pool.submit(self._attempt, first, send)
+        done, _ = wait([primary_future], timeout=delay)
+        if done or not second.breaker.allow():
+            return primary_future.result()
+        self.hedges += 1
+        tried.add(second)
+        hedge_future = self._pool.submit(self._attempt, second, send)
+        pending = {primary_future, hedge_future}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except requests.RequestException as e:
+                    error = e
+                    continue
+                if response.status_code < 500 or not pending:
+                    if future is hedge_future:
+                        self.hedge_wins += 1
+                    for other in pending:
+                        # La réponse perdante est fermée dès qu'elle arrive
+                        other.add_done_callback(lambda f: f.exception() is None and f.result().close())
+                    return response
+                error = None
+                response.close()
+        raise error or requests.ConnectionError("Aucune réponse des nœuds Fuseki")
+
+    def _read(self, send, hedge=True):
+        started = time.perf_counter()
+        sticky = self.sticky()
+        candidates = self.read_order(sticky)
+        # Lecture collante : une réplique en retard ne doit pas pouvoir répondre avant le primaire
+        hedge = hedge and not sticky and self._pool is not None
+        tried = set()
+        last_error = None
+        last_response = None
+        i = 0
+        while i < len(candidates):
+            node = candidates[i]
+            i += 1
+            if node in tried:
+                continue  # déjà interrogé comme cible d'une lecture doublée
+            tried.add(node)
+            if not node.breaker.allow() and len(candidates) > 1:
+                continue
+            try:
+                if hedge and i < len(candidates) and candidates[i] not in tried:
+                    response = self._hedged(node, candidates[i], send, tried)
+                else:
+                    response = self._attempt(node, send)
+            except requests.RequestException as e:
+                logger.warning("Lecture Fuseki échouée sur %s: %s", node.url, e)
+                last_error = e
+                continue
+            if response.status_code < 500:
+                with self._lock:
+                    self._read_latencies.append(time.perf_counter() - started)
+                return response
+            if last_response is not None:
+                last_response.close()
+            last_response = response
+        if last_response is not None:
+            return last_response
+        raise last_error or requests.ConnectionError("Aucun nœud Fuseki disponible")
+
+    def query(self, query, accept="application/sparql-results+json", timeout=None, stream=False):
+        """POST a SPARQL query to the best read node and return the raw HTTP response"""
+        def send(client):
+            return client.query(query, accept=accept, timeout=timeout, stream=stream)
+        # Une réponse en flux ne peut pas être doublée puis abandonnée proprement
+        return self._read(send, hedge=not stream)
+
+    def update(self, update, timeout=None):
+        """POST a SPARQL update to the primary and return the raw HTTP response"""
+        try:
+            return self._attempt(self.primary, lambda client: client.update(update, timeout=timeout))
+        finally:
+            # La fenêtre part de la fin de l'écriture
+            set_client_last_write(time.time())
+
+    def ping(self, timeout=5):
+        return self.primary.client.ping(timeout=timeout)
+
+    def ping_readers(self, timeout=5):
+        """Ping every read node, feeding its breaker; True if one of them answers"""
+        any_alive = False
+        for node in self.readers:
+            try:
+                alive = node.client.ping(timeout=timeout)
+            except requests.RequestException:
+                alive = False
+            if alive:
+                node.breaker.record_success()
+            else:
+                node.breaker.record_failure()
+            any_alive = any_alive or alive
+        return any_alive
+
+    def readable(self):
+        """True while the breaker of at least one read node lets reads through"""
+        return any(node.breaker.available() for node in self.readers)
+
+    def close(self):
+        for node in self.nodes:
+            node.client.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def stats(self):
+        return {
+            "sticky_reads": self.sticky_reads,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "primary": self.primary.stats(),
+            "replicas": [node.stats() for node in self.replicas],
+        }
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Generate a synthetic nutrition dataset of any size and bulk-load it into Fuseki.
+
+Triples are produced as a stream of N-Triples lines (valid Turtle too), so
+memory stays flat whatever the size. They are either written to a file
+(gzipped when it ends in .gz) or uploaded through the SPARQL Graph Store
+HTTP Protocol: the stream is cut into chunks that are gzip-compressed and
+POSTed by several workers in parallel, which is far faster than SPARQL
+INSERT DATA.
+
+    python generate_data.py --personnes 600000 --upload --workers 4   # ~10M triples
+    python generate_data.py --personnes 1000 --output data.nt.gz
+"""
+
+import argparse
+import gzip
+import itertools
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from requests.auth import HTTPBasicAuth
+
+from config import FUSEKI_URL, FUSEKI_USERNAME, FUSEKI_PASSWORD, DATASET_NAME
+from entities import ENTITY_LISTS, ENTITY_SCHEMAS, entity_uri
+from sparql_utils import ONTOLOGY_PREFIX
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+RDF_TYPE = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+NTRIPLES_MIMETYPE = "application/n-triples"
+
+PRENOMS = ["Jean", "Marie", "Pierre", "Sophie", "Lucas", "Camille", "Hugo", "Léa", "Thomas", "Chloé",
+           "Nicolas", "Inès", "Éloïse", "Jérôme", "Anaïs", "François", "Manon", "Louis", "Emma", "Gabriel",
+           "Sarah", "Arthur", "Jade", "Nathan", "Zoé", "Mathis", "Lina", "Paul", "Alice", "Yanis"]
+NOMS = ["Martin", "Bernard", "Dubois", "Thomas", "Robert", "Richard", "Petit", "Durand", "Leroy", "Moreau",
+        "Simon", "Laurent", "Lefèvre", "Michel", "Garcia", "David", "Bertrand", "Roux", "Vincent", "Fournier",
+        "Morel", "Girard", "André", "Mercier", "Dupont", "Lambert", "Bonnet", "François", "Martinez", "Legrand"]
+# (nom, kcal/100 g, index glycémique, fibres g, sodium mg)
+ALIMENTS = [
+    ("Pomme", 52, 36, 2.4, 1), ("Banane", 89, 51, 2.6, 1), ("Poulet", 165, 0, 0.0, 74),
+    ("Riz blanc", 130, 73, 0.4, 1), ("Riz complet", 111, 50, 1.8, 5), ("Saumon", 208, 0, 0.0, 59),
+    ("Brocoli", 34, 15, 2.6, 33), ("Lentilles", 116, 32, 7.9, 2), ("Pain complet", 247, 51, 7.0, 450),
+    ("Yaourt nature", 61, 35, 0.0, 46), ("Avocat", 160, 10, 6.7, 7), ("Quinoa", 120, 53, 2.8, 7),
+    ("Épinards", 23, 15, 2.2, 79), ("Pois chiches", 164, 28, 7.6, 7), ("Tofu", 76, 15, 0.3, 7),
+    ("Fromage", 402, 0, 0.0, 621), ("Œuf", 155, 0, 0.0, 124), ("Pâtes", 131, 50, 1.8, 6),
+    ("Carotte", 41, 39, 2.8, 69), ("Amandes", 579, 0, 12.5, 1), ("Chocolat noir", 546, 23, 7.0, 20),
+    ("Pomme de terre", 77, 78, 2.2, 6), ("Orange", 47, 43, 2.4, 0), ("Bœuf", 250, 0, 0.0, 72),
+]
+VARIANTES = ["", "bio", "nature", "de saison", "surgelé", "maison", "allégé", "local", "premium", "vapeur"]
+NUTRIMENTS = [("Vitamine C", 90.0, "mg"), ("Vitamine D", 15.0, "µg"), ("Vitamine B12", 2.4, "µg"),
+              ("Calcium", 1000.0, "mg"), ("Fer", 11.0, "mg"), ("Magnésium", 400.0, "mg"),
+              ("Potassium", 3500.0, "mg"), ("Zinc", 11.0, "mg"), ("Oméga 3", 1.6, "g"),
+              ("Protéines", 56.0, "g"), ("Fibres", 30.0, "g"), ("Folates", 400.0, "µg")]
+ACTIVITES = [("Course à pied", 30, "Cardio"), ("Natation", 45, "Cardio"), ("Vélo", 60, "Cardio"),
+             ("Musculation", 60, "Force"), ("Yoga", 45, "Souplesse"), ("Marche rapide", 30, "Cardio"),
+             ("Pilates", 40, "Souplesse"), ("Boxe", 50, "Force"), ("Danse", 60, "Cardio")]
+CONDITIONS = ["Diabète", "Hypertension", "Cholestérol", "Obésité", "Anémie", "Ostéoporose",
+              "Maladie cœliaque", "Insuffisance rénale"]
+ALLERGIES = [("Arachide", "Alimentaire"), ("Gluten", "Alimentaire"), ("Lactose", "Intolérance"),
+             ("Fruits à coque", "Alimentaire"), ("Œuf", "Alimentaire"), ("Crustacés", "Alimentaire"),
+             ("Soja", "Alimentaire"), ("Poisson", "Alimentaire"), ("Sésame", "Alimentaire")]
+OBJECTIFS = ["Perte de poids", "Gain musculaire", "Maintien du poids", "Endurance", "Équilibre alimentaire",
+             "Réduction du sel"]
+PREFERENCES = ["Végétarien", "Vegan", "Sans gluten", "Halal", "Casher", "Pescétarien", "Sans lactose"]
+PLATS = ["Salade", "Soupe", "Gratin", "Curry", "Quiche", "Tarte", "Poêlée", "Wok", "Risotto", "Velouté"]
+DIFFICULTES = ["Facile", "Moyen", "Difficile"]
+REPAS = [("Petit déjeuner", "Matin"), ("Déjeuner", "Midi"), ("Goûter", "Après-midi"), ("Dîner", "Soir")]
+
+
+def escape_literal(value):
+    """N-Triples escaping of a literal's lexical form"""
+    return (str(value).replace("\\", "\\\\").replace('"', '\\"')
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def literal(value, data_type):
+    return f'"{escape_literal(value)}"^^<{XSD}{data_type}>'
+
+
+def iri(local_name):
+    return f"<{ONTOLOGY_PREFIX}{local_name}>"
+
+
+def zipf_weights(count, exponent=1.1):
+    """Cumulative weights making the first items much more frequent, as in real data"""
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+class DatasetGenerator:
+    """Stream the triples of a dataset scaled on the number of persons.
+
+    Entity URIs and properties follow ENTITY_SCHEMAS, and the relations use
+    the predicates written by the relation endpoints, so the generated data
+    is what the API itself would have written.
+    """
+
+    def __init__(self, personnes, seed=42):
+        self.rng = random.Random(seed)
+        self.counts = {
+            "personnes": personnes,
+            "aliments": max(len(ALIMENTS), personnes // 20),
+            "nutriments": len(NUTRIMENTS),
+            "activites": len(ACTIVITES),
+            "conditions": len(CONDITIONS),
+            "allergies": len(ALLERGIES),
+            "objectifs": len(OBJECTIFS),
+            "preferences": len(PREFERENCES),
+            "recettes": max(len(PLATS), personnes // 50),
+            "repas": max(len(REPAS), personnes // 100),
+            "programmes": personnes // 4,
+            "recommandations": personnes * 2,
+        }
+        self.ids = {}
+
+    def entity(self, entity, index):
+        """URI of the index-th generated entity of a list"""
+        schema = ENTITY_SCHEMAS[entity]
+        return entity_uri(schema["uri_type"], f"{schema['id_prefix'] or ''}gen{index:07d}")
+
+    def subject(self, entity, index, values):
+        """Triples of one entity; `values` maps property keys to Python values"""
+        uri = f"<{self.entity(entity, index)}>"
+        yield f"{uri} {RDF_TYPE} {iri(ENTITY_LISTS[entity]['class'])} .\n"
+        for key, predicate, data_type, _ in ENTITY_SCHEMAS[entity]["properties"]:
+            value = values.get(key)
+            if value is None:
+                continue
+            if data_type.startswith("link:"):
+                yield f"{uri} {iri(predicate)} <{value}> .\n"
+            else:
+                yield f"{uri} {iri(predicate)} {literal(value, data_type)} .\n"
+
+    def pick(self, entity, weights):
+        return self.entity(entity, self.rng.choices(range(len(weights)), cum_weights=weights)[0])
+
+    def triples(self):
+        rng = self.rng
+        counts = self.counts
+        for i, (nom, dose, unite) in enumerate(NUTRIMENTS):
+            yield from self.subject("nutriments", i, {"nom": nom, "doseRecommandée": dose, "unitéDose": unite})
+        for i, (nom, duree, kind) in enumerate(ACTIVITES):
+            yield from self.subject("activites", i, {"nom": nom, "dureeActivite": duree, "type": kind})
+        for i, nom in enumerate(CONDITIONS):
+            yield from self.subject("conditions", i, {"nom": nom})
+        for i, (nom, kind) in enumerate(ALLERGIES):
+            yield from self.subject("allergies", i, {"nom": nom, "typeAllergie": kind})
+        for i, nom in enumerate(OBJECTIFS):
+            yield from self.subject("objectifs", i, {"nom": nom})
+        for i, nom in enumerate(PREFERENCES):
+            yield from self.subject("preferences", i, {"nom": nom})
+
+        for i in range(counts["recettes"]):
+            base = rng.choice(ALIMENTS)[0].lower()
+            yield from self.subject("recettes", i, {
+                "nom": f"{rng.choice(PLATS)} de {base}" + (f" n°{i}" if i >= len(PLATS) else ""),
+                "description": f"Recette à base de {base}",
+                "tempsPréparation": int(rng.lognormvariate(3.2, 0.5)),
+                "niveauDifficulté": rng.choices(DIFFICULTES, weights=(6, 3, 1))[0],
+            })
+        for i in range(counts["repas"]):
+            nom, moment = REPAS[i % len(REPAS)]
+            yield from self.subject("repas", i, {"nom": f"{nom} {i // len(REPAS) + 1}", "type": moment})
+
+        nutriment_weights = zipf_weights(counts["nutriments"], 0.6)
+        recette_weights = zipf_weights(counts["recettes"])
+        repas_weights = zipf_weights(counts["repas"])
+        for i in range(counts["aliments"]):
+            nom, kcal, ig, fibres, sodium = ALIMENTS[i % len(ALIMENTS)]
+            variante = VARIANTES[(i // len(ALIMENTS)) % len(VARIANTES)]
+            suffix = f" {i // (len(ALIMENTS) * len(VARIANTES))}" if i >= len(ALIMENTS) * len(VARIANTES) else ""
+            yield from self.subject("aliments", i, {
+                "nom": " ".join(filter(None, (nom, variante))) + suffix,
+                "calories": max(0, int(rng.gauss(kcal, kcal * 0.1))),
+                "indexGlycémique": ig,
+                "teneurFibres": round(max(0.0, rng.gauss(fibres, fibres * 0.1)), 1),
+                "teneurSodium": round(max(0.0, rng.gauss(sodium, sodium * 0.15 + 1)), 1),
+            })
+            aliment = f"<{self.entity('aliments', i)}>"
+            # Mêmes triplets que POST /api/aliments/<id>/relations
+            for relation, entity, weights, quantite, unite, count in (
+                ("contientNutriment", "nutriments", nutriment_weights, "quantiteNutriment", "uniteNutriment",
+                 rng.randint(1, 4)),
+                ("estDansRecette", "recettes", recette_weights, "quantiteRecette", "uniteRecette",
+                 rng.choices((0, 1, 2), weights=(5, 4, 1))[0]),
+                ("estDansRepas", "repas", repas_weights, "quantiteRepas", "uniteRepas",
+                 rng.choices((0, 1), weights=(7, 3))[0]),
+            ):
+                for _ in range(count):
+                    yield f"{aliment} {iri(relation)} <{self.pick(entity, weights)}> .\n"
+                    yield f"{aliment} {iri(quantite)} {literal(round(rng.uniform(5, 250), 1), 'float')} .\n"
+                    yield f"{aliment} {iri(unite)} {literal('g', 'string')} .\n"
+
+        allergie_weights = zipf_weights(counts["allergies"])
+        condition_weights = zipf_weights(counts["conditions"])
+        preference_weights = zipf_weights(counts["preferences"])
+        objectif_weights = zipf_weights(counts["objectifs"], 0.5)
+        for i in range(counts["personnes"]):
+            taille = min(210.0, max(145.0, rng.gauss(170, 9)))
+            imc = min(45.0, max(16.0, rng.gauss(25, 4)))
+            poids = imc * (taille / 100) ** 2
+            yield from self.subject("personnes", i, {
+                "nom": f"{rng.choice(PRENOMS)} {rng.choice(NOMS)}",
+                "âge": int(min(95, max(18, rng.gauss(42, 15)))),
+                "poids": round(poids, 1),
+                "taille": round(taille, 1),
+                "objectifPoids": round(poids * rng.uniform(0.85, 1.0), 1) if rng.random() < 0.5 else None,
+            })
+            personne = f"<{self.entity('personnes', i)}>"
+            # Mêmes triplets que POST /api/personnes/<id>/relations
+            for predicate, entity, weights, probability in (
+                ("aAllergie", "allergies", allergie_weights, 0.15),
+                ("aCondition", "conditions", condition_weights, 0.25),
+                ("aPreference", "preferences", preference_weights, 0.4),
+                ("participeÀ", "objectifs", objectif_weights, 0.6),
+            ):
+                if rng.random() < probability:
+                    yield f"{personne} {iri(predicate)} <{self.pick(entity, weights)}> .\n"
+
+        aliment_weights = zipf_weights(counts["aliments"], 0.8)
+        start = datetime(2025, 1, 1)
+        for i in range(counts["programmes"]):
+            yield from self.subject("programmes", i, {
+                "personneId": self.entity("personnes", rng.randrange(counts["personnes"])),
+                "objectifId": self.pick("objectifs", objectif_weights),
+            })
+        for i in range(counts["recommandations"]):
+            yield from self.subject("recommandations", i, {
+                "personneId": self.entity("personnes", rng.randrange(counts["personnes"])),
+                "alimentId": self.pick("aliments", aliment_weights),
+                "dateCreation": (start + timedelta(minutes=rng.randrange(525600))).isoformat(),
+            })
+
+
+def chunks(lines, size):
+    """Group the triple stream into byte chunks of `size` triples"""
+    iterator = iter(lines)
+    while True:
+        chunk = "".join(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk.encode("utf-8")
+
+
+class GraphStoreUploader:
+    """POST N-Triples chunks to the Graph Store endpoint from several threads.
+
+    At most 2 x workers chunks are in memory at once. A POST adds triples to
+    the graph, and an RDF graph is a set, so a failed chunk is simply sent
+    again.
+    """
+
+    def __init__(self, base_url=FUSEKI_URL, dataset=DATASET_NAME, graph=None, workers=4,
+                 compress=True, retries=3, timeout=300):
+        self.endpoint = f"{base_url.rstrip('/')}/{dataset}/data"
+        self.params = {"graph": graph} if graph else {"default": ""}
+        self.workers = workers
+        self.compress = compress
+        self.retries = retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.auth = HTTPBasicAuth(FUSEKI_USERNAME, FUSEKI_PASSWORD)
+        self.triples = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        response = self.session.delete(self.endpoint, params=self.params, timeout=self.timeout)
+        if response.status_code not in (200, 204, 404):
+            raise RuntimeError(f"Suppression du graphe impossible: HTTP {response.status_code}")
+
+    def _send(self, chunk):
+        headers = {"Content-Type": NTRIPLES_MIMETYPE}
+        body = chunk
+        if self.compress:
+            # zlib relâche le GIL : la compression se fait en parallèle dans les workers
+            body = gzip.compress(chunk, compresslevel=1)
+            headers["Content-Encoding"] = "gzip"
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(self.endpoint, params=self.params, data=body,
+                                             headers=headers, timeout=self.timeout)
+                if response.status_code in (200, 201, 204):
+                    break
+                error = f"HTTP {response.status_code} - {response.text[:300]}"
+            except requests.RequestException as e:
+                error = str(e)
+            if attempt == self.retries:
+                raise RuntimeError(f"Envoi d'un bloc impossible: {error}")
+            time.sleep(2 ** attempt)
+        with self._lock:
+            self.triples += chunk.count(b"\n")
+            self.bytes_sent += len(body)
+
+    def upload(self, byte_chunks, progress=None):
+        pending = threading.BoundedSemaphore(self.workers * 2)
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for chunk in byte_chunks:
+                pending.acquire()
+                future = pool.submit(self._send, chunk)
+                future.add_done_callback(lambda _: pending.release())
+                futures.append(future)
+                # Remonter une erreur au plus tôt plutôt qu'à la fin du chargement
+                done = [f for f in futures if f.done()]
+                for f in done:
+                    f.result()
+                    futures.remove(f)
+                if progress:
+                    progress(self.triples)
+            for future in futures:
+                future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--personnes", type=int, default=10000,
+                        help="number of persons; every other list is scaled from it")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write N-Triples to this file (.gz to compress), '-' for stdout")
+    parser.add_argument("--upload", action="store_true", help="load into Fuseki through the Graph Store protocol")
+    parser.add_argument("--graph", help="named graph IRI (default graph otherwise)")
+    parser.add_argument("--replace", action="store_true", help="empty the graph before loading")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-triples", type=int, default=200_000)
+    parser.add_argument("--no-gzip", action="store_true", help="send chunks uncompressed")
+    args = parser.parse_args(argv)
+    if not args.output and not args.upload:
+        parser.error("--output ou --upload est requis")
+
+    generator = DatasetGenerator(args.personnes, seed=args.seed)
+    print(f"[v0] Génération: {generator.counts}", file=sys.stderr)
+    started = time.monotonic()
+
+    if args.output:
+        if args.output == "-":
+            out = sys.stdout
+        elif args.output.endswith(".gz"):
+            out = gzip.open(args.output, "wt", encoding="utf-8", compresslevel=1)
+        else:
+            out = open(args.output, "w", encoding="utf-8")
+        count = 0
+        try:
+            for count, line in enumerate(generator.triples(), 1):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"[v0] {count} triplets écrits en {time.monotonic() - started:.1f}s", file=sys.stderr)
+        if args.upload:
+            # Même graine : le flux chargé est identique au fichier écrit
+            generator = DatasetGenerator(args.personnes, seed=args.seed)
+            started = time.monotonic()
+
+    if args.upload:
+        uploader = GraphStoreUploader(graph=args.graph, workers=args.workers, compress=not args.no_gzip)
+        if args.replace:
+            uploader.clear()
+        last_report = [0.0]
+
+        def progress(triples):
+            now = time.monotonic()
+            if now - last_report[0] >= 5:
+                last_report[0] = now
+                elapsed = now - started
+                print(f"[v0] {triples} triplets chargés ({triples / elapsed:,.0f}/s)", file=sys.stderr)
+
+        uploader.upload(chunks(generator.triples(), args.chunk_triples), progress)
+        elapsed = time.monotonic() - started
+        print(f"[v0] {uploader.triples} triplets chargés en {elapsed:.1f}s "
+              f"({uploader.triples / elapsed:,.0f}/s, {uploader.bytes_sent / 1e6:.1f} Mo envoyés)",
+              file=sys.stderr)
+        print("[v0] Pensez à vider le cache de l'API : DELETE /api/admin/cache", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Background health check of the triple store, feeding a circuit breaker"""
+
+import logging
+import threading
+import time
+
+from circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Ping the store from a daemon thread and keep the last result in memory.
+
+    While the store answers, it is pinged every `interval` seconds.
+    `failure_threshold` failed pings in a row open the breaker; from then
+    on a probe is sent every `probe_interval` seconds and the first
+    successful one closes it again. report_failure() asks for a check right
+    away, so an outage seen by a request is confirmed without waiting for
+    the next interval.
+
+    With read replicas, `ping` checks the primary (writes) while
+    `read_ping` pings the read nodes on every check and `readable()` tells
+    whether one of them can still serve reads.
+    """
+
+    def __init__(self, ping, interval=5.0, timeout=2.0, failure_threshold=2, probe_interval=2.0,
+                 read_ping=None, readable=None):
+        self.ping = ping
+        self.read_ping = read_ping
+        self.readable = readable
+        self.readers_ok = None
+        self.interval = interval
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, probe_interval, name="store")
+        self.ok = None
+        self.checks = 0
+        self.last_check = None
+        self.last_ok = None
+        self.last_error = None
+        self.latency_ms = None
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="health-monitor", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def report_failure(self):
+        """A request could not reach the store: check now instead of at the next tick"""
+        self._wake.set()
+
+    @property
+    def available(self):
+        """False while the breaker is open or probing: requests should fail fast"""
+        return self.breaker.state == CircuitBreaker.CLOSED
+
+    @property
+    def read_available(self):
+        """Whether reads can be served; without replicas, the same as `available`"""
+        if self.readable is None:
+            return self.available
+        return self.readable()
+
+    def check(self):
+        started = time.perf_counter()
+        error = None
+        try:
+            ok = bool(self.ping(timeout=self.timeout))
+            if not ok:
+                error = "ping refusé"
+        except Exception as e:
+            ok = False
+            error = str(e)
+        if self.read_ping is not None:
+            try:
+                self.readers_ok = bool(self.read_ping(timeout=self.timeout))
+            except Exception:
+                self.readers_ok = False
+        now = time.time()
+        with self._lock:
+            was_ok = self.ok
+            self.ok = ok
+            self.checks += 1
+            self.last_check = now
+            self.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+            self.last_error = error
+            if ok:
+                self.last_ok = now
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        if ok != was_ok and was_ok is not None:
+            if ok:
+                logger.info("Store de nouveau joignable")
+            else:
+                logger.warning("Store injoignable: %s", error)
+        return ok
+
+    def _next_delay(self):
+        if self.breaker.state == CircuitBreaker.CLOSED:
+            return self.interval
+        return self.breaker.retry_after()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # Breaker ouvert : une seule sonde une fois le délai écoulé
+            if self.breaker.state == CircuitBreaker.CLOSED or self.breaker.allow():
+                self.check()
+            self._wake.wait(self._next_delay())
+            self._wake.clear()
+
+    def stats(self):
+        now = time.time()
+        return {
+            "ok": self.ok,
+            "checks": self.checks,
+            "last_check_age": round(now - self.last_check, 3) if self.last_check else None,
+            "last_ok_age": round(now - self.last_ok, 3) if self.last_ok else None,
+            "latency_ms": self.latency_ms,
+            "last_error": self.last_error,
+            "readers_ok": self.readers_ok,
+            "interval": self.interval,
+            "breaker": self.breaker.stats(),
+        }
@@ -0,0 +1,79 @@
+"""Multi-keyword substring matching in a single pass (Aho-Corasick)"""
+
+from collections import deque
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over a fixed set of keywords.
+
+    Every keyword carries one or more payloads. `find` walks the text once,
+    whatever the number of keywords, and returns the payloads of every
+    keyword that occurs as a substring (the same semantics as `kw in text`).
+    """
+
+    def __init__(self, keywords=()):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._outputs = [[]]
+        self._built = True
+        for keyword, payload in keywords:
+            self.add(keyword, payload)
+        if not self._built:
+            self._build()
+
+    def add(self, keyword, payload):
+        if not keyword:
+            raise ValueError("mot-clé vide")
+        state = 0
+        for char in keyword:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((keyword, payload))
+        self._built = False
+
+    def _build(self):
+        # Liens d'échec calculés en largeur, les sorties sont héritées
+        outputs = [list(out) for out in self._out]
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                outputs[nxt].extend(outputs[self._fail[nxt]])
+        self._outputs = outputs
+        self._built = True
+
+    def iter_matches(self, text):
+        """Yield (end, keyword, payload) for every occurrence in `text`"""
+        if not self._built:
+            self._build()
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        state = 0
+        for end, char in enumerate(text, 1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword, payload in outputs[state]:
+                yield end, keyword, payload
+
+    def find(self, text):
+        """{keyword: [payloads]} for every distinct keyword found in `text`"""
+        found = {}
+        for _, keyword, payload in self.iter_matches(text):
+            payloads = found.setdefault(keyword, [])
+            if payload not in payloads:
+                payloads.append(payload)
+        return found
@@ -0,0 +1,200 @@
+"""In-process trigram index over entity names (nutrition:nom)"""
+
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^\w]+")
+
+
+def normalize_name(text):
+    """Accent- and case-insensitive key: "Crème Brûlée" -> "creme brulee" """
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", stripped.casefold()).strip()
+
+
+def trigrams(key):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class NameIndex:
+    """Resolve a name fragment to the URIs whose name contains it.
+
+    Every normalized name is split into trigrams; a search intersects the
+    posting lists of the fragment's trigrams, smallest first, then checks the
+    few remaining candidates with a substring test. Lookups therefore cost
+    the size of the rarest trigram's posting list, not the dataset size.
+    Fragments shorter than three characters are checked against every key.
+    """
+
+    def __init__(self):
+        self._entries = {}  # uri -> (classe, {clé normalisée})
+        self._postings = defaultdict(set)  # trigramme -> {uri}
+        self._lock = threading.RLock()
+        self.ready = False
+        # Incrémenté à chaque modification, pour invalider ce qui dépend de l'index
+        self.generation = 0
+        self.building = False
+        self.last_attempt = 0.0
+        self.build_seconds = None
+        self.built_at = None
+        self.error = None
+        # Modifications faites pendant un chargement, rejouées sur l'index qui en sort
+        self._pending = None
+
+    def set_names(self, uri, entity_class, names):
+        """Replace the names of `uri`"""
+        with self._lock:
+            self._set(uri, entity_class, names)
+            self._record(self._set, uri, entity_class, names)
+            self.generation += 1
+
+    def add_names(self, uri, entity_class, names):
+        """Add names to `uri`, keeping the existing ones"""
+        with self._lock:
+            self._add(uri, entity_class, names)
+            self._record(self._add, uri, entity_class, names)
+            self.generation += 1
+
+    def remove(self, uri):
+        with self._lock:
+            self._remove(uri)
+            self._record(self._remove, uri)
+            self.generation += 1
+
+    def begin_build(self):
+        """Start recording changes, to replay them on the index being loaded"""
+        with self._lock:
+            self._pending = []
+
+    def _record(self, change, *args):
+        if self._pending is not None:
+            self._pending.append((change, args))
+
+    def _set(self, uri, entity_class, names):
+        self._remove(uri)
+        self._add(uri, entity_class, names)
+
+    def contains(self, uri, entity_class=None):
+        """True if `uri` (of `entity_class`, when given) is indexed"""
+        with self._lock:
+            entry = self._entries.get(uri)
+            return entry is not None and (entity_class is None or entry[0] == entity_class)
+
+    def _add(self, uri, entity_class, names):
+        keys = {normalize_name(name) for name in names if name is not None}
+        keys.discard("")
+        if not keys:
+            return
+        current_class, current_keys = self._entries.get(uri, (entity_class, set()))
+        self._entries[uri] = (entity_class or current_class, current_keys | keys)
+        for key in keys:
+            for gram in trigrams(key):
+                self._postings[gram].add(uri)
+
+    def _remove(self, uri):
+        entry = self._entries.pop(uri, None)
+        if entry is None:
+            return
+        for key in entry[1]:
+            for gram in trigrams(key):
+                uris = self._postings.get(gram)
+                if uris is not None:
+                    uris.discard(uri)
+                    if not uris:
+                        del self._postings[gram]
+
+    def search(self, fragment, entity_class=None):
+        """Sorted URIs whose name contains `fragment`, or None if the index is not ready"""
+        if not self.ready:
+            return None
+        key = normalize_name(fragment)
+        with self._lock:
+            grams = trigrams(key)
+            if grams:
+                postings = sorted((self._postings.get(gram, frozenset()) for gram in grams), key=len)
+                candidates = set(postings[0])
+                for uris in postings[1:]:
+                    candidates &= uris
+                    if not candidates:
+                        break
+            else:
+                candidates = self._entries.keys()
+            return sorted(
+                uri for uri in candidates
+                if (entity_class is None or self._entries[uri][0] == entity_class)
+                and any(key in name for name in self._entries[uri][1])
+            )
+
+    def build(self, rows):
+        """Replace the whole index with `rows` of (uri, entity_class, name)
+
+        Changes made since begin_build() may be missing from `rows`; they
+        are replayed on the new index (replaying one already loaded is a no-op).
+        """
+        started = time.monotonic()
+        entries = defaultdict(lambda: [None, []])
+        for uri, entity_class, name in rows:
+            entry = entries[uri]
+            entry[0] = entry[0] or entity_class
+            entry[1].append(name)
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+            for uri, (entity_class, names) in entries.items():
+                self._add(uri, entity_class, names)
+            for change, args in self._pending or ():
+                change(*args)
+            self._pending = None
+            self.ready = True
+            self.generation += 1
+            self.error = None
+        self.built_at = time.monotonic()
+        self.build_seconds = round(self.built_at - started, 3)
+
+    def age(self):
+        """Seconds since the last complete build, or None if never built"""
+        return time.monotonic() - self.built_at if self.built_at is not None else None
+
+    def build_async(self, load_rows, retry_after=30):
+        """Build the index in a background thread from load_rows() (rate-limited)"""
+        with self._lock:
+            if self.building or time.monotonic() - self.last_attempt < retry_after:
+                return
+            self.building = True
+            self.last_attempt = time.monotonic()
+
+        def run():
+            self.begin_build()
+            try:
+                self.build(load_rows())
+                logger.info("Index des noms construit: %d entités en %ss",
+                            len(self._entries), self.build_seconds)
+            except Exception as e:
+                with self._lock:
+                    self._pending = None
+                self.error = str(e)
+                logger.error("Construction de l'index des noms impossible: %s", e)
+            finally:
+                self.building = False
+
+        threading.Thread(target=run, name="name-index", daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "building": self.building,
+                "generation": self.generation,
+                "entities": len(self._entries),
+                "trigrams": len(self._postings),
+                "build_seconds": self.build_seconds,
+                "age": round(self.age(), 3) if self.built_at is not None else None,
+                "error": self.error,
+            }
@@ -0,0 +1,101 @@
+"""Deferred loading of the spaCy pipeline used by the semantic search parser"""
+
+import logging
+import threading
+import time
+
+try:
+    import spacy
+except ImportError:
+    spacy = None
+
+from config import SPACY_MODEL, SPACY_LOAD_MODE, SPACY_EXCLUDE, SPACY_OFFLINE
+
+logger = logging.getLogger(__name__)
+
+
+class SpacyLoader:
+    """Load the spaCy model once, eagerly, lazily or in a background thread.
+
+    Until the model is ready `get()` returns None and the parser answers with
+    its regex fallback, so a worker can serve requests while the model loads
+    (or when it is missing in an offline container). Components listed in
+    `exclude` are never loaded, which saves both start-up time and memory.
+    """
+
+    def __init__(self, model=SPACY_MODEL, mode=SPACY_LOAD_MODE, exclude=SPACY_EXCLUDE,
+                 offline=SPACY_OFFLINE):
+        self.model = model
+        self.mode = mode
+        self.exclude = list(exclude)
+        self.offline = offline
+        self.state = "idle"  # idle, loading, ready, failed, disabled
+        self.error = None
+        self.load_seconds = None
+        self._nlp = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def start(self):
+        """Apply the configured mode: load now, in the background, or on first use"""
+        if self.mode == "off" or spacy is None:
+            self.state = "disabled"
+            if spacy is None:
+                logger.warning("SpaCy n'est pas installé, utilisation du mode fallback")
+        elif self.mode == "eager":
+            self.load()
+        elif self.mode == "background":
+            threading.Thread(target=self.load, name="spacy-loader", daemon=True).start()
+
+    def get(self):
+        """Return the loaded pipeline, or None while it is not available"""
+        if self._nlp is None and self.state == "idle" and self.mode == "lazy":
+            self.load()
+        return self._nlp
+
+    def load(self):
+        with self._lock:
+            if self.state not in ("idle", "failed"):
+                return self._nlp
+            self.state = "loading"
+            started = time.monotonic()
+            try:
+                self._nlp = self._load_model()
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                logger.error("Impossible de charger SpaCy (%s), utilisation du mode fallback", e)
+                return None
+            self.load_seconds = round(time.monotonic() - started, 3)
+            self.state = "ready"
+            logger.info("Modèle SpaCy %s chargé en %ss (composants: %s)",
+                        self.model, self.load_seconds, ", ".join(self._nlp.pipe_names))
+            return self._nlp
+
+    def _load_model(self):
+        try:
+            return spacy.load(self.model, exclude=self.exclude)
+        except OSError:
+            if self.offline:
+                raise
+        # Essayer de télécharger le modèle si absent
+        from spacy.cli import download
+        download(self.model)
+        return spacy.load(self.model, exclude=self.exclude)
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "model": self.model,
+            "mode": self.mode,
+            "excluded": self.exclude,
+            "offline": self.offline,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+spacy_loader = SpacyLoader()
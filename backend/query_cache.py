@@ -0,0 +1,129 @@
+"""Tag-invalidated LRU cache for SPARQL SELECT results"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """In-memory LRU cache keyed by SPARQL text.
+
+    Each entry carries the entity tags it was read from; a write handler
+    invalidates its tag and every dependent entry is dropped. Entries are
+    also bounded by count, by approximate size in bytes and by a TTL (None
+    for no expiry), the latter being a safety net for writes made outside
+    this application.
+
+    Every invalidation also bumps a per-tag generation counter. A reader
+    takes ``generation(tags)`` before querying the store and passes it to
+    ``set``, which drops the result if one of its tags was invalidated in
+    the meantime, so a read racing a write cannot cache the stale data.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300, enabled=True):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()  # clé -> (valeur, expiration, tags, taille)
+        self._tags = {}  # tag -> ensemble de clés
+        self._generations = {}  # tag -> nombre d'invalidations
+        self._clears = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+
+    def get(self, key):
+        """Return the cached value for `key`, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self, tags=()):
+        """Snapshot of the invalidation counters of `tags`, to hand to `set`"""
+        with self._lock:
+            return (self._clears, tuple(self._generations.get(tag, 0) for tag in tags))
+
+    def set(self, key, value, tags=(), size=0, generation=None):
+        """Store `value` under `key`, evicting least recently used entries
+
+        With `generation` (taken by ``generation(tags)`` before the value
+        was read), the value is dropped if one of `tags` was invalidated since.
+        """
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != (
+                    self._clears, tuple(self._generations.get(tag, 0) for tag in tags)):
+                self.stale_sets += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+            self._entries[key] = (value, expires, tuple(tags), size)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every entry read from one of `tags`"""
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+            self._clears += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_sets": self.stale_sets,
+                "tags": {tag: len(keys) for tag, keys in self._tags.items() if keys},
+            }
+
+    def _remove(self, key):
+        _, _, tags, size = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
@@ -0,0 +1,155 @@
+"""Single-pass extraction of numeric criteria from a natural-language search"""
+
+import re
+from collections import namedtuple
+
+# attribut -> (variable SPARQL, prédicat, types d'entité, conversion)
+ATTRIBUTES = {
+    "âge": ("?âge", "âge", ("Personne",), int),
+    "poids": ("?poids", "poids", ("Personne",), float),
+    "taille": ("?taille", "taille", ("Personne",), float),
+    "calories": ("?calories", "calories", ("Aliment",), int),
+    "fibres": ("?teneurFibres", "teneurFibres", ("Aliment",), float),
+    "sodium": ("?teneurSodium", "teneurSodium", ("Aliment",), float),
+    "durée": ("?dureeActivite", "dureeActivite", ("ActivitePhysique",), int),
+}
+
+# Les tailles sont comparées en cm ; le graphe en contient aussi en mètres (init_data.py)
+_NORMALIZED = {
+    "taille": "IF(?taille < 3, ?taille * 100, ?taille)",
+}
+
+_ATTRIBUTE_WORDS = [
+    (r"âges?", "âge"),
+    (r"poids|pes(?:e|es|ent|ant|ants|ante|antes)", "poids"),
+    (r"tailles?|mesur(?:e|ent|ant|ants|ante|antes)", "taille"),
+    (r"calories?|caloriques?", "calories"),
+    (r"fibres?", "fibres"),
+    (r"sodium|sel|salée?s?", "sodium"),
+    (r"durée", "durée"),
+]
+
+# unité -> (attribut, ou None si l'unité seule ne suffit pas ; facteur)
+_UNITS = {
+    "ans": ("âge", 1), "an": ("âge", 1),
+    "kg": ("poids", 1),
+    "cm": ("taille", 1), "m": ("taille", 100),
+    "kcal": ("calories", 1), "cal": ("calories", 1), "calorie": ("calories", 1), "calories": ("calories", 1),
+    "mg": ("sodium", 1),
+    "g": (None, 1),
+    "min": ("durée", 1), "minute": ("durée", 1), "minutes": ("durée", 1),
+    "h": ("durée", 60), "heure": ("durée", 60), "heures": ("durée", 60),
+}
+
+_UNIT_PATTERN = "|".join(sorted((re.escape(u) for u in _UNITS), key=len, reverse=True))
+
+# "1m80" : une taille en mètres et centimètres
+_HEIGHT_PATTERN = r"\d[mM]\d\d"
+
+
+_COMPARATORS = [
+    (r">=|au\s+moins|minimum", ">="),
+    (r"<=|au\s+plus|maximum", "<="),
+    (r">|plus\s+(?:de|que|à)|supérieure?s?\s+à|dépassant", ">"),
+    (r"<|moins\s+(?:de|que|à)|inférieure?s?\s+à", "<"),
+    (r"entre", "between"),
+    # "de 30 à 40 ans" : "de" n'ouvre un intervalle que suivi de "X à Y"
+    (rf"de(?=\s+(?:{_HEIGHT_PATTERN}|\d+(?:[.,]\d+)?(?:\s*(?:{_UNIT_PATTERN})\b)?)\s+(?:à|a)\s+\d)", "between"),
+]
+
+
+def _named_alternation(prefix, table):
+    return "|".join(f"(?P<{prefix}{i}>{pattern})" for i, (pattern, _) in enumerate(table))
+
+
+# Une seule expression compilée : taille "1m80", nombre (+ unité), comparateur ou attribut
+_GRAMMAR = re.compile(
+    rf"(?<![\w.,])(?P<height>{_HEIGHT_PATTERN})\b"
+    rf"|(?<![\w.,])(?P<num>\d+(?:[.,]\d+)?)(?:\s*(?P<unit>{_UNIT_PATTERN})\b)?"
+    rf"|(?<!\w)(?:{_named_alternation('cmp', _COMPARATORS)})"
+    rf"|(?<!\w)(?:{_named_alternation('attr', _ATTRIBUTE_WORDS)})\b",
+    re.IGNORECASE,
+)
+
+Criterion = namedtuple("Criterion", "attribute operator value")
+
+
+def extract_criteria(text):
+    """List of Criterion(attribute, operator, value) found in `text`.
+
+    The text is scanned once. A number is attached to the attribute given by
+    its unit, else to the attribute named just before it ("poids 70"), else
+    to the one named just after it ("5 g de fibres"). A comparator applies to
+    the next number; "entre X et Y" and "de X à Y" yield >= X and <= Y.
+    Heights are in cm: "1m80", "1,80 m" and a bare "taille 1.80" all give
+    180, as the magnitude tells meters apart. Duplicate criteria are dropped.
+    """
+    criteria = []
+    attribute = None    # attribut nommé, en attente d'un nombre
+    operator = None     # comparateur, en attente d'un nombre
+    between = 0         # 1 : borne basse attendue, 2 : borne haute attendue
+    pending = []        # (opérateur, nombre) en attente d'un attribut
+
+    def emit(attr, op, number):
+        if attr == "taille" and number < 3:
+            number *= 100
+        number = round(number, 6)  # 1.77 * 100 donne 177.00000000000003
+        criterion = Criterion(attr, op, ATTRIBUTES[attr][3](number))
+        if criterion not in criteria:
+            criteria.append(criterion)
+
+    for match in _GRAMMAR.finditer(text):
+        kind = match.lastgroup
+        if kind in ("num", "unit", "height"):
+            if kind == "height":
+                meters, centimeters = match.group("height").lower().split("m")
+                unit_attribute, number = "taille", int(meters) * 100 + int(centimeters)
+            else:
+                unit_attribute, factor = _UNITS.get((match.group("unit") or "").lower(), (None, 1))
+                number = float(match.group("num").replace(",", ".")) * factor
+            if between == 1:
+                op, between = ">=", 2
+            elif between == 2:
+                op, between = "<=", 0
+            else:
+                op = operator or "="
+            operator = None
+
+            target = unit_attribute or attribute
+            if target is None:
+                pending.append((op, number))
+                continue
+            # "entre 20 et 30 ans" : la première borne prend l'unité de la seconde
+            for pending_op, pending_number in pending:
+                if pending_op == ">=" and op == "<=":
+                    emit(target, pending_op, pending_number)
+            pending = []
+            emit(target, op, number)
+            if not between:
+                attribute = None
+        elif kind.startswith("cmp"):
+            operator = _COMPARATORS[int(kind[3:])][1]
+            if operator == "between":
+                operator, between = None, 1
+        else:
+            attribute = _ATTRIBUTE_WORDS[int(kind[4:])][1]
+            for pending_op, pending_number in pending:
+                emit(attribute, pending_op, pending_number)
+            if pending:
+                pending = []
+                attribute = None
+    return criteria
+
+
+def criteria_filters(criteria, entity_type):
+    """(filters, attributes) for the criteria that apply to `entity_type`"""
+    filters, attributes = [], []
+    for criterion in criteria:
+        var, _, entity_types, _ = ATTRIBUTES[criterion.attribute]
+        if entity_type not in entity_types:
+            continue
+        value = _NORMALIZED.get(criterion.attribute, var)
+        filters.append(f"({value} {criterion.operator} {criterion.value})")
+        if criterion.attribute not in attributes:
+            attributes.append(criterion.attribute)
+    return filters, attributes
@@ -0,0 +1,451 @@
+"""Batch food recommendations for every person, scored with NumPy.
+
+A person is reduced to the set of entities it links to (aAllergie,
+aCondition, aPreference, participeÀ) plus a derived "surpoids" flag. Each
+of these tags is matched by name against RULES, which say which foods it
+excludes (by name or above a nutrient limit) and how it weighs the food
+profile (calories, glycemic index, fibres, sodium, contained nutrients).
+
+Scoring then works on matrices: every tag gets one score row and one
+exclusion bitset over all foods. Persons sharing the same tags get the same
+recommendations, so the scores are computed once per distinct profile,
+in chunks bounded by a memory budget, and the top-k are spread back to the
+persons before being written in chunked SPARQL updates.
+"""
+
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from entities import ENTITY_LISTS, entity_uri
+from name_index import normalize_name
+from sparql_utils import build_sparql_value
+
+logger = logging.getLogger(__name__)
+
+# Profil nutritionnel des aliments, dans l'ordre des colonnes de la matrice
+FEATURES = ("calories", "indexGlycémique", "teneurFibres", "teneurSodium")
+
+# Identifiants des recommandations écrites par le moteur : elles sont remplacées
+# à chaque génération, les recommandations saisies à la main sont conservées
+GENERATED_ID_PREFIX = "recommandation_auto_"
+GENERATED_URI_PREFIX = entity_uri("recommandation", GENERATED_ID_PREFIX)
+
+VIANDES = ("poulet", "bœuf", "boeuf", "porc", "jambon", "lardon", "agneau", "veau", "dinde", "canard", "steak")
+POISSONS = ("poisson", "saumon", "thon", "cabillaud", "sardine", "truite", "maquereau")
+CRUSTACES = ("crevette", "crabe", "homard", "langoustine", "crustace")
+GLUTEN = ("pain", "pates", "ble", "farine", "seigle", "orge", "semoule", "quiche", "tarte", "biscuit")
+LAITIERS = ("fromage", "yaourt", "lait", "creme", "beurre")
+OEUFS = ("œuf", "oeuf")
+FRUITS_A_COQUE = ("amande", "noix", "noisette", "cajou", "pistache")
+
+# Règles par relation puis par nom (normalisé) de l'entité liée :
+#   exclude   mots en début de mot dans le nom des aliments exclus
+#   max       exclusion au-delà d'une valeur du profil nutritionnel
+#   weights   poids des colonnes de FEATURES (centrées réduites)
+#   nutrients bonus (ou malus) par nutriment contenu, par nom
+RULES = {
+    "aAllergie": {
+        "arachide": {"exclude": ("arachide", "cacahuete")},
+        "gluten": {"exclude": GLUTEN},
+        "lactose": {"exclude": LAITIERS},
+        "fruits a coque": {"exclude": FRUITS_A_COQUE},
+        "œuf": {"exclude": OEUFS},
+        "crustaces": {"exclude": CRUSTACES},
+        "soja": {"exclude": ("soja", "tofu")},
+        "poisson": {"exclude": POISSONS},
+        "sesame": {"exclude": ("sesame",)},
+    },
+    "aCondition": {
+        "diabete": {"max": {"indexGlycémique": 70},
+                    "weights": {"indexGlycémique": -1.0, "teneurFibres": 0.5}},
+        "hypertension": {"max": {"teneurSodium": 400}, "weights": {"teneurSodium": -1.0},
+                         "nutrients": {"potassium": 0.5}},
+        "cholesterol": {"weights": {"calories": -0.3, "teneurFibres": 0.6}, "nutrients": {"omega 3": 0.5}},
+        "obesite": {"max": {"calories": 400}, "weights": {"calories": -1.0, "teneurFibres": 0.3}},
+        "anemie": {"nutrients": {"fer": 1.0, "vitamine b12": 0.5, "folates": 0.5}},
+        "osteoporose": {"nutrients": {"calcium": 1.0, "vitamine d": 0.5}},
+        "maladie cœliaque": {"exclude": GLUTEN},
+        "insuffisance renale": {"max": {"teneurSodium": 400}, "weights": {"teneurSodium": -0.8},
+                                "nutrients": {"potassium": -1.0}},
+    },
+    "aPreference": {
+        "vegetarien": {"exclude": VIANDES + POISSONS + CRUSTACES},
+        "vegan": {"exclude": VIANDES + POISSONS + CRUSTACES + LAITIERS + OEUFS + ("miel",)},
+        "pescetarien": {"exclude": VIANDES},
+        "sans gluten": {"exclude": GLUTEN},
+        "sans lactose": {"exclude": LAITIERS},
+        "halal": {"exclude": ("porc", "jambon", "lardon")},
+        "casher": {"exclude": ("porc", "jambon", "lardon") + CRUSTACES},
+    },
+    "participeÀ": {
+        "perte de poids": {"weights": {"calories": -1.0, "teneurFibres": 0.5}},
+        "gain musculaire": {"weights": {"calories": 0.3}, "nutrients": {"proteines": 1.0}},
+        "maintien du poids": {"weights": {"calories": -0.2, "teneurFibres": 0.2}},
+        "endurance": {"weights": {"calories": 0.3}, "nutrients": {"magnesium": 0.5, "fer": 0.5}},
+        "equilibre alimentaire": {"weights": {"teneurFibres": 0.3}, "nutrients": {"*": 0.3}},
+        "reduction du sel": {"max": {"teneurSodium": 600}, "weights": {"teneurSodium": -1.0}},
+    },
+}
+# Tag déduit du profil de la personne (IMC >= 25 ou objectif de poids inférieur au poids)
+SURPOIDS = "surpoids"
+SURPOIDS_RULE = {"weights": {"calories": -0.5}}
+# Score de base : ce qui est bon pour tout le monde
+BASE_RULE = {"weights": {"teneurFibres": 0.3, "teneurSodium": -0.2, "indexGlycémique": -0.1},
+             "nutrients": {"*": 0.1}}
+
+_RULES = {
+    predicate: {normalize_name(name): rule for name, rule in rules.items()}
+    for predicate, rules in RULES.items()
+}
+
+
+def find_rule(predicate, name):
+    """Rule applying to the entity named `name` linked through `predicate`, or None"""
+    return _RULES.get(predicate, {}).get(normalize_name(name or ""))
+
+
+class FoodModel:
+    """Foods as matrices: standardized profile, nutrient membership and base score"""
+
+    def __init__(self, uris, names, values, nutrients):
+        self.uris = uris
+        self.names = [normalize_name(name or "") for name in names]
+        self.raw = np.array(values, dtype=np.float64).reshape(len(uris), len(FEATURES))
+        self.nutrient_names = sorted({n for names in nutrients for n in names})
+        columns = {name: i for i, name in enumerate(self.nutrient_names)}
+        self.nutrients = np.zeros((len(uris), len(self.nutrient_names)), dtype=bool)
+        for row, names in enumerate(nutrients):
+            self.nutrients[row, [columns[n] for n in names]] = True
+        # Centrées réduites ; une valeur absente vaut la moyenne
+        with np.errstate(invalid="ignore"):
+            mean = np.nanmean(self.raw, axis=0) if len(uris) else np.zeros(len(FEATURES))
+            std = np.nanstd(self.raw, axis=0) if len(uris) else np.ones(len(FEATURES))
+        mean = np.nan_to_num(mean)
+        std = np.where(np.nan_to_num(std) > 0, np.nan_to_num(std), 1.0)
+        self.features = np.nan_to_num((self.raw - mean) / std).astype(np.float32)
+        self.base = self.score_vector(BASE_RULE)
+
+    def __len__(self):
+        return len(self.uris)
+
+    def score_vector(self, rule):
+        """Score every food gets from one rule"""
+        weights = np.array([rule.get("weights", {}).get(f, 0.0) for f in FEATURES], dtype=np.float32)
+        scores = self.features @ weights
+        for name, weight in rule.get("nutrients", {}).items():
+            if name == "*":
+                scores += weight * self.nutrients.sum(axis=1, dtype=np.float32)
+            elif normalize_name(name) in self.nutrient_names:
+                scores += weight * self.nutrients[:, self.nutrient_names.index(normalize_name(name))]
+        return scores
+
+    def exclusion_mask(self, rule):
+        """Foods a rule rules out, by name or above a nutrient limit"""
+        mask = np.zeros(len(self.uris), dtype=bool)
+        keywords = rule.get("exclude")
+        if keywords:
+            pattern = re.compile(r"\b(?:" + "|".join(re.escape(normalize_name(k)) for k in keywords) + ")")
+            mask |= np.fromiter((bool(pattern.search(name)) for name in self.names), dtype=bool,
+                                count=len(self.names))
+        for feature, limit in rule.get("max", {}).items():
+            with np.errstate(invalid="ignore"):
+                mask |= self.raw[:, FEATURES.index(feature)] > limit
+        return mask
+
+
+class Recommendations:
+    """Top-k foods of each person: `foods` and `scores` are (persons x k), -1 where unfilled"""
+
+    def __init__(self, personnes, food_uris, foods, scores, stats):
+        self.personnes = personnes
+        self.food_uris = food_uris
+        self.foods = foods
+        self.scores = scores
+        self.stats = stats
+
+    def __iter__(self):
+        """(personne, [(aliment, score), ...]) for every person"""
+        for row, personne in enumerate(self.personnes):
+            yield personne, [
+                (self.food_uris[food], float(score))
+                for food, score in zip(self.foods[row], self.scores[row]) if food >= 0
+            ]
+
+
+def overweight(poids, taille, objectif_poids):
+    """Vectorized "surpoids" flag from weight (kg), height (cm or m) and target weight"""
+    taille = np.where(taille < 3, taille, taille / 100)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        imc = poids / (taille * taille)
+    return (imc >= 25) | (objectif_poids < poids)
+
+
+def distinct_rows(matrix):
+    """(distinct rows, index of each row among them) of a boolean matrix.
+
+    Rows are packed into bytes and compared as opaque keys, which is much
+    faster than np.unique(axis=0) on hundreds of thousands of rows.
+    """
+    packed = np.ascontiguousarray(np.packbits(matrix, axis=1))
+    keys = packed.view(np.dtype((np.void, packed.shape[1]))).reshape(-1)
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return matrix[first], inverse.reshape(-1)
+
+
+class RecommendationEngine:
+    """Load profiles and foods from the store, score them and write the top-k back.
+
+    `query(query_id, tags, **params)` runs a registered SELECT and returns
+    (columns, rows); `update(text)` runs a SPARQL update and returns
+    (success, error). Both are the app's helpers, so the requests show up in
+    the metrics and logs like any other.
+    """
+
+    def __init__(self, query, update, top_k=5, score_budget_bytes=64 * 1024 * 1024,
+                 chunk_rows=1000, chunk_bytes=256 * 1024):
+        self.query = query
+        self.update = update
+        self.top_k = top_k
+        self.score_budget_bytes = score_budget_bytes
+        self.chunk_rows = chunk_rows
+        self.chunk_bytes = chunk_bytes
+        self._foods = None
+        self._foods_rows = None
+        self._lock = threading.Lock()
+        self.running = False
+        self.last_run = None
+
+    # ==================== CHARGEMENT ====================
+
+    def load_foods(self):
+        """Food model, rebuilt only when the query cache hands back new rows"""
+        _, rows = self.query("recommandations.aliments", tags=("aliments",))
+        _, nutrient_rows = self.query("recommandations.aliments_nutriments", tags=("aliments", "nutriments"))
+        with self._lock:
+            if self._foods is not None and self._foods_rows[0] is rows and self._foods_rows[1] is nutrient_rows:
+                return self._foods
+        index = {}
+        uris, names, values = [], [], []
+        for uri, name, *profile in rows:
+            if uri in index:
+                continue
+            index[uri] = len(uris)
+            uris.append(uri)
+            names.append(name)
+            values.append([v if isinstance(v, (int, float)) else np.nan for v in profile])
+        nutrients = [set() for _ in uris]
+        for uri, nutrient in nutrient_rows:
+            if uri in index and nutrient:
+                nutrients[index[uri]].add(normalize_name(nutrient))
+        foods = FoodModel(uris, names, values, nutrients)
+        with self._lock:
+            self._foods = foods
+            self._foods_rows = (rows, nutrient_rows)
+        return foods
+
+    def load_profiles(self, personnes=None):
+        """(person URIs, tag list, membership matrix persons x tags)
+
+        A tag is (predicate, linked URI, linked name); the last column of the
+        matrix is the derived "surpoids" tag.
+        """
+        if personnes is None:
+            _, rows = self.query("recommandations.personnes")
+            _, links = self.query("recommandations.liens")
+        else:
+            _, rows = self.query("recommandations.personnes_in", personnes=personnes)
+            _, links = self.query("recommandations.liens_in", personnes=personnes)
+        index = {}
+        measures = []
+        for uri, poids, taille, objectif in rows:
+            if uri in index:
+                continue
+            index[uri] = len(measures)
+            measures.append([v if isinstance(v, (int, float)) else np.nan for v in (poids, taille, objectif)])
+
+        tags, tag_index = [], {}
+        person_cols, tag_cols = [], []
+        for personne, predicate, cible, nom in links:
+            row = index.get(personne)
+            if row is None:
+                continue
+            key = (predicate, cible)
+            if key not in tag_index:
+                tag_index[key] = len(tags)
+                tags.append((predicate.rsplit("#", 1)[-1], cible, nom))
+            person_cols.append(row)
+            tag_cols.append(tag_index[key])
+        tags.append((SURPOIDS, None, SURPOIDS))
+
+        membership = np.zeros((len(measures), len(tags)), dtype=bool)
+        membership[person_cols, tag_cols] = True
+        if measures:
+            poids, taille, objectif = np.array(measures, dtype=np.float64).T
+            membership[:, -1] = overweight(poids, taille, objectif)
+        return list(index), tags, membership
+
+    # ==================== SCORE ====================
+
+    def tag_matrices(self, foods, tags):
+        """Score rows (tags x foods) and packed exclusion bitsets (tags x bytes)"""
+        scores = np.zeros((len(tags), len(foods)), dtype=np.float32)
+        excluded = np.zeros((len(tags), len(foods)), dtype=bool)
+        unmatched = 0
+        for i, (predicate, _, name) in enumerate(tags):
+            rule = SURPOIDS_RULE if predicate == SURPOIDS else find_rule(predicate, name)
+            if rule is None:
+                unmatched += 1
+                continue
+            scores[i] = foods.score_vector(rule)
+            excluded[i] = foods.exclusion_mask(rule)
+        return scores, np.packbits(excluded, axis=1), unmatched
+
+    def recommend(self, personnes=None, top_k=None):
+        """Top-k foods of the given person URIs (every person when None)"""
+        top_k = top_k or self.top_k
+        timings = {}
+        started = time.perf_counter()
+        foods = self.load_foods()
+        uris, tags, membership = self.load_profiles(personnes)
+        timings["load"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        tag_scores, tag_excluded, unmatched = self.tag_matrices(foods, tags)
+        # Les personnes aux mêmes tags ont les mêmes recommandations
+        profiles, inverse = distinct_rows(membership)
+        # Exclusions d'un profil : OU des bitsets de ses tags
+        packed = np.zeros((len(profiles), tag_excluded.shape[1]), dtype=np.uint8)
+        for tag in np.flatnonzero(tag_excluded.any(axis=1)):
+            packed[profiles[:, tag]] |= tag_excluded[tag]
+
+        k = min(top_k, len(foods))
+        best = np.full((len(profiles), top_k), -1, dtype=np.int64)
+        best_scores = np.full((len(profiles), top_k), -np.inf, dtype=np.float32)
+        chunk = max(1, self.score_budget_bytes // max(1, 4 * len(foods)))
+        weights = profiles.astype(np.float32)
+        for start in range(0, len(profiles) if k else 0, chunk):
+            stop = start + chunk
+            scores = weights[start:stop] @ tag_scores + foods.base
+            mask = np.unpackbits(packed[start:stop], axis=1, count=len(foods)).view(bool)
+            scores[mask] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < len(foods) \
+                else np.broadcast_to(np.arange(len(foods)), (len(scores), len(foods)))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            # Moins de k aliments autorisés : les places restantes restent vides
+            top = np.where(np.isfinite(top_scores), top, -1)
+            best[start:stop, :k] = top
+            best_scores[start:stop, :k] = top_scores
+        timings["score"] = time.perf_counter() - started
+
+        stats = {
+            "personnes": len(uris),
+            "aliments": len(foods),
+            "nutriments": len(foods.nutrient_names),
+            "tags": len(tags),
+            "tags_sans_regle": unmatched,
+            "profils": len(profiles),
+            "top_k": top_k,
+            "seconds": {name: round(value, 3) for name, value in timings.items()},
+        }
+        return Recommendations(uris, foods.uris, best[inverse], best_scores[inverse], stats)
+
+    # ==================== ÉCRITURE ====================
+
+    def triples(self, personne, aliment, rank, score, created):
+        """URI and triples of one generated recommendation"""
+        local_id = personne.rsplit("#", 1)[-1]
+        uri = entity_uri("recommandation", f"{GENERATED_ID_PREFIX}{local_id}_{rank}")
+        statements = [
+            f"a nutrition:{ENTITY_LISTS['recommandations']['class']}",
+            f"nutrition:recommande <{personne}>",
+            f"nutrition:associeAliment <{aliment}>",
+            f"nutrition:dateCreation {build_sparql_value(created, 'string')}",
+            f"nutrition:score {build_sparql_value(round(score, 4), 'float')}",
+        ]
+        return f"<{uri}> " + " ;\n    ".join(statements) + " ."
+
+    def write(self, recommendations, render_delete):
+        """Replace the generated recommendations of each person, in chunked updates.
+
+        `render_delete(personnes)` is the update removing the previous
+        generated recommendations of those persons; it runs in the same
+        request as the INSERT DATA of the chunk.
+        """
+        created = datetime.now().isoformat()
+        written = failed = chunks = 0
+        errors = []
+        chunk, chunk_personnes, chunk_bytes = [], [], 0
+
+        def flush():
+            nonlocal written, failed, chunks
+            chunks += 1
+            body = "\n".join(chunk)
+            update = render_delete(chunk_personnes)
+            if body:
+                update += " ;\nINSERT DATA {\n" + body + "\n}"
+            success, error = self.update(update)
+            if success:
+                written += len(chunk)
+            else:
+                failed += len(chunk)
+                errors.append(error)
+
+        for personne, items in recommendations:
+            for rank, (aliment, score) in enumerate(items, 1):
+                triples = self.triples(personne, aliment, rank, score, created)
+                chunk.append(triples)
+                chunk_bytes += len(triples.encode("utf-8"))
+            chunk_personnes.append(personne)
+            if (chunk_bytes >= self.chunk_bytes or len(chunk) >= self.chunk_rows
+                    or len(chunk_personnes) >= self.chunk_rows):
+                flush()
+                chunk, chunk_personnes, chunk_bytes = [], [], 0
+        if chunk_personnes:
+            flush()
+        return {"written": written, "failed": failed, "chunks": chunks, "errors": errors[:5]}
+
+    # ==================== TRAITEMENT PAR LOTS ====================
+
+    def claim(self):
+        """Mark a batch as running; False if one already is"""
+        with self._lock:
+            if self.running:
+                return False
+            self.running = True
+            return True
+
+    def run_batch(self, render_delete, top_k=None, claimed=False):
+        """Recommend for every person and write the results; one run at a time
+
+        With `claimed`, the caller already holds the run through ``claim()``.
+        """
+        if not claimed and not self.claim():
+            raise RuntimeError("Une génération est déjà en cours")
+        started = time.time()
+        try:
+            recommendations = self.recommend(top_k=top_k)
+            write_started = time.perf_counter()
+            result = self.write(recommendations, render_delete)
+            recommendations.stats["seconds"]["write"] = round(time.perf_counter() - write_started, 3)
+            self.last_run = {"ok": result["failed"] == 0, "started": started,
+                             **recommendations.stats, **result}
+            logger.info("Recommandations générées: %d personnes, %d écrites en %.1fs",
+                        recommendations.stats["personnes"], result["written"], time.time() - started)
+        except Exception as e:
+            logger.error("Génération des recommandations impossible: %s", e)
+            self.last_run = {"ok": False, "started": started, "error": str(e)}
+            raise
+        finally:
+            self.running = False
+        return self.last_run
+
+    def status(self):
+        return {"running": self.running, "last_run": self.last_run}
@@ -0,0 +1,87 @@
+"""Two-tier cache for the natural-language search endpoint"""
+
+import re
+import threading
+import unicodedata
+
+from query_cache import QueryCache
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_query_text(text):
+    """Canonical form of a search: NFC, case-folded, single spaces, no final punctuation"""
+    text = unicodedata.normalize("NFC", text).casefold()
+    return _SPACES.sub(" ", text).strip(" ?!.")
+
+
+def approximate_size(result):
+    """Rough size in bytes of a SPARQL JSON result, for the byte budget"""
+    size = 64
+    for binding in result.get("results", {}).get("bindings", []):
+        for var, term in binding.items():
+            size += 48 + len(var) + len(term.get("value", ""))
+    return size
+
+
+class SearchCache:
+    """Parsed-query tier and result tier for /api/semantic-search.
+
+    The first tier maps normalized text to the generated SPARQL, so repeated
+    searches skip spaCy and the regex extraction; it does not depend on the
+    data, so writes leave it alone. The second maps that SPARQL
+    to its result for the current dataset version; every successful write
+    bumps the version, which makes all earlier results unreachable at once
+    (they then leave the LRU as new entries come in).
+    """
+
+    def __init__(self, max_queries=2048, max_results=512, max_bytes=16 * 1024 * 1024,
+                 ttl=300, enabled=True):
+        # La requête générée ne dépend que du texte : pas d'expiration
+        self.parsed = QueryCache(max_entries=max_queries, max_bytes=max_bytes,
+                                 ttl=None, enabled=enabled)
+        self.results = QueryCache(max_entries=max_results, max_bytes=max_bytes,
+                                  ttl=ttl, enabled=enabled)
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def bump_version(self):
+        """Called after every successful write to the dataset"""
+        with self._lock:
+            self.version += 1
+
+    def sparql_for(self, text, variant, build):
+        """SPARQL for `text`, calling build(text) on a miss.
+
+        The cache key is the normalized text, but `build` gets the text as
+        typed. `variant` distinguishes parses of the same text that may
+        differ, e.g. with and without the spaCy model loaded.
+        """
+        key = (normalize_query_text(text), variant)
+        sparql = self.parsed.get(key)
+        if sparql is None:
+            sparql = build(text)
+            if sparql:
+                self.parsed.set(key, sparql, size=len(sparql))
+        return sparql
+
+    def results_for(self, sparql, run):
+        """Result of `sparql` for the current dataset version, calling run(sparql) on a miss"""
+        key = (self.version, sparql)
+        result = self.results.get(key)
+        if result is None:
+            result = run(sparql)
+            if "error" not in result:
+                self.results.set(key, result, size=approximate_size(result))
+        return result
+
+    def clear(self):
+        self.parsed.clear()
+        self.results.clear()
+
+    def stats(self):
+        return {
+            "dataset_version": self.version,
+            "parsed": self.parsed.stats(),
+            "results": self.results.stats(),
+        }
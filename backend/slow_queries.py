@@ -0,0 +1,115 @@
+"""Bounded log of slow SPARQL requests, grouped by query shape"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+
+# Ordre important : chaînes et IRIs d'abord, elles peuvent contenir "#" ou des chiffres
+_SHAPE_RULES = [
+    (re.compile(r'"(?:[^"\\]|\\.)*"(?:\^\^\S+|@[\w-]+)?'), '"?"'),
+    (re.compile(r"<[^<>\s]*>"), "<?>"),
+    (re.compile(r"#[^\n]*"), ""),
+    (re.compile(r"(?<![\w?$])[-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b"), "0"),
+    (re.compile(r"(VALUES\s+\??\w+\s*\{)[^}]*\}", re.IGNORECASE), r"\1 … }"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def query_shape(query):
+    """The query with its literals, IRIs, numbers and VALUES lists masked.
+
+    Queries generated from different user inputs ("plus de 30 ans",
+    "plus de 50 ans") share one shape, so their timings add up.
+    """
+    shape = query
+    for pattern, replacement in _SHAPE_RULES:
+        shape = pattern.sub(replacement, shape)
+    return shape.strip()
+
+
+def shape_id(shape):
+    return hashlib.sha1(shape.encode("utf-8")).hexdigest()[:12]
+
+
+class SlowQueryLog:
+    """The last `size` requests that took at least `threshold_ms`"""
+
+    def __init__(self, threshold_ms=500, size=500):
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def record(self, kind, query_id, query, seconds, route=None, search_text=None,
+               rows=None, size=None, status=None, error=None):
+        duration_ms = seconds * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        shape = query_shape(query)
+        entry = {
+            "time": time.time(),
+            "kind": kind,
+            "query_id": query_id,
+            "shape_id": shape_id(shape),
+            "duration_ms": round(duration_ms, 3),
+            "route": route,
+            "search_text": search_text,
+            "rows": rows,
+            "bytes": size,
+            "status": status,
+            "error": error,
+            "query": query,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+
+    def recent(self, limit=None):
+        """Entries, most recent first"""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit]
+
+    def shapes(self):
+        """Entries grouped by query shape, the largest total time first"""
+        groups = {}
+        for entry in self.recent():
+            group = groups.get(entry["shape_id"])
+            if group is None:
+                group = groups[entry["shape_id"]] = {
+                    "shape_id": entry["shape_id"],
+                    "shape": query_shape(entry["query"]),
+                    "kind": entry["kind"],
+                    "query_ids": [],
+                    "routes": [],
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "example": entry["query"],
+                    "example_search": entry["search_text"],
+                }
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            for key, value in (("query_ids", entry["query_id"]), ("routes", entry["route"])):
+                if value and value not in group[key]:
+                    group[key].append(value)
+        for group in groups.values():
+            group["total_ms"] = round(group["total_ms"], 3)
+            group["avg_ms"] = round(group["total_ms"] / group["count"], 3)
+        return sorted(groups.values(), key=lambda group: group["total_ms"], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            "threshold_ms": self.threshold_ms,
+            "size": self._entries.maxlen,
+            "kept": len(self._entries),
+            "recorded": self.recorded,
+        }
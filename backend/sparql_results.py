@@ -0,0 +1,151 @@
+"""Incremental decoding of SPARQL result documents"""
+
+import codecs
+import json
+
+
+def iter_json_bindings(chunks):
+    """Yield the bindings of a SPARQL JSON results stream one at a time.
+
+    `chunks` is an iterable of bytes (e.g. ``response.iter_content()``). Only
+    the binding being decoded is kept in memory, never the whole document.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    in_bindings = False
+
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        while True:
+            if not in_bindings:
+                results = buffer.find('"results"', pos)
+                start = buffer.find('"bindings"', results) if results != -1 else -1
+                bracket = buffer.find("[", start) if start != -1 else -1
+                if bracket == -1:
+                    break
+                pos = bracket + 1
+                in_bindings = True
+                continue
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == "]":
+                return
+            try:
+                binding, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # binding incomplet : attendre le bloc suivant
+            yield binding
+            pos = end
+        if in_bindings:
+            buffer = buffer[pos:]
+            pos = 0
+
+    if in_bindings:
+        raise ValueError("Résultats SPARQL JSON tronqués ou invalides")
+
+
+def flatten_binding(binding):
+    """{"var": {"type": ..., "value": v}} -> {"var": v}"""
+    return {var: term["value"] for var, term in binding.items()}
+
+
+# ==================== TSV ====================
+
+TSV_MIMETYPE = "text/tab-separated-values"
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+_INTEGER_TYPES = {XSD + t for t in (
+    "integer", "int", "long", "short", "byte", "nonNegativeInteger", "positiveInteger",
+    "nonPositiveInteger", "negativeInteger", "unsignedInt", "unsignedLong",
+    "unsignedShort", "unsignedByte",
+)}
+_FLOAT_TYPES = {XSD + "decimal", XSD + "float", XSD + "double"}
+_BOOLEAN_TYPE = XSD + "boolean"
+
+_TSV_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+
+def _unescape(lexical):
+    if "\\" not in lexical:
+        return lexical
+    out = []
+    i = 0
+    while i < len(lexical):
+        c = lexical[i]
+        if c != "\\":
+            out.append(c)
+            i += 1
+            continue
+        nxt = lexical[i + 1]
+        if nxt == "u":
+            out.append(chr(int(lexical[i + 2:i + 6], 16)))
+            i += 6
+        elif nxt == "U":
+            out.append(chr(int(lexical[i + 2:i + 10], 16)))
+            i += 10
+        else:
+            out.append(_TSV_ESCAPES.get(nxt, nxt))
+            i += 2
+    return "".join(out)
+
+
+def typed_literal(lexical, datatype):
+    """Native Python value of a typed literal; ill-typed values stay strings"""
+    try:
+        if datatype in _INTEGER_TYPES:
+            return int(lexical)
+        if datatype in _FLOAT_TYPES:
+            return float(lexical)
+        if datatype == _BOOLEAN_TYPE:
+            return lexical in ("true", "1")
+    except ValueError:
+        pass  # valeur mal typée dans le graphe : on garde le texte
+    return lexical
+
+
+def decode_tsv_term(cell):
+    """Convert one SPARQL TSV cell (Turtle syntax) to a native Python value"""
+    if not cell:
+        return None
+    first = cell[0]
+    if first == '"':
+        end = cell.rfind('"')
+        lexical = _unescape(cell[1:end])
+        suffix = cell[end + 1:]
+        if suffix.startswith("^^<"):
+            return typed_literal(lexical, suffix[3:-1])
+        return lexical
+    if first == "<":
+        return cell[1:-1]
+    if cell == "true" or cell == "false":
+        return cell == "true"
+    if first.isdigit() or first in "+-.":
+        # Nombres abrégés de Turtle : 42, 1.5, 1.5e0
+        try:
+            if "." in cell or "e" in cell or "E" in cell:
+                return float(cell)
+            return int(cell)
+        except ValueError:
+            pass
+    return cell
+
+
+def decode_tsv(text):
+    """Decode a SPARQL TSV result into (columns, rows) with typed values.
+
+    Unlike SPARQL JSON, every cell carries its datatype inline, so numbers
+    and booleans come back as native values and unbound variables as None.
+    """
+    lines = text.split("\n")
+    columns = [name.lstrip("?$") for name in lines[0].rstrip("\r").split("\t")] if lines[0] else []
+    rows = []
+    for line in lines[1:]:
+        if not line:
+            continue
+        rows.append([decode_tsv_term(cell) for cell in line.rstrip("\r").split("\t")])
+    return columns, rows
+
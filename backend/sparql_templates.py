@@ -0,0 +1,344 @@
+"""Registry of precompiled, parameterized SPARQL queries
+
+Queries are declared once with ``${name}`` placeholders and a type for each
+parameter. Declarations are checked at import and split into literal chunks,
+so rendering is a single join of already-escaped values. Every template has a
+stable ``query_id`` that the cache, logs and metrics can key on.
+"""
+
+import hashlib
+import math
+import re
+
+from sparql_utils import ONTOLOGY_PREFIX, escape_sparql_string
+
+_PLACEHOLDER = re.compile(r"\$\{(\w+)\}")
+_UNSAFE_IRI = re.compile(r'[\s<>"{}|^`\\]')
+_REGEX_SPECIAL = re.compile(r"([\\.^$|?*+()\[\]{}])")
+
+
+def format_iri(value):
+    """<iri>, rejecting characters that would break out of the IRI"""
+    if not isinstance(value, str) or not value or _UNSAFE_IRI.search(value):
+        raise ValueError(f"IRI invalide: {value!r}")
+    return f"<{value}>"
+
+
+def format_string(value):
+    return f'"{escape_sparql_string(value)}"'
+
+
+def format_integer(value):
+    if isinstance(value, bool):
+        raise ValueError(f"entier invalide: {value!r}")
+    return str(int(value))
+
+
+def format_float(value):
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"nombre invalide: {value!r}")
+    return repr(number)
+
+
+def format_regex(value):
+    """Literal matching `value` as plain text inside REGEX()"""
+    return format_string(_REGEX_SPECIAL.sub(r"\\\1", str(value)))
+
+
+PARAM_TYPES = {
+    "iri": format_iri,
+    "string": format_string,
+    "integer": format_integer,
+    "float": format_float,
+    "regex": format_regex,
+}
+
+
+def format_param(param_type, value):
+    """Render one value as SPARQL; ``values:<type>`` renders a VALUES row list"""
+    if param_type.startswith("values:"):
+        item_format = PARAM_TYPES[param_type[7:]]
+        items = [item_format(item) for item in value]
+        if not items:
+            raise ValueError("liste VALUES vide")
+        return " ".join(items)
+    return PARAM_TYPES[param_type](value)
+
+
+class SparqlTemplate:
+    """A declared query: literal chunks interleaved with typed parameters"""
+
+    def __init__(self, query_id, text, params):
+        names = _PLACEHOLDER.findall(text)
+        undeclared = set(names) - set(params)
+        if undeclared:
+            raise ValueError(f"{query_id}: paramètres non déclarés {sorted(undeclared)}")
+        unused = set(params) - set(names)
+        if unused:
+            raise ValueError(f"{query_id}: paramètres inutilisés {sorted(unused)}")
+        for name, param_type in params.items():
+            base = param_type[7:] if param_type.startswith("values:") else param_type
+            if base not in PARAM_TYPES:
+                raise ValueError(f"{query_id}: type inconnu {param_type!r} pour {name}")
+        if text.count("{") != text.count("}"):
+            raise ValueError(f"{query_id}: accolades déséquilibrées")
+
+        self.query_id = query_id
+        self.text = text
+        self.params = dict(params)
+        self.fingerprint = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        # Découpage unique : les indices impairs sont des noms de paramètres
+        self._chunks = _PLACEHOLDER.split(text)
+
+    def render(self, **values):
+        missing = set(self.params) - set(values)
+        if missing:
+            raise ValueError(f"{self.query_id}: paramètres manquants {sorted(missing)}")
+        chunks = list(self._chunks)
+        for i in range(1, len(chunks), 2):
+            name = chunks[i]
+            chunks[i] = format_param(self.params[name], values[name])
+        return "".join(chunks)
+
+
+TEMPLATES = {}
+
+
+def register(query_id, text, **params):
+    """Declare a query once; raises ValueError on an invalid declaration"""
+    if query_id in TEMPLATES:
+        raise ValueError(f"requête déjà déclarée: {query_id}")
+    template = SparqlTemplate(query_id, text, params)
+    TEMPLATES[query_id] = template
+    return template
+
+
+def render_query(query_id, **values):
+    """Text of a registered query with its parameters bound"""
+    return TEMPLATES[query_id].render(**values)
+
+
+def nutrition_iri(local_name):
+    """Full IRI of a term of the nutrition ontology"""
+    return f"{ONTOLOGY_PREFIX}{local_name}"
+
+
+# ==================== QUERIES ====================
+
+register("entity.delete", """
+    DELETE WHERE { ${uri} ?p ?o }
+""", uri="iri")
+
+register("entity.exists", """
+    ASK { ${uri} a ${entity_class} }
+""", uri="iri", entity_class="iri")
+
+register("entity.delete_properties", """
+    DELETE { ?s ?p ?o } WHERE {
+        VALUES ?s { ${subjects} }
+        VALUES ?p { ${predicates} }
+        ?s ?p ?o
+    }
+""", subjects="values:iri", predicates="values:iri")
+
+register("personne.relation.insert", """
+    INSERT DATA {
+        ${personne} a nutrition:Personne .
+        ${personne} nutrition:nom ${nom} .
+        ${personne} ${predicate} ${cible} .
+    }
+""", personne="iri", nom="string", predicate="iri", cible="iri")
+
+register("personne.relation.delete", """
+    DELETE WHERE { ${personne} ${predicate} ${cible} . }
+""", personne="iri", predicate="iri", cible="iri")
+
+register("aliment.relation.insert", """
+    INSERT DATA {
+        ${aliment} ${relation} ${cible} .
+        ${aliment} ${quantite_predicate} "${quantite}"^^xsd:float .
+        ${aliment} ${unite_predicate} ${unite} .
+    }
+""", aliment="iri", relation="iri", cible="iri",
+    quantite_predicate="iri", quantite="float", unite_predicate="iri", unite="string")
+
+register("aliment.relation.delete", """
+    DELETE WHERE {
+        ${aliment} ${relation} ${cible} .
+        ${aliment} ${quantite_predicate} ?quantite .
+        ${aliment} ${unite_predicate} ?unite .
+    }
+""", aliment="iri", relation="iri", cible="iri", quantite_predicate="iri", unite_predicate="iri")
+
+register("relations.personnes", """
+    SELECT ?personneId ?personneNom ?typeRelation ?cibleId ?cibleNom WHERE {
+        # Trouve TOUTES les relations, même si la personne n'a pas de nom
+        {
+            ?personne nutrition:aAllergie ?cible .
+            BIND("ALLERGIE" AS ?typeRelation)
+            OPTIONAL { ?cible nutrition:nom ?cibleNom }
+        }
+        UNION
+        {
+            ?personne nutrition:aCondition ?cible .
+            BIND("CONDITION" AS ?typeRelation)
+            OPTIONAL { ?cible nutrition:nom ?cibleNom }
+        }
+        UNION
+        {
+            ?personne nutrition:aPreference ?cible .
+            BIND("PREFERENCE" AS ?typeRelation)
+            OPTIONAL { ?cible nutrition:nom ?cibleNom }
+        }
+        UNION
+        {
+            ?personne nutrition:participeÀ ?cible .
+            BIND("OBJECTIF" AS ?typeRelation)
+            OPTIONAL { ?cible nutrition:nom ?cibleNom }
+        }
+
+        # OPTIONAL pour le nom de la personne
+        OPTIONAL { ?personne nutrition:nom ?personneNom }
+        BIND(STRAFTER(STR(?personne), "#") AS ?personneId)
+        BIND(STRAFTER(STR(?cible), "#") AS ?cibleId)
+    }
+    ORDER BY ?personneNom ?typeRelation
+""")
+
+register("relations.aliments", """
+    SELECT ?alimentId ?alimentNom ?typeRelation ?cibleId ?cibleNom ?quantite ?unite WHERE {
+        ?aliment a nutrition:Aliment ;
+                 nutrition:nom ?alimentNom .
+        BIND(STRAFTER(STR(?aliment), "#") AS ?alimentId)
+
+        {
+            ?aliment nutrition:contientNutriment ?cible .
+            ?aliment nutrition:quantiteNutriment ?quantite .
+            ?aliment nutrition:uniteNutriment ?unite .
+            BIND("NUTRIMENT" AS ?typeRelation)
+            OPTIONAL { ?cible nutrition:nom ?cibleNom }
+            BIND(STRAFTER(STR(?cible), "#") AS ?cibleId)
+        }
+        UNION
+        {
+            ?aliment nutrition:estDansRepas ?cible .
+            ?aliment nutrition:quantiteRepas ?quantite .
+            ?aliment nutrition:uniteRepas ?unite .
+            BIND("REPAS" AS ?typeRelation)
+            OPTIONAL { ?cible nutrition:nom ?cibleNom }
+            BIND(STRAFTER(STR(?cible), "#") AS ?cibleId)
+        }
+        UNION
+        {
+            ?aliment nutrition:estDansRecette ?cible .
+            ?aliment nutrition:quantiteRecette ?quantite .
+            ?aliment nutrition:uniteRecette ?unite .
+            BIND("RECETTE" AS ?typeRelation)
+            OPTIONAL { ?cible nutrition:nom ?cibleNom }
+            BIND(STRAFTER(STR(?cible), "#") AS ?cibleId)
+        }
+    }
+    ORDER BY ?alimentNom ?typeRelation
+""")
+
+register("dashboard.personnes_averages", """
+    SELECT (AVG(?âge) AS ?âge) (AVG(?poids) AS ?poids) (AVG(?taille) AS ?taille) WHERE {
+        ?s a nutrition:Personne ;
+           nutrition:âge ?âge ;
+           nutrition:poids ?poids ;
+           nutrition:taille ?taille .
+    }
+""")
+
+register("dashboard.aliments_averages", """
+    SELECT (AVG(?calories) AS ?calories) (AVG(?indexGlycémique) AS ?indexGlycémique) WHERE {
+        ?s a nutrition:Aliment ;
+           nutrition:calories ?calories ;
+           nutrition:indexGlycémique ?indexGlycémique .
+    }
+""")
+
+register("dashboard.recent_recommandations", """
+    SELECT ?id ?personneId ?alimentId ?dateCreation WHERE {
+        ?rec a nutrition:Recommandation ;
+             nutrition:recommande ?personne ;
+             nutrition:associeAliment ?aliment ;
+             nutrition:dateCreation ?dateCreation .
+        BIND(STRAFTER(STR(?rec), "#") AS ?id)
+        BIND(STRAFTER(STR(?personne), "#") AS ?personneId)
+        BIND(STRAFTER(STR(?aliment), "#") AS ?alimentId)
+    } ORDER BY DESC(?dateCreation) LIMIT ${limit}
+""", limit="integer")
+
+register("search.stats", """
+    SELECT ?type (COUNT(?entity) as ?count) WHERE {
+        ?entity a ?class .
+        BIND(REPLACE(STR(?class), ".*#", "") AS ?type)
+    } GROUP BY ?type
+""")
+
+register("names.all", """
+    SELECT ?entity ?nom ?type WHERE {
+        ?entity nutrition:nom ?nom .
+        OPTIONAL {
+            ?entity a ?class .
+            FILTER(STRSTARTS(STR(?class), STR(nutrition:)))
+            BIND(STRAFTER(STR(?class), "#") AS ?type)
+        }
+    }
+""")
+
+# Moteur de recommandation : profils des personnes et des aliments
+_RECOMMANDATIONS_PERSONNES = """
+    SELECT ?personne ?poids ?taille ?objectifPoids WHERE {
+        %s
+        ?personne a nutrition:Personne .
+        OPTIONAL { ?personne nutrition:poids ?poids }
+        OPTIONAL { ?personne nutrition:taille ?taille }
+        OPTIONAL { ?personne nutrition:objectifPoids ?objectifPoids }
+    }
+"""
+_RECOMMANDATIONS_LIENS = """
+    SELECT ?personne ?relation ?cible ?nom WHERE {
+        %s
+        VALUES ?relation { nutrition:aAllergie nutrition:aCondition nutrition:aPreference nutrition:participeÀ }
+        ?personne a nutrition:Personne ;
+                  ?relation ?cible .
+        OPTIONAL { ?cible nutrition:nom ?nom }
+    }
+"""
+register("recommandations.personnes", _RECOMMANDATIONS_PERSONNES % "")
+register("recommandations.personnes_in", _RECOMMANDATIONS_PERSONNES % "VALUES ?personne { ${personnes} }",
+         personnes="values:iri")
+register("recommandations.liens", _RECOMMANDATIONS_LIENS % "")
+register("recommandations.liens_in", _RECOMMANDATIONS_LIENS % "VALUES ?personne { ${personnes} }",
+         personnes="values:iri")
+
+register("recommandations.aliments", """
+    SELECT ?aliment ?nom ?calories ?indexGlycémique ?teneurFibres ?teneurSodium WHERE {
+        ?aliment a nutrition:Aliment .
+        OPTIONAL { ?aliment nutrition:nom ?nom }
+        OPTIONAL { ?aliment nutrition:calories ?calories }
+        OPTIONAL { ?aliment nutrition:indexGlycémique ?indexGlycémique }
+        OPTIONAL { ?aliment nutrition:teneurFibres ?teneurFibres }
+        OPTIONAL { ?aliment nutrition:teneurSodium ?teneurSodium }
+    }
+""")
+
+register("recommandations.aliments_nutriments", """
+    SELECT ?aliment ?nutriment WHERE {
+        ?aliment a nutrition:Aliment ;
+                 nutrition:contientNutriment ?cible .
+        ?cible nutrition:nom ?nutriment .
+    }
+""")
+
+register("recommandations.delete_generated", """
+    DELETE { ?s ?p ?o } WHERE {
+        VALUES ?personne { ${personnes} }
+        ?s nutrition:recommande ?personne .
+        FILTER(STRSTARTS(STR(?s), ${prefix}))
+        ?s ?p ?o
+    }
+""", personnes="values:iri", prefix="string")
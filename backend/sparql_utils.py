@@ -0,0 +1,35 @@
+"""SPARQL literal helpers shared by the API and its support modules"""
+
+ONTOLOGY_PREFIX = "http://www.semanticweb.org/user/ontologies/2025/8/nutrition#"
+SPARQL_PREFIXES = f"""
+        PREFIX nutrition: <{ONTOLOGY_PREFIX}>
+        PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+"""
+
+def escape_sparql_string(s):
+    """Escape special characters in SPARQL string literals"""
+    if s is None:
+        return ""
+    s = str(s)
+    s = s.replace("\\", "\\\\")
+    s = s.replace('"', '\\"')
+    s = s.replace("\n", "\\n")
+    s = s.replace("\r", "\\r")
+    s = s.replace("\t", "\\t")
+    return s
+
+def build_sparql_value(value, data_type="string"):
+    """Build a properly formatted SPARQL value with type"""
+    if value is None:
+        return None
+    
+    if data_type == "string":
+        escaped = escape_sparql_string(value)
+        return f'"{escaped}"^^xsd:string'
+    elif data_type == "integer":
+        return f'"{int(value)}"^^xsd:integer'
+    elif data_type == "float":
+        return f'"{float(value)}"^^xsd:float'
+    elif data_type == "boolean":
+        return f'"{str(value).lower()}"^^xsd:boolean'
+    return None
@@ -0,0 +1,302 @@
+"""Storage backends: the Fuseki HTTP server or an embedded Oxigraph store.
+
+Both expose the same methods, called by the sparql_* helpers of app.py:
+
+    select(query, call)          SPARQL JSON results as a dict
+    select_rows(query, call)     (columns, rows) with native Python values
+    stream_bindings(query, call) BindingStream of SPARQL JSON bindings
+    update(update, call)         None, or raises StorageError
+    ping(timeout)                True when the store answers
+    stats()                      backend description for /api/health
+
+`call` is the FusekiCall recording the request; the backend reports the
+status and size through call.received(). The embedded store skips the HTTP
+hop and the JSON encoding/decoding of the results entirely.
+"""
+
+import gzip
+import logging
+import threading
+
+try:
+    import pyoxigraph
+except ImportError:
+    pyoxigraph = None
+
+from config import (
+    STORAGE_BACKEND, OXIGRAPH_PATH, OXIGRAPH_LOAD_FILE, FUSEKI_URL, FUSEKI_REPLICAS,
+    FUSEKI_READ_FROM_PRIMARY, FUSEKI_HEDGE_PERCENTILE, FUSEKI_HEDGE_MIN_MS, FUSEKI_STICKY_SECONDS,
+    FUSEKI_BREAKER_FAILURES, FUSEKI_BREAKER_RESET, FUSEKI_HEDGE_WORKERS, FUSEKI_POOL_SIZE,
+)
+from fuseki_client import get_fuseki_client
+from fuseki_async import get_async_client
+from fuseki_router import ReplicaRouter
+from sparql_results import iter_json_bindings, decode_tsv, typed_literal, TSV_MIMETYPE
+
+logger = logging.getLogger(__name__)
+
+XSD_STRING = "http://www.w3.org/2001/XMLSchema#string"
+RDF_LANG_STRING = "http://www.w3.org/1999/02/22-rdf-syntax-ns#langString"
+
+
+class StorageError(Exception):
+    """A query or update the store refused; `status` is the HTTP-like code"""
+
+    def __init__(self, message, status=None, detail=None):
+        super().__init__(message)
+        self.status = status
+        self.detail = detail
+
+
+class BindingStream:
+    """Iterator over streamed bindings that releases its source on close()"""
+
+    def __init__(self, bindings, close=None):
+        self._bindings = bindings
+        self._close = close
+
+    def __iter__(self):
+        return iter(self._bindings)
+
+    def close(self):
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+
+class FusekiStorage:
+    """The Fuseki server, through the shared FusekiClient connection pool.
+
+    `client` can be a ReplicaRouter, which has the same methods.
+    """
+
+    name = "fuseki"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_fuseki_client()
+
+    def async_client(self):
+        """The httpx client used by the async helpers (None without httpx).
+
+        It only knows FUSEKI_URL, so with replicas the async helpers go
+        through the router from a thread instead.
+        """
+        return get_async_client() if self._client is None else None
+
+    def _check(self, response):
+        if response.status_code not in (200, 204):
+            detail = response.text[:300]
+            logger.error("SPARQL Error: %s - %s", response.status_code, detail)
+            raise StorageError(f"HTTP {response.status_code}", response.status_code, detail)
+
+    def select(self, query, call=None):
+        response = self.client.query(query)
+        if call is not None:
+            call.received(response.status_code, len(response.content))
+        self._check(response)
+        return response.json()
+
+    def select_rows(self, query, call=None):
+        # TSV : moins cher à décoder que le JSON et garde les types
+        response = self.client.query(query, accept=TSV_MIMETYPE)
+        if call is not None:
+            call.received(response.status_code, len(response.content))
+        self._check(response)
+        response.encoding = "utf-8"
+        return decode_tsv(response.text)
+
+    def stream_bindings(self, query, call=None):
+        response = self.client.query(query, stream=True)
+        if call is not None:
+            length = response.headers.get("Content-Length")
+            call.received(response.status_code, int(length) if length else None)
+        if response.status_code != 200:
+            response.close()
+            raise StorageError(f"HTTP {response.status_code}", response.status_code)
+        return BindingStream(iter_json_bindings(response.iter_content(chunk_size=64 * 1024)),
+                             response.close)
+
+    def update(self, update, call=None):
+        response = self.client.update(update)
+        if call is not None:
+            call.received(response.status_code)
+        self._check(response)
+
+    def ping(self, timeout=5):
+        return self.client.ping(timeout=timeout)
+
+    def stats(self):
+        if isinstance(self._client, ReplicaRouter):
+            return {"backend": self.name, **self._client.stats()}
+        return {"backend": self.name, "url": self.client.base_url}
+
+
+def _json_term(term):
+    """SPARQL JSON form of a pyoxigraph term, as Fuseki writes it"""
+    if isinstance(term, pyoxigraph.NamedNode):
+        return {"type": "uri", "value": term.value}
+    if isinstance(term, pyoxigraph.BlankNode):
+        return {"type": "bnode", "value": term.value}
+    result = {"type": "literal", "value": term.value}
+    if term.language:
+        result["xml:lang"] = term.language
+    elif term.datatype.value != XSD_STRING:
+        result["datatype"] = term.datatype.value
+    return result
+
+
+def _native_term(term):
+    """Python value of a pyoxigraph term, as decode_tsv returns it"""
+    if term is None:
+        return None
+    if isinstance(term, pyoxigraph.Literal):
+        datatype = term.datatype.value
+        if term.language or datatype in (XSD_STRING, RDF_LANG_STRING):
+            return term.value
+        return typed_literal(term.value, datatype)
+    return term.value
+
+
+# Taille approximative d'un terme en JSON, hors valeur (sert au budget du cache)
+_TERM_OVERHEAD = 40
+
+
+class OxigraphStorage:
+    """In-process Oxigraph store, in memory or persisted under `path`.
+
+    Nothing is serialized, so the size reported to call.received() is an
+    estimate of the equivalent SPARQL JSON document. A persistent store can
+    only be opened by one process at a time, so this backend is meant for
+    single-process deployments.
+    """
+
+    name = "oxigraph"
+
+    def __init__(self, path=None, load_file=None):
+        if pyoxigraph is None:
+            raise RuntimeError("STORAGE_BACKEND=oxigraph nécessite le paquet pyoxigraph")
+        self.path = path or None
+        self.store = pyoxigraph.Store(path) if path else pyoxigraph.Store()
+        if load_file and self.is_empty():
+            self.load_file(load_file)
+
+    def async_client(self):
+        # Pas de client HTTP : les helpers async passent par un thread
+        return None
+
+    def is_empty(self):
+        return not self.store.query("ASK { ?s ?p ?o }")
+
+    def load_file(self, path):
+        """Bulk-load an N-Triples or Turtle file, gzipped or not"""
+        name = path[:-3] if path.endswith(".gz") else path
+        rdf_format = pyoxigraph.RdfFormat.TURTLE if name.endswith(".ttl") else pyoxigraph.RdfFormat.N_TRIPLES
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            self.store.bulk_load(f, format=rdf_format)
+        logger.info("Store Oxigraph chargé depuis %s (%d triplets)", path, len(self.store))
+
+    def _query(self, query):
+        try:
+            return self.store.query(query)
+        except SyntaxError as e:
+            raise StorageError(f"Requête invalide: {e}", 400) from e
+        except OSError as e:
+            raise StorageError(str(e), 500) from e
+
+    def select(self, query, call=None):
+        results = self._query(query)
+        size = 0
+        if isinstance(results, pyoxigraph.QueryBoolean):
+            document = {"head": {}, "boolean": bool(results)}
+        elif isinstance(results, pyoxigraph.QuerySolutions):
+            variables = [v.value for v in results.variables]
+            bindings = []
+            for solution in results:
+                binding = {}
+                for variable in variables:
+                    term = solution[variable]
+                    if term is not None:
+                        binding[variable] = _json_term(term)
+                        size += len(term.value) + _TERM_OVERHEAD
+                bindings.append(binding)
+            document = {"head": {"vars": variables}, "results": {"bindings": bindings}}
+        else:
+            raise StorageError("Seules les requêtes SELECT et ASK sont prises en charge", 400)
+        if call is not None:
+            call.received(200, size)
+        return document
+
+    def select_rows(self, query, call=None):
+        results = self._query(query)
+        if not isinstance(results, pyoxigraph.QuerySolutions):
+            raise StorageError("select_rows attend une requête SELECT", 400)
+        columns = [v.value for v in results.variables]
+        rows = [[_native_term(solution[column]) for column in columns] for solution in results]
+        if call is not None:
+            call.received(200, sum(len(str(value)) + 1 for row in rows for value in row))
+        return columns, rows
+
+    def stream_bindings(self, query, call=None):
+        results = self._query(query)
+        if not isinstance(results, pyoxigraph.QuerySolutions):
+            raise StorageError("stream_bindings attend une requête SELECT", 400)
+        if call is not None:
+            call.received(200)
+        variables = [v.value for v in results.variables]
+        return BindingStream(
+            {variable: _json_term(solution[variable])
+             for variable in variables if solution[variable] is not None}
+            for solution in results
+        )
+
+    def update(self, update, call=None):
+        try:
+            self.store.update(update)
+        except SyntaxError as e:
+            raise StorageError(f"Mise à jour invalide: {e}", 400) from e
+        except OSError as e:
+            raise StorageError(str(e), 500) from e
+        if call is not None:
+            call.received(204)
+
+    def ping(self, timeout=5):
+        return True
+
+    def stats(self):
+        return {"backend": self.name, "path": self.path}
+
+
+def create_storage(backend=STORAGE_BACKEND):
+    """The backend selected by STORAGE_BACKEND ("fuseki" or "oxigraph")"""
+    if backend == "fuseki":
+        if not FUSEKI_REPLICAS:
+            return FusekiStorage()
+        return FusekiStorage(ReplicaRouter(
+            FUSEKI_URL, FUSEKI_REPLICAS, read_from_primary=FUSEKI_READ_FROM_PRIMARY,
+            hedge_percentile=FUSEKI_HEDGE_PERCENTILE, hedge_min_ms=FUSEKI_HEDGE_MIN_MS,
+            sticky_seconds=FUSEKI_STICKY_SECONDS, breaker_failures=FUSEKI_BREAKER_FAILURES,
+            breaker_reset=FUSEKI_BREAKER_RESET,
+            hedge_workers=FUSEKI_HEDGE_WORKERS or FUSEKI_POOL_SIZE * (1 + len(FUSEKI_REPLICAS)),
+        ))
+    if backend == "oxigraph":
+        return OxigraphStorage(OXIGRAPH_PATH, OXIGRAPH_LOAD_FILE)
+    raise ValueError(f"STORAGE_BACKEND inconnu: {backend!r}")
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the process-wide storage backend, creating it on first use"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
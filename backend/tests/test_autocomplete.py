@@ -0,0 +1,65 @@
+import random
+
+from autocomplete import Autocomplete, PrefixTrie
+
+
+def brute_force_top(weights, prefix, k):
+    ranked = sorted((-weight, text, kind, key) for (kind, key, text), weight in weights.items()
+                    if weight > 0 and key.startswith(prefix))
+    return [(text, kind, -weight) for weight, text, kind, _ in ranked[:k]]
+
+
+def test_trie_top_k_matches_brute_force_under_adds_and_removals():
+    rng = random.Random(11)
+    trie = PrefixTrie(top_k=3)
+    weights = {}
+    keys = ["".join(rng.choice("ab") for _ in range(rng.randint(1, 5))) for _ in range(40)]
+    for _ in range(600):
+        key = rng.choice(keys)
+        kind = rng.choice(["name", "query"])
+        ident = (kind, key, key.upper())
+        delta = rng.choice([1, 1, 2, -1]) if weights.get(ident, 0) > 0 else 1
+        trie.add(key, kind, key.upper(), delta)
+        weights[ident] = weights.get(ident, 0) + delta
+        prefix = rng.choice(keys)[:rng.randint(0, 3)]
+        assert trie.top(prefix) == brute_force_top(weights, prefix, 3)
+        assert trie.weight(key, kind) == weights[ident]
+
+
+def test_trie_prefix_ending_inside_an_edge():
+    trie = PrefixTrie(top_k=5)
+    trie.add("pomme de terre", "name", "Pomme de terre")
+    trie.add("pommeau", "name", "Pommeau", 2)
+    assert [text for text, _, _ in trie.top("pom")] == ["Pommeau", "Pomme de terre"]
+    assert trie.top("pomme d") == [("Pomme de terre", "name", 1)]
+    assert trie.top("pommex") == []
+    assert trie.weight("pomme", "name") == 0
+
+
+def test_autocomplete_ranks_names_searches_and_templates():
+    autocomplete = Autocomplete(top_k=3)
+    autocomplete.load_names([("u1", "Crème brûlée"), ("u2", "Crêpe"), ("u3", "Crêpe")])
+    autocomplete.add_templates(["Crudités de saison"])
+    for _ in range(3):
+        autocomplete.record_query("crème fraîche")
+    assert autocomplete.suggest("cr") == [
+        {"text": "crème fraîche", "kind": "query", "weight": 3},
+        {"text": "Crêpe", "kind": "name", "weight": 2},
+        {"text": "Crudités de saison", "kind": "template", "weight": 1},
+    ]
+    assert autocomplete.suggest("CREME B") == [{"text": "Crème brûlée", "kind": "name", "weight": 1}]
+
+
+def test_autocomplete_incremental_names_and_reload_replay():
+    autocomplete = Autocomplete()
+    autocomplete.load_names([("u1", "Pomme")])
+    autocomplete.set_names("u1", ["Poire"])
+    assert [s["text"] for s in autocomplete.suggest("po")] == ["Poire"]
+    autocomplete.add_names("u1", ["Poire"])  # déjà présent : pas recompté
+    assert autocomplete.suggest("poi")[0]["weight"] == 1
+
+    autocomplete.begin_load()
+    autocomplete.set_names("u2", ["Pêche"])  # écrite pendant la lecture des noms
+    autocomplete.remove("u1")
+    autocomplete.load_names([("u1", "Poire")])  # lecture faite avant ces écritures
+    assert [s["text"] for s in autocomplete.suggest("p")] == ["Pêche"]
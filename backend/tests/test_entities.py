@@ -0,0 +1,68 @@
+import pytest
+
+from entities import (
+    build_list_query, decode_cursor, encode_cursor, entity_uri, page_cut, validate_id,
+)
+from sparql_utils import SPARQL_PREFIXES, ONTOLOGY_PREFIX
+
+
+def test_cursor_round_trip():
+    uri = entity_uri("personne", "é/ü?x=1")
+    token = encode_cursor(uri)
+    assert "=" not in token
+    assert decode_cursor(token) == uri
+
+
+@pytest.mark.parametrize("token", ["", "!!!", encode_cursor("x")[:-2] + "@@", "eyJhZnRlciI6IDF9"])
+def test_decode_cursor_rejects_malformed_tokens(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_validate_id_rejects_iri_breaking_characters():
+    assert validate_id("gen_001") == "gen_001"
+    for bad in ("", "a b", "a>b", 'a"b', None):
+        with pytest.raises(ValueError):
+            validate_id(bad)
+
+
+def test_page_cut_counts_entities_not_rows():
+    subjects = ["a", "a", "b", "c", "c", "c", "d"]
+    assert page_cut(subjects, 1) == (2, "a")
+    assert page_cut(subjects, 3) == (6, "c")
+    assert page_cut(subjects, 4) == (7, None)
+    assert page_cut([], 2) == (0, None)
+
+
+def test_list_query_pages_over_distinct_subjects():
+    query = build_list_query("personnes", limit=10, after=ONTOLOGY_PREFIX + "personne_b")
+    assert "SELECT DISTINCT ?s" in query
+    assert "LIMIT 11" in query
+    assert query.rstrip().endswith("ORDER BY STR(?s)")
+
+
+def test_multi_valued_entity_is_not_split_across_pages():
+    pyoxigraph = pytest.importorskip("pyoxigraph")
+    store = pyoxigraph.Store()
+    people = {"a": '"A1", "A2", "A3"', "b": '"B"', "c": '"C"'}
+    store.update(SPARQL_PREFIXES + "INSERT DATA {" + "".join(
+        f"nutrition:personne_{key} a nutrition:Personne ; nutrition:nom {names} ;"
+        " nutrition:âge 30 ; nutrition:poids 70.0 ; nutrition:taille 170.0 ."
+        for key, names in people.items()
+    ) + "}")
+
+    names, after = {}, None
+    while True:
+        query = build_list_query("personnes", fields=["nom"], after=after, limit=1)
+        rows = list(store.query(SPARQL_PREFIXES + query))
+        subjects = [row["s"].value for row in rows]
+        keep, next_uri = page_cut(subjects, 1)
+        page = {row["s"].value for row in rows[:keep]}
+        assert len(page) == 1
+        for row in rows[:keep]:
+            names.setdefault(row["id"].value, set()).add(row["nom"].value)
+        if next_uri is None:
+            break
+        after = next_uri
+
+    assert names == {"personne_a": {"A1", "A2", "A3"}, "personne_b": {"B"}, "personne_c": {"C"}}
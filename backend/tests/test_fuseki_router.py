@@ -0,0 +1,157 @@
+import contextvars
+import threading
+import time
+
+import pytest
+import requests
+
+from fuseki_router import (
+    ReplicaRouter, client_last_write, percentile, reset_client_last_write, set_client_last_write,
+)
+
+
+class FakeResponse:
+    def __init__(self, url, status_code=200):
+        self.url = url
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    """Stand-in for FusekiClient: a delay, then a status or a connection error"""
+
+    def __init__(self, url):
+        self.url = url
+        self.delay = 0.0
+        self.status_code = 200
+        self.fail = False
+        self.queries = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    def _answer(self):
+        time.sleep(self.delay)
+        if self.fail:
+            raise requests.ConnectionError(self.url)
+        return FakeResponse(self.url, self.status_code)
+
+    def query(self, query, accept=None, timeout=None, stream=False):
+        with self._lock:
+            self.queries += 1
+        return self._answer()
+
+    def update(self, update, timeout=None):
+        with self._lock:
+            self.updates += 1
+        return self._answer()
+
+    def ping(self, timeout=5):
+        return not self.fail
+
+    def close(self):
+        pass
+
+
+def make_router(replicas=("r1", "r2"), **kwargs):
+    clients = {}
+
+    def factory(url):
+        clients[url] = FakeClient(url)
+        return clients[url]
+
+    kwargs.setdefault("breaker_failures", 1000)
+    router = ReplicaRouter("p", list(replicas), client_factory=factory, **kwargs)
+    return router, clients
+
+
+@pytest.fixture(autouse=True)
+def fresh_client():
+    token = set_client_last_write(None)
+    yield
+    reset_client_last_write(token)
+
+
+def test_percentile():
+    assert percentile([5, 1, 3, 2, 4], 0.5) == 3
+    assert percentile([5, 1, 3, 2, 4], 1.0) == 5
+    assert percentile([1, 2], 0.5, min_samples=3) is None
+
+
+def test_reads_go_to_replicas_and_updates_to_the_primary():
+    router, clients = make_router()
+    for _ in range(10):
+        assert router.query("q").url in ("r1", "r2")
+    assert router.update("u").url == "p"
+    assert clients["p"].queries == 0 and clients["p"].updates == 1
+
+
+def test_read_after_own_write_goes_to_the_primary_without_hedging():
+    router, clients = make_router(hedge_percentile=0.9, hedge_min_ms=10, sticky_seconds=60)
+    router.update("u")
+    assert client_last_write() is not None
+    clients["p"].delay = 0.2  # bien au-delà du seuil de doublement
+    assert router.query("q").url == "p"
+    assert router.hedges == 0
+    assert clients["r1"].queries == clients["r2"].queries == 0
+    assert router.sticky_reads == 1
+
+
+def test_stickiness_is_per_client():
+    router, _ = make_router(sticky_seconds=60)
+    router.update("u")
+    other_client = contextvars.Context()
+    assert other_client.run(router.query, "q").url in ("r1", "r2")
+    assert router.query("q").url == "p"
+
+
+def test_sticky_read_falls_back_to_a_replica_when_the_primary_fails():
+    router, clients = make_router(sticky_seconds=60)
+    router.update("u")
+    clients["p"].fail = True
+    assert router.query("q").url in ("r1", "r2")
+
+
+def test_slow_read_is_hedged_and_the_fast_answer_wins():
+    router, clients = make_router(hedge_percentile=0.9, hedge_min_ms=10)
+    clients["r1"].delay = 0.3
+    r1, r2 = router.replicas
+    router.read_order = lambda *a: [r1, r2]
+    assert router.query("q").url == "r2"
+    assert router.hedges == 1 and router.hedge_wins == 1
+
+
+def test_each_node_is_tried_once_when_the_hedged_pair_fails():
+    for _ in range(20):
+        router, clients = make_router(replicas=("r1", "r2", "r3"), hedge_percentile=0.9,
+                                      hedge_min_ms=10)
+        good = "r3"
+        for url in ("r1", "r2"):
+            clients[url].fail = True
+            clients[url].delay = 0.05  # échoue après le seuil : la lecture est doublée
+        assert router.query("q").url == good
+        assert all(client.queries <= 1 for client in clients.values())
+
+
+def test_server_error_fails_over_and_open_breaker_is_skipped():
+    router, clients = make_router(breaker_failures=1)
+    clients["r1"].status_code = 503
+    r1, r2 = router.replicas
+    router.read_order = lambda *a: [r1, r2]
+    assert router.query("q").url == "r2"
+    assert r1.breaker.state == "open"
+    assert router.readable()
+    for _ in range(5):
+        assert router.query("q").url == "r2"
+    assert clients["r1"].queries == 1
+
+
+def test_ping_readers_feeds_the_breakers():
+    router, clients = make_router(breaker_failures=1)
+    clients["r1"].fail = clients["r2"].fail = True
+    assert router.ping_readers() is False
+    assert not router.readable()
+    clients["r2"].fail = False
+    assert router.ping_readers() is True
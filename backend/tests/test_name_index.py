@@ -0,0 +1,92 @@
+import threading
+import time
+
+from name_index import NameIndex, normalize_name
+
+ROWS = [
+    ("u1", "Aliment", "Crème brûlée"),
+    ("u2", "Aliment", "Crêpe"),
+    ("u3", "Personne", "Émile Crémieux"),
+    ("u3", "Personne", "Milo"),
+]
+
+
+def built_index(rows=ROWS):
+    index = NameIndex()
+    index.build(rows)
+    return index
+
+
+def test_normalize_name():
+    assert normalize_name("  Crème-Brûlée! ") == "creme brulee"
+
+
+def test_search_is_accent_and_case_insensitive_substring():
+    index = built_index()
+    assert index.search("CREME") == ["u1"]
+    assert index.search("cré") == ["u1", "u2", "u3"]
+    assert index.search("cre", "Personne") == ["u3"]
+    assert index.search("milo") == ["u3"]
+    assert index.search("brulee x") == []
+    # Moins de trois caractères : tous les noms sont examinés
+    assert index.search("ep") == ["u2"]
+
+
+def test_search_before_build_is_none():
+    assert NameIndex().search("cre") is None
+
+
+def test_incremental_changes_and_generation():
+    index = built_index()
+    generation = index.generation
+    index.set_names("u2", "Aliment", ["Galette"])
+    assert index.search("crepe") == []
+    assert index.search("galette") == ["u2"]
+    index.add_names("u2", "Aliment", ["Crêpe"])
+    assert index.search("crepe") == ["u2"] and index.search("galette") == ["u2"]
+    index.remove("u1")
+    assert index.search("brulee") == []
+    assert not index.contains("u1")
+    assert index.contains("u3", "Personne") and not index.contains("u3", "Aliment")
+    assert index.generation == generation + 3
+
+
+def test_changes_during_a_build_survive_the_swap():
+    index = built_index()
+    loading, release = threading.Event(), threading.Event()
+
+    def load_rows():
+        loading.set()
+        release.wait(5)
+        return ROWS  # lu avant les écritures ci-dessous
+
+    index.build_async(load_rows, retry_after=0)
+    assert loading.wait(5)
+    index.set_names("u4", "Personne", ["Zorglub"])
+    index.remove("u2")
+    index.add_names("u1", "Aliment", ["Crème brûlée"])
+    release.set()
+    deadline = time.monotonic() + 5
+    while index.building and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert index.search("zorglub") == ["u4"]
+    assert index.search("crepe") == []
+    assert index.search("brulee") == ["u1"]
+    # Le journal est refermé : les écritures suivantes ne s'accumulent plus
+    assert index._pending is None
+
+
+def test_failed_build_keeps_the_current_index():
+    index = built_index()
+
+    def load_rows():
+        raise RuntimeError("store down")
+
+    index.build_async(load_rows, retry_after=0)
+    deadline = time.monotonic() + 5
+    while index.building and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.error == "store down"
+    assert index.search("crepe") == ["u2"]
+    assert index._pending is None
@@ -0,0 +1,70 @@
+import time
+
+from query_cache import QueryCache
+
+
+def test_invalidate_drops_only_tagged_entries():
+    cache = QueryCache()
+    cache.set("q1", 1, ("personnes",))
+    cache.set("q2", 2, ("aliments",))
+    cache.set("q3", 3, ("personnes", "aliments"))
+    cache.invalidate("personnes")
+    assert cache.get("q1") is None
+    assert cache.get("q2") == 2
+    assert cache.get("q3") is None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_set_drops_a_value_read_before_an_invalidation():
+    cache = QueryCache()
+    generation = cache.generation(("personnes",))
+    cache.invalidate("personnes")  # écriture pendant la lecture
+    cache.set("q", "stale", ("personnes",), generation=generation)
+    assert cache.get("q") is None
+    assert cache.stats()["stale_sets"] == 1
+
+    generation = cache.generation(("personnes",))
+    cache.set("q", "fresh", ("personnes",), generation=generation)
+    assert cache.get("q") == "fresh"
+
+
+def test_generation_ignores_other_tags_but_not_clear():
+    cache = QueryCache()
+    generation = cache.generation(("personnes",))
+    cache.invalidate("aliments")
+    cache.set("q", 1, ("personnes",), generation=generation)
+    assert cache.get("q") == 1
+
+    generation = cache.generation(("personnes",))
+    cache.clear()
+    cache.set("q", 2, ("personnes",), generation=generation)
+    assert cache.get("q") is None
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = QueryCache(max_entries=2, max_bytes=100)
+    cache.set("a", 1, size=10)
+    cache.set("b", 2, size=10)
+    cache.get("a")
+    cache.set("c", 3, size=10)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("big", 4, size=95)
+    assert cache.stats()["bytes"] <= 100
+    cache.set("huge", 5, size=101)
+    assert cache.get("huge") is None
+
+
+def test_expired_entries_are_misses():
+    cache = QueryCache(ttl=0.01)
+    cache.set("q", 1)
+    time.sleep(0.02)
+    assert cache.get("q") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = QueryCache(enabled=False)
+    cache.set("q", 1)
+    assert cache.get("q") is None
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from keyword_matcher import KeywordMatcher
+from query_criteria import Criterion, criteria_filters, extract_criteria
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("personnes de plus de 50 ans", [("âge", ">", 50)]),
+    ("personnes de 30 à 40 ans", [("âge", ">=", 30), ("âge", "<=", 40)]),
+    ("entre 20 et 30 ans", [("âge", ">=", 20), ("âge", "<=", 30)]),
+    ("poids 70", [("poids", "=", 70.0)]),
+    ("poids de 60 a 80 kg", [("poids", ">=", 60.0), ("poids", "<=", 80.0)]),
+    ("aliments avec au moins 5 g de fibres", [("fibres", ">=", 5.0)]),
+    ("5 g de fibres", [("fibres", "=", 5.0)]),
+    ("aliments de 200 kcal", [("calories", "=", 200)]),
+    ("moins de 300 mg de sodium", [("sodium", "<", 300.0)]),
+    ("activités de 1,5 h", [("durée", "=", 90)]),
+    ("taille 1.77 m", [("taille", "=", 177.0)]),
+    ("taille 1,80", [("taille", "=", 180.0)]),
+    ("personnes de 1m80", [("taille", "=", 180.0)]),
+    ("personnes de 1m60 à 1m80", [("taille", ">=", 160.0), ("taille", "<=", 180.0)]),
+    ("mesurant plus de 175 cm", [("taille", ">", 175.0)]),
+    ("âge 40 ans, 40 ans", [("âge", "=", 40)]),
+    ("aliments riches en fibres", []),
+])
+def test_extract_criteria(text, expected):
+    assert extract_criteria(text) == [Criterion(*c) for c in expected]
+
+
+def test_criteria_filters_keep_only_the_entity_type():
+    criteria = extract_criteria("personnes de plus de 30 ans avec 5 g de fibres")
+    assert criteria_filters(criteria, "Personne") == (["(?âge > 30)"], ["âge"])
+    assert criteria_filters(criteria, "Aliment") == (["(?teneurFibres = 5.0)"], ["fibres"])
+
+
+def test_height_filter_accepts_heights_stored_in_meters_or_cm():
+    filters, _ = criteria_filters(extract_criteria("taille 1m80"), "Personne")
+    assert filters == ["(IF(?taille < 3, ?taille * 100, ?taille) = 180.0)"]
+
+
+def test_keyword_matcher_finds_overlapping_keywords_with_their_payloads():
+    matcher = KeywordMatcher([("fibre", "fibres"), ("fibres", "fibres"), ("sel", "sodium"),
+                              ("sel", "salé"), ("he", "h"), ("she", "s"), ("hers", "x")])
+    assert matcher.find("riche en fibres, peu de sel, ushers") == {
+        "fibre": ["fibres"], "fibres": ["fibres"], "sel": ["sodium", "salé"],
+        "she": ["s"], "he": ["h"], "hers": ["x"],
+    }
+    assert [end for end, _, _ in matcher.iter_matches("sel")] == [3, 3]
+
+
+def test_keyword_matcher_agrees_with_substring_search():
+    rng = random.Random(7)
+    keywords = {"".join(rng.choice("abc") for _ in range(rng.randint(1, 4))) for _ in range(30)}
+    matcher = KeywordMatcher((keyword, keyword) for keyword in keywords)
+    for _ in range(200):
+        text = "".join(rng.choice("abcd") for _ in range(rng.randint(0, 12)))
+        assert set(matcher.find(text)) == {keyword for keyword in keywords if keyword in text}
+
+
+def test_keyword_matcher_accepts_keywords_after_use():
+    matcher = KeywordMatcher([("pomme", 1)])
+    assert matcher.find("pommes") == {"pomme": [1]}
+    matcher.add("pommes", 2)
+    assert matcher.find("pommes") == {"pomme": [1], "pommes": [2]}
+    with pytest.raises(ValueError):
+        matcher.add("", 3)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from recommender import FoodModel, RecommendationEngine, distinct_rows, find_rule, overweight
+
+NAN = float("nan")
+
+
+def food_model():
+    return FoodModel(
+        uris=["u0", "u1", "u2", "u3"],
+        names=["Pain complet", "Crème fraîche", "Épinards", "Grain de blé"],
+        # calories, indexGlycémique, teneurFibres, teneurSodium
+        values=[[250, 70, 6, 500], [300, 30, 0, 40], [23, 15, 2.2, NAN], [340, 45, 12, 5]],
+        nutrients=[["fer"], [], ["fer", "vitamine c"], []],
+    )
+
+
+def test_exclusion_mask_matches_word_starts_without_accents():
+    foods = food_model()
+    mask = foods.exclusion_mask({"exclude": ("creme", "ble")})
+    assert mask.tolist() == [False, True, False, True]
+    # "pain" exclut "Pain complet" mais pas un mot qui ne fait que le contenir
+    assert foods.exclusion_mask({"exclude": ("ain",)}).tolist() == [False] * 4
+
+
+def test_exclusion_mask_nutrient_limit_ignores_missing_values():
+    foods = food_model()
+    mask = foods.exclusion_mask({"max": {"teneurSodium": 100}})
+    assert mask.tolist() == [True, False, False, False]
+    assert not foods.exclusion_mask({}).any()
+
+
+def test_rules_are_found_by_normalized_name():
+    assert find_rule("aAllergie", "Gluten") is not None
+    assert find_rule("aAllergie", "Fruits à coque") is not None
+    assert find_rule("aAllergie", "inconnue") is None
+    assert find_rule("inconnu", "Gluten") is None
+
+
+def test_score_vector_uses_weights_and_nutrients():
+    foods = food_model()
+    fibres = foods.score_vector({"weights": {"teneurFibres": 1.0}})
+    assert int(np.argmax(fibres)) == 3
+    fer = foods.score_vector({"nutrients": {"Fer": 1.0}})
+    assert fer.tolist() == [1.0, 0.0, 1.0, 0.0]
+
+
+def test_distinct_rows_round_trip():
+    rng = np.random.default_rng(3)
+    matrix = rng.random((500, 19)) < 0.1
+    rows, inverse = distinct_rows(matrix)
+    assert (rows[inverse] == matrix).all()
+    assert len(rows) == len({row.tobytes() for row in matrix})
+
+
+def test_distinct_rows_of_empty_matrix():
+    rows, inverse = distinct_rows(np.zeros((0, 5), dtype=bool))
+    assert rows.shape == (0, 5) and inverse.shape == (0,)
+
+
+def test_overweight_accepts_heights_in_meters_or_cm():
+    poids = np.array([90.0, 60.0, 60.0, 70.0])
+    taille = np.array([1.70, 170.0, 1.70, 175.0])
+    objectif = np.array([90.0, 60.0, 60.0, 65.0])
+    assert overweight(poids, taille, objectif).tolist() == [True, False, False, True]
+
+
+def test_a_single_batch_runs_at_a_time():
+    def failing_query(*args, **kwargs):
+        raise RuntimeError("store down")
+
+    engine = RecommendationEngine(failing_query, lambda text: (True, ""))
+    assert engine.claim()
+    assert not engine.claim()
+    with pytest.raises(RuntimeError, match="déjà en cours"):
+        engine.run_batch(lambda: "")
+    with pytest.raises(RuntimeError, match="store down"):
+        engine.run_batch(lambda: "", claimed=True)
+    assert not engine.running
+    assert engine.last_run["ok"] is False
+    assert engine.claim()
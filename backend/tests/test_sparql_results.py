@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from sparql_results import decode_tsv, decode_tsv_term, flatten_binding, iter_json_bindings
+
+BINDINGS = [
+    {"nom": {"type": "literal", "value": "Crème brûlée [spéciale], \"maison\""}},
+    {"nom": {"type": "literal", "value": "Pâté"}, "s": {"type": "uri", "value": "http://x/#a"}},
+    {},
+]
+DOCUMENT = json.dumps({"head": {"vars": ["nom", "s"]},
+                       "results": {"bindings": BINDINGS}}, ensure_ascii=False).encode("utf-8")
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(DOCUMENT)])
+def test_bindings_survive_any_chunk_split(size):
+    # Des blocs d'un octet coupent aussi les caractères UTF-8 multi-octets
+    assert list(iter_json_bindings(chunked(DOCUMENT, size))) == BINDINGS
+
+
+def test_every_split_point():
+    for cut in range(1, len(DOCUMENT)):
+        chunks = [DOCUMENT[:cut], DOCUMENT[cut:]]
+        assert list(iter_json_bindings(chunks)) == BINDINGS
+
+
+def test_empty_result():
+    document = b'{"head": {"vars": []}, "results": {"bindings": []}}'
+    assert list(iter_json_bindings(chunked(document, 5))) == []
+
+
+def test_truncated_stream_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_bindings([DOCUMENT[:-20]]))
+
+
+def test_flatten_binding():
+    assert flatten_binding(BINDINGS[1]) == {"nom": "Pâté", "s": "http://x/#a"}
+
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+@pytest.mark.parametrize("cell, expected", [
+    ("", None),
+    ('"Pomme"', "Pomme"),
+    ('"Pomme"@fr', "Pomme"),
+    ('"a\\tb\\nc \\"d\\" \\u00e9"', 'a\tb\nc "d" é'),
+    (f'"42"^^<{XSD}integer>', 42),
+    (f'"1.5"^^<{XSD}decimal>', 1.5),
+    (f'"true"^^<{XSD}boolean>', True),
+    (f'"abc"^^<{XSD}integer>', "abc"),
+    (f'"2024-01-01"^^<{XSD}date>', "2024-01-01"),
+    ("<http://x/#a>", "http://x/#a"),
+    ("42", 42),
+    ("-1.5e0", -1.5),
+    ("false", False),
+    ("_:b0", "_:b0"),
+])
+def test_decode_tsv_term(cell, expected):
+    value = decode_tsv_term(cell)
+    assert value == expected
+    assert type(value) is type(expected)
+
+
+def test_decode_tsv():
+    text = f'?id\t?calories\t?nom\r\n"a"\t"52"^^<{XSD}integer>\t"Pomme"\n"b"\t\t"Kiwi\\tvert"\n'
+    assert decode_tsv(text) == (["id", "calories", "nom"],
+                                [["a", 52, "Pomme"], ["b", None, "Kiwi\tvert"]])
+    assert decode_tsv("") == ([], [])
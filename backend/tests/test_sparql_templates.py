@@ -0,0 +1,64 @@
+import re
+
+import pytest
+
+from sparql_templates import (
+    TEMPLATES, SparqlTemplate, format_param, register, render_query, nutrition_iri,
+)
+
+
+@pytest.mark.parametrize("param_type, value", [
+    ("iri", "http://x/a b"),
+    ("iri", "http://x/a> } ; DROP ALL ; <x"),
+    ("iri", 'http://x/"'),
+    ("iri", ""),
+    ("iri", None),
+    ("integer", "12abc"),
+    ("integer", True),
+    ("float", float("nan")),
+    ("float", "inf"),
+    ("float", "abc"),
+    ("values:iri", []),
+    ("values:iri", ["http://x/ok", "http://x/not ok"]),
+])
+def test_format_param_rejects_unsafe_values(param_type, value):
+    with pytest.raises((ValueError, TypeError)):
+        format_param(param_type, value)
+
+
+def test_format_param_escapes_strings_and_regex():
+    assert format_param("string", 'a"b\\c\n') == '"a\\"b\\\\c\\n"'
+    rendered = format_param("regex", "a.b*(c)")
+    # Le texte est cherché littéralement : chaque métacaractère est échappé
+    assert re.search(rendered[1:-1].replace("\\\\", "\\"), "xa.b*(c)y")
+    assert format_param("values:iri", ["http://x/a", "http://x/b"]) == "<http://x/a> <http://x/b>"
+    assert format_param("integer", "12") == "12"
+    assert format_param("float", 1) == "1.0"
+
+
+def test_template_declaration_is_checked():
+    with pytest.raises(ValueError, match="non déclarés"):
+        SparqlTemplate("t", "SELECT * WHERE { ${s} ?p ?o }", {})
+    with pytest.raises(ValueError, match="inutilisés"):
+        SparqlTemplate("t", "SELECT * WHERE { ?s ?p ?o }", {"s": "iri"})
+    with pytest.raises(ValueError, match="type inconnu"):
+        SparqlTemplate("t", "SELECT * WHERE { ${s} ?p ?o }", {"s": "uri"})
+    with pytest.raises(ValueError, match="accolades"):
+        SparqlTemplate("t", "SELECT * WHERE { ${s} ?p ?o ", {"s": "iri"})
+
+
+def test_render_binds_every_occurrence_and_requires_all_params():
+    template = SparqlTemplate("t", "ASK { ${s} a ${c} . ${s} ?p ?o }", {"s": "iri", "c": "iri"})
+    assert template.render(s="http://x/a", c="http://x/C") == \
+        "ASK { <http://x/a> a <http://x/C> . <http://x/a> ?p ?o }"
+    with pytest.raises(ValueError, match="manquants"):
+        template.render(s="http://x/a")
+
+
+def test_registry():
+    assert TEMPLATES
+    with pytest.raises(ValueError, match="déjà déclarée"):
+        register("entity.exists", "ASK { ?s ?p ?o }")
+    query = render_query("entity.exists", uri=nutrition_iri("personne_x"),
+                         entity_class=nutrition_iri("Personne"))
+    assert query.strip() == f"ASK {{ <{nutrition_iri('personne_x')}> a <{nutrition_iri('Personne')}> }}"
@@ -0,0 +1,103 @@
+"""Logging set-up, per-request trace ids and the ring buffer of recent queries"""
+
+import contextvars
+import logging
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_trace_id = contextvars.ContextVar("trace_id", default="-")
+_VALID_TRACE_ID = re.compile(r"^[\w.-]{1,64}$")
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+def start_trace(incoming=None):
+    """Use the caller's X-Request-ID when it is sane, else a new id"""
+    trace_id = incoming if incoming and _VALID_TRACE_ID.match(incoming) else uuid.uuid4().hex[:16]
+    _trace_id.set(trace_id)
+    return trace_id
+
+
+class TraceIdFilter(logging.Filter):
+    """Add the current request's trace id to every record as %(trace_id)s"""
+
+    def filter(self, record):
+        record.trace_id = _trace_id.get()
+        return True
+
+
+def configure_logging(level="INFO"):
+    handler = logging.StreamHandler()
+    handler.addFilter(TraceIdFilter())
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"
+    ))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+
+
+class QueryLog:
+    """The last `size` Fuseki requests, kept in memory for /api/admin/queries.
+
+    Recording an entry is an append to a bounded deque, so every request is
+    kept. Only a `sample_rate` fraction of them, plus every failure, also has
+    its text written to the log.
+    """
+
+    def __init__(self, size=200, sample_rate=0.0):
+        self.sample_rate = sample_rate
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def record(self, kind, query_id, query, seconds, status=None, error=None):
+        entry = {
+            "time": time.time(),
+            "trace_id": _trace_id.get(),
+            "kind": kind,
+            "query_id": query_id,
+            "duration_ms": round(seconds * 1000, 3),
+            "status": status,
+            "error": error,
+            "query": query,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            self.recorded += 1
+        failed = error is not None or status not in (200, 204)
+        if failed:
+            logger.warning("SPARQL %s [%s] échouée en %.1f ms (%s):\n%s", kind, query_id or "adhoc",
+                           entry["duration_ms"], error or f"HTTP {status}", query)
+        elif self.sample_rate and random.random() < self.sample_rate:
+            logger.info("SPARQL %s [%s] %.1f ms:\n%s", kind, query_id or "adhoc",
+                        entry["duration_ms"], query)
+
+    def recent(self, limit=None, kind=None, query_id=None, trace_id=None):
+        """Matching entries, most recent first"""
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        if kind:
+            entries = [e for e in entries if e["kind"] == kind]
+        if query_id:
+            entries = [e for e in entries if e["query_id"] == query_id]
+        if trace_id:
+            entries = [e for e in entries if e["trace_id"] == trace_id]
+        return entries[:limit]
+
+    def stats(self):
+        return {
+            "size": self._entries.maxlen,
+            "kept": len(self._entries),
+            "recorded": self.recorded,
+            "sample_rate": self.sample_rate,
+        }
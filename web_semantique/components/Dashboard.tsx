@@ -11,6 +11,7 @@ export default function Dashboard() {
     activites: 0,
     recommandations: 0,
   })
+  const [averages, setAverages] = useState<Record<string, number | null>>({})
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
@@ -19,24 +20,16 @@ export default function Dashboard() {
 
   const fetchStats = async () => {
     try {
-      const [personnesRes, alimentsRes, activitesRes, recsRes] = await Promise.all([
-        fetch("http://localhost:5000/api/personnes"),
-        fetch("http://localhost:5000/api/aliments"),
-        fetch("http://localhost:5000/api/activites"),
-        fetch("http://localhost:5000/api/recommandations"),
-      ])
-
-      const personnes = await personnesRes.json()
-      const aliments = await alimentsRes.json()
-      const activites = await activitesRes.json()
-      const recommandations = await recsRes.json()
+      const response = await fetch("http://localhost:5000/api/dashboard")
+      const data = await response.json()
 
       setStats({
-        personnes: personnes.length,
-        aliments: aliments.length,
-        activites: activites.length,
-        recommandations: recommandations.length,
+        personnes: data.counts.personnes,
+        aliments: data.counts.aliments,
+        activites: data.counts.activites,
+        recommandations: data.counts.recommandations,
       })
+      setAverages(data.averages)
     } catch (error) {
       console.error("Error fetching stats:", error)
     }
@@ -70,7 +63,13 @@ export default function Dashboard() {
         <CardHeader>
           <CardTitle>Bienvenue</CardTitle>
         </CardHeader>
-        
+        <CardContent>
+          <div className="grid grid-cols-3 gap-4 text-sm text-slate-600">
+            <p>Âge moyen : {averages["âge"] ?? "-"}</p>
+            <p>Poids moyen : {averages.poids ?? "-"} kg</p>
+            <p>Calories moyennes : {averages.calories ?? "-"}</p>
+          </div>
+        </CardContent>
       </Card>
     </div>
   )